@@ -1,36 +1,153 @@
+# =============================================================================
+# AGENT OUTPUT CACHE
+# Per-ticker agent outputs in SQLite (WAL), shared safely across gunicorn
+# workers, with TTL expiry and optional zlib compression of the output blobs
+# =============================================================================
+
 import os
 import json
-from datetime import datetime, timedelta
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+
+CACHE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.getenv("AGENT_CACHE_PATH", os.path.join(CACHE_DIR, "agent_output_cache.db"))
+# Legacy whole-file cache, imported once into the SQLite store
+CACHE_FILE = os.path.join(CACHE_DIR, "agent_output_cache.json")
+CACHE_TTL_HOURS = float(os.getenv("AGENT_CACHE_TTL_HOURS", "24"))
+AGENT_CACHE_COMPRESS = os.getenv("AGENT_CACHE_COMPRESS", "true").lower() == "true"
+
+CODEC_JSON = 'json'
+CODEC_ZLIB = 'zlib'
+
+
+def _encode(output, compress):
+    data = json.dumps(output).encode('utf-8')
+    if compress:
+        return CODEC_ZLIB, zlib.compress(data, 6)
+    return CODEC_JSON, data
+
+
+def _decode(codec, blob):
+    if codec == CODEC_ZLIB:
+        blob = zlib.decompress(blob)
+    return json.loads(blob)
+
 
-CACHE_FILE = "agent_output_cache.json"
-CACHE_TTL_HOURS = 24
+class AgentOutputCache:
+    """
+    Agent outputs keyed by ticker, one row each; reads and writes touch only
+    that row, so lookups no longer load or rewrite the whole cache.
+    """
 
-def _load_cache():
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r') as f:
+    def __init__(self, path=CACHE_PATH, ttl_hours=CACHE_TTL_HOURS,
+                 compress=AGENT_CACHE_COMPRESS, legacy_file=CACHE_FILE):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.compress = compress
+        self.legacy_file = legacy_file
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            self._local.conn = conn
+
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript("""
+                        CREATE TABLE IF NOT EXISTS agent_outputs (
+                            ticker TEXT PRIMARY KEY,
+                            codec TEXT NOT NULL,
+                            output BLOB NOT NULL,
+                            cached_at REAL NOT NULL,
+                            expires_at REAL NOT NULL
+                        );
+                        CREATE INDEX IF NOT EXISTS idx_agent_outputs_expires_at
+                            ON agent_outputs (expires_at);
+                        CREATE TABLE IF NOT EXISTS cache_meta (
+                            key TEXT PRIMARY KEY,
+                            value TEXT NOT NULL
+                        );
+                    """)
+                    self._import_legacy(conn)
+                    self._schema_ready = True
+        return conn
+
+    def _import_legacy(self, conn):
+        """Copy entries from the old JSON file once, keeping their original timestamps"""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            if conn.execute("SELECT 1 FROM cache_meta WHERE key = 'legacy_imported';").fetchone():
+                conn.execute("COMMIT;")
+                return
             try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
+                with open(self.legacy_file, 'r') as f:
+                    legacy = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Skipping unreadable legacy agent cache {self.legacy_file}: {e}")
+                legacy = {}
+
+            imported = 0
+            for ticker, record in legacy.items():
+                try:
+                    cached_at = datetime.fromisoformat(record['timestamp']).timestamp()
+                    codec, blob = _encode(record['output'], self.compress)
+                except (KeyError, TypeError, ValueError):
+                    continue
+                conn.execute(
+                    "INSERT OR IGNORE INTO agent_outputs (ticker, codec, output, cached_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?);",
+                    (ticker, codec, blob, cached_at, cached_at + self.ttl_seconds)
+                )
+                imported += 1
+            conn.execute(
+                "INSERT INTO cache_meta (key, value) VALUES ('legacy_imported', ?);",
+                (datetime.now().isoformat(),)
+            )
+            conn.execute("COMMIT;")
+            if imported:
+                print(f"📦 Imported {imported} agent outputs from {self.legacy_file}")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+
+    def get(self, ticker):
+        """The cached output for the ticker, or None if missing or expired"""
+        row = self._connect().execute(
+            "SELECT codec, output FROM agent_outputs WHERE ticker = ? AND expires_at > ?;",
+            (ticker, time.time())
+        ).fetchone()
+        return _decode(*row) if row else None
+
+    def put(self, ticker, output):
+        """Store the ticker's output, replacing any previous one, and drop expired rows"""
+        now = time.time()
+        codec, blob = _encode(output, self.compress)
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO agent_outputs (ticker, codec, output, cached_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?);",
+            (ticker, codec, blob, now, now + self.ttl_seconds)
+        )
+        conn.execute("DELETE FROM agent_outputs WHERE expires_at <= ?;", (now,))
+
+
+agent_output_cache = AgentOutputCache()
 
-def _save_cache(cache):
-    with open(CACHE_FILE, 'w') as f:
-        json.dump(cache, f)
 
 def get_cached_agent_output(ticker):
-    cache = _load_cache()
-    record = cache.get(ticker)
-    if record:
-        timestamp = datetime.fromisoformat(record['timestamp'])
-        if datetime.now() - timestamp < timedelta(hours=CACHE_TTL_HOURS):
-            return record['output']
-    return None
+    return agent_output_cache.get(ticker)
 
 def cache_agent_output(ticker, output):
-    cache = _load_cache()
-    cache[ticker] = {
-        "timestamp": datetime.now().isoformat(),
-        "output": output
-    }
-    _save_cache(cache)
\ No newline at end of file
+    agent_output_cache.put(ticker, output)
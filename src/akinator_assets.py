@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context
 import pandas as pd
 import json
 import plotly
@@ -9,26 +9,41 @@ from auth import oauth, auth0
 from functools import wraps
 import os
 import sys
+import time
 import traceback
 from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from pytz import timezone
 from run_watchlist_scriptv2 import main
-from stock_agent import analyze_and_parse_stock
+from stock_agent import build_agent_output, stream_stock_analysis
 from db_utils import (
     fetch_latest_agent_output, insert_agent_output,
-    fetch_latest_moat_analysis, insert_moat_analysis
+    fetch_latest_moat_analysis, insert_moat_analysis,
+    fetch_analysis_telemetry, apply_migrations, fetch_latest_analyses,
+    fetch_analysis_history, insert_failed_run_telemetry,
+    encode_history_cursor, decode_history_cursor
 )
 from dotenv import load_dotenv
 from pathlib import Path
 import stripe
 from moat_agent import run_moat_analysis_for_web
 from stock_plotter import StockPlotter  # Import our new plotting class
+from analysis_jobs import AnalysisJobQueue, FINISHED_STATUSES
+from research_context import research_contexts
+from prewarm import request_tracker, run_prewarm, PREWARM_HOUR, PREWARM_MINUTE
+from telemetry import summarize_telemetry
 
 
 load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env")
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 
+# Upper bound on tickers per /api/latest-analyses request
+LATEST_ANALYSES_MAX_TICKERS = 200
+# Largest page /api/analysis-history will serve
+ANALYSIS_HISTORY_MAX_LIMIT = 100
+# Seconds between reads of a streamed job's new events
+STREAM_POLL_SECONDS = 0.25
+
 
 def requires_auth(f):
     @wraps(f)
@@ -50,6 +65,14 @@ def scheduled_watchlist_run():
         print(f"❌ Watchlist update failed: {e}")
 
 
+def scheduled_prewarm_run():
+    """Background task to refresh the most requested analyses off-peak."""
+    try:
+        run_prewarm(analysis_jobs)
+    except Exception as e:
+        print(f"❌ Analysis pre-warm failed: {e}")
+
+
 def load_watchlist_cache():
     """Load cached watchlist data."""
     try:
@@ -65,6 +88,52 @@ def load_watchlist_cache():
     return None, None, "N/A"
 
 
+def stock_response_data(ticker, cached, is_cached):
+    """Shape a stored stock analysis for the /analyze_stock response."""
+    return {
+        "ticker": ticker,
+        "duration": cached.get("duration"),
+        "search_calls": cached.get("search_calls"),
+        "executive_summary": cached.get("executive_summary"),
+        "metrics": cached.get("metrics"),
+        "sections": cached.get("sections", {}),
+        "timestamp": cached.get("timestamp"),
+        "is_cached": is_cached
+    }
+
+
+def run_stock_analysis_job(ticker, report, emit):
+    """Background job: run the stock agent, streaming its tokens as job events, store the result, return response data."""
+    report("Running stock agent")
+    result = stream_stock_analysis(ticker, emit, verbose=True)
+    if not result.get('success'):
+        insert_failed_run_telemetry(ticker, 'stock', result.get('telemetry'), result.get('error'))
+        raise RuntimeError(result.get('error', 'Agent analysis failed'))
+
+    report("Saving analysis")
+    stored = insert_agent_output(ticker, build_agent_output(ticker, result), telemetry=result.get('telemetry'))
+    return stock_response_data(ticker, stored, is_cached=False)
+
+
+def run_moat_analysis_job(ticker, report, emit):
+    """Background job: run the MOAT agent, store the result, return response data."""
+    report("Running MOAT agent")
+    result = run_moat_analysis_for_web(ticker)
+    if not result['success']:
+        insert_failed_run_telemetry(ticker, 'moat', result.get('telemetry'), result['error'])
+        raise RuntimeError(result['error'])
+
+    report("Saving analysis")
+    stored = insert_moat_analysis(ticker, result["sections"], result["duration"], telemetry=result.get("telemetry"))
+    return {
+        'ticker': result['ticker'],
+        'duration': result['duration'],
+        'sections': result['sections'],
+        'timestamp': stored['timestamp'] if stored else datetime.now().isoformat(),
+        'is_cached': False
+    }
+
+
 def open_browser():
     """Open browser to localhost."""
     webbrowser.open_new('http://localhost:8080/')
@@ -84,6 +153,17 @@ oauth.init_app(app)
 # Initialize Stock Plotter
 stock_plotter = StockPlotter()
 
+# Initialize background analysis queue
+analysis_jobs = AnalysisJobQueue()
+analysis_jobs.register('stock', run_stock_analysis_job)
+analysis_jobs.register('moat', run_moat_analysis_job)
+
+# Bring the analysis tables up to date (e.g. telemetry columns)
+try:
+    apply_migrations()
+except Exception as e:
+    print(f"⚠️  Could not apply database migrations: {e}")
+
 
 # Authentication Routes
 @app.route("/login")
@@ -160,8 +240,10 @@ def create_checkout_session():
 def moat_analysis():
     """
     API endpoint for MOAT analysis v2 with force refresh capability
-    Expects: {"ticker": "AAPL", "force_refresh": false}
+    Expects: {"ticker": "AAPL", "force_refresh": false, "async": false}
     Returns: {"success": bool, "data": {...}, "error": str}
+             or, with "async": true on a cache miss, 202 {"success": true, "job_id": str, ...}
+             or 202 {"success": true, "job_id": str, ...} if the job outlives the short synchronous wait
     """
     try:
         data = request.get_json()
@@ -174,6 +256,7 @@ def moat_analysis():
 
         ticker = data['ticker'].strip().upper()
         force_refresh = data.get('force_refresh', False)
+        run_async = data.get('async', False)
 
         if not ticker:
             return jsonify({
@@ -182,6 +265,7 @@ def moat_analysis():
             }), 400
 
         print(f"🏰 Running MOAT analysis for {ticker} (force_refresh: {force_refresh})...")
+        request_tracker.record(ticker, 'moat')
 
         # Run MOAT analysis - check cache only if not forcing refresh
         if not force_refresh:
@@ -200,31 +284,36 @@ def moat_analysis():
                     'error': None
                 })
 
-        # Run fresh analysis
+        # Queue (or join) a background analysis; synchronous callers get a
+        # short wait, then the job id like async ones
         print(f"🔄 Running fresh MOAT analysis for {ticker}...")
-        result = run_moat_analysis_for_web(ticker)
-
-        if result['success']:
+        if force_refresh:
+            # Start from current prices, news and searches, not the shared research context
+            research_contexts.invalidate(ticker)
+        job, created = analysis_jobs.submit('moat', ticker)
+        if not run_async:
+            job = analysis_jobs.wait(job['job_id'])
+        if job['status'] not in FINISHED_STATUSES:
+            return jsonify({
+                'success': True,
+                'job_id': job['job_id'],
+                'status': job['status'],
+                'status_url': url_for('job_status', job_id=job['job_id']),
+                'error': None
+            }), 202
+        if job['status'] == 'succeeded':
             print(f"✅ MOAT analysis completed for {ticker}")
-            timestamp = datetime.now().isoformat()
-            insert_moat_analysis(ticker, result["sections"], result["duration"])
             return jsonify({
                 'success': True,
-                'data': {
-                    'ticker': result['ticker'],
-                    'duration': result['duration'],
-                    'sections': result['sections'],
-                    'timestamp': timestamp,
-                    'is_cached': False
-                },
+                'data': job['data'],
                 'error': None
             })
         else:
-            print(f"❌ MOAT analysis failed for {ticker}: {result['error']}")
+            print(f"❌ MOAT analysis failed for {ticker}: {job['error']}")
             return jsonify({
                 'success': False,
                 'data': None,
-                'error': result['error']
+                'error': job['error']
             }), 500
 
     except Exception as e:
@@ -242,12 +331,27 @@ def moat_health():
     """Health check for MOAT analysis system"""
     try:
         from moat_agent import run_moat_analysis_for_web
-
-        return jsonify({
+        from search_cache import search_cache
+        from search_strategies import strategy_stats
+        from model_pool import model_pool
+        from pacing import bedrock_pacer, search_pacer
+        from db_utils import latest_analysis_cache
+        from schwab_api.rate_limiter import schwab_rate_limiter
+
+        health = {
             'status': 'healthy',
             'moat_system': 'operational',
+            'search_cache': search_cache.stats(),
+            'search_strategies': strategy_stats.snapshot(),
+            'pacing': {'bedrock': bedrock_pacer.snapshot(), 'search': search_pacer.snapshot()},
+            'latest_analysis_cache': latest_analysis_cache.stats(),
+            'schwab_rate_limit': schwab_rate_limiter.usage(),
             'timestamp': datetime.now().isoformat()
-        })
+        }
+        # Bedrock credential check is a network call, so only on request
+        if request.args.get('check_credentials', 'false').lower() == 'true':
+            health['bedrock_credentials'] = model_pool.check_credentials()
+        return jsonify(health)
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -257,17 +361,108 @@ def moat_health():
         }), 500
 
 
+@app.route('/api/telemetry/<ticker>', methods=['GET'])
+@requires_auth
+def analysis_telemetry(ticker):
+    """
+    Recent run telemetry for a ticker and where the time and tokens went on average
+    Query: ?kind=stock|moat&limit=20
+    Returns: {"success": bool, "data": {"runs": [...], "summary": {...}}, "error": str|None}
+    """
+    kind = request.args.get('kind', 'stock').lower()
+    if kind not in ('stock', 'moat'):
+        return jsonify(success=False, data=None, error="kind must be 'stock' or 'moat'"), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 200)
+    except ValueError:
+        return jsonify(success=False, data=None, error="limit must be an integer"), 400
+
+    try:
+        runs = fetch_analysis_telemetry(ticker.strip().upper(), kind=kind, limit=limit)
+        summary = summarize_telemetry([run['telemetry'] for run in runs])
+        return jsonify(success=True, data={'runs': runs, 'summary': summary}, error=None)
+    except Exception as e:
+        return jsonify(success=False, data=None, error=str(e)), 500
+
+
+@app.route('/api/latest-analyses', methods=['GET'])
+@requires_auth
+def latest_analyses():
+    """
+    Latest stored stock and MOAT analyses for many tickers in one call, e.g. for badges
+    Query: ?tickers=AAPL,MSFT,...&full=false
+    Returns: {"success": bool, "data": {ticker: {"stock": {...}|null, "moat": {...}|null}}, "error": str|None}
+    """
+    tickers = [t.strip().upper() for t in request.args.get('tickers', '').split(',') if t.strip()]
+    if not tickers:
+        return jsonify(success=False, data=None, error="tickers is required"), 400
+    if len(tickers) > LATEST_ANALYSES_MAX_TICKERS:
+        return jsonify(success=False, data=None,
+                       error=f"At most {LATEST_ANALYSES_MAX_TICKERS} tickers per request"), 400
+    full = request.args.get('full', 'false').lower() == 'true'
+
+    try:
+        latest = fetch_latest_analyses(tickers)
+    except Exception as e:
+        return jsonify(success=False, data=None, error=str(e)), 500
+
+    if not full:
+        # Summaries only: timestamps, executive summary and key metrics
+        for ticker, analyses in latest.items():
+            stock, moat = analyses['stock'], analyses['moat']
+            analyses['stock'] = stock and {
+                'timestamp': stock.get('timestamp'),
+                'executive_summary': stock.get('executive_summary'),
+                'metrics': stock.get('metrics'),
+            }
+            analyses['moat'] = moat and {'timestamp': moat.get('timestamp')}
+    return jsonify(success=True, data=latest, error=None)
+
+
+@app.route('/api/analysis-history/<ticker>', methods=['GET'])
+@requires_auth
+def analysis_history(ticker):
+    """
+    A ticker's past analyses, newest first, as summaries without the stored analysis text
+    Query: ?kind=stock|moat&limit=20&cursor=<next_cursor from the previous page>
+    Returns: {"success": bool, "data": {"ticker", "kind", "items": [...], "next_cursor": str|None}, "error": str|None}
+    """
+    ticker = ticker.strip().upper()
+    kind = request.args.get('kind', 'stock').lower()
+    if kind not in ('stock', 'moat'):
+        return jsonify(success=False, data=None, error="kind must be 'stock' or 'moat'"), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), ANALYSIS_HISTORY_MAX_LIMIT)
+        cursor = request.args.get('cursor')
+        before = decode_history_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify(success=False, data=None, error="Invalid limit or cursor"), 400
+
+    try:
+        items, next_before = fetch_analysis_history(ticker, kind=kind, limit=limit, before=before)
+        return jsonify(success=True, data={
+            'ticker': ticker,
+            'kind': kind,
+            'items': items,
+            'next_cursor': encode_history_cursor(next_before) if next_before else None
+        }, error=None)
+    except Exception as e:
+        return jsonify(success=False, data=None, error=str(e)), 500
+
+
 @app.route('/analyze_stock', methods=['POST'])
 @requires_auth
 def analyze_stock_route():
     try:
         ticker = request.form.get('ticker', '').strip().upper()
         force_refresh = request.form.get('force_refresh', 'false').lower() == 'true'
+        run_async = request.form.get('async', 'false').lower() == 'true'
 
         if not ticker:
             return jsonify(success=False, error="Please enter a valid ticker symbol"), 400
 
         print(f"📊 Running analysis for {ticker} (force_refresh: {force_refresh})...")
+        request_tracker.record(ticker, 'stock')
 
         # Step 1: Try cache only if not forcing refresh
         if not force_refresh:
@@ -276,54 +471,34 @@ def analyze_stock_route():
                 print(f"📦 Using cached analysis for {ticker}")
                 return jsonify({
                     "success": True,
-                    "data": {
-                        "ticker": ticker,
-                        "duration": cached.get("duration"),
-                        "search_calls": cached.get("search_calls"),
-                        "executive_summary": cached.get("executive_summary"),
-                        "metrics": cached.get("metrics"),
-                        "sections": cached.get("sections", {}),
-                        "timestamp": cached.get("timestamp"),
-                        "is_cached": True
-                    },
+                    "data": stock_response_data(ticker, cached, is_cached=True),
                     "error": None
                 })
 
-        # Step 2: Run live agent analysis
+        # Step 2: Queue (or join) a background agent analysis
         print(f"🔄 Running fresh analysis for {ticker}...")
-        result = analyze_and_parse_stock(ticker, verbose=True)
-        if not result.get('success'):
-            return jsonify(success=False, error=result.get('error', 'Agent analysis failed')), 500
-
-        # Step 3: Store result in database
-        output = {
-            "ticker": ticker,
-            "duration": result['duration'],
-            "search_calls": result['search_calls'],
-            "executive_summary": result['executive_summary'],
-            "sections": result['parsed_sections'],
-            "metrics": result['metrics'],
-            "timestamp": datetime.now().isoformat()
-        }
-        insert_agent_output(ticker, output)
-
-        # Step 4: Immediately retrieve from database to ensure consistent formatting
-        cached = fetch_latest_agent_output(ticker)
-        if not cached:
-            return jsonify(success=False, error="Failed to retrieve stored analysis"), 500
+        if force_refresh:
+            # Start from current prices, news and searches, not the shared research context
+            research_contexts.invalidate(ticker)
+        job, created = analysis_jobs.submit('stock', ticker)
+
+        # Step 3: Synchronous callers wait briefly; unfinished jobs answer with their id
+        if not run_async:
+            job = analysis_jobs.wait(job['job_id'])
+        if job['status'] not in FINISHED_STATUSES:
+            return jsonify({
+                "success": True,
+                "job_id": job['job_id'],
+                "status": job['status'],
+                "status_url": url_for('job_status', job_id=job['job_id']),
+                "error": None
+            }), 202
+        if job['status'] != 'succeeded':
+            return jsonify(success=False, error=job['error'] or 'Agent analysis failed'), 500
 
         return jsonify({
             "success": True,
-            "data": {
-                "ticker": ticker,
-                "duration": cached.get("duration"),
-                "search_calls": cached.get("search_calls"),
-                "executive_summary": cached.get("executive_summary"),
-                "metrics": cached.get("metrics"),
-                "sections": cached.get("sections", {}),
-                "timestamp": cached.get("timestamp"),
-                "is_cached": False
-            },
+            "data": job['data'],
             "error": None
         })
 
@@ -333,6 +508,107 @@ def analyze_stock_route():
         return jsonify(success=False, error=f"Server error: {str(e)}"), 500
 
 
+@app.route('/api/analyze-stock/stream', methods=['GET'])
+@requires_auth
+def analyze_stock_stream():
+    """
+    Server-sent events stream of a stock analysis
+    Expects: ?ticker=AAPL&force_refresh=false
+    Events: "token" {"text"}, "section" {"key", "text"}, "reset" {} (drop sections so far),
+            "done" {"success", "data"}, "error" {"success", "error"}
+
+    The analysis runs as a job on the analysis queue, so streams share its
+    worker bound and its per-ticker de-duplication; a stream replays the
+    job's events from the start, from whichever worker serves it.
+    """
+    ticker = request.args.get('ticker', '').strip().upper()
+    force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
+
+    if not ticker:
+        return jsonify(success=False, error="Please enter a valid ticker symbol"), 400
+
+    request_tracker.record(ticker, 'stock')
+
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    def stream():
+        if not force_refresh:
+            cached = fetch_latest_agent_output(ticker)
+            if cached:
+                print(f"📦 Streaming cached analysis for {ticker}")
+                yield sse('done', {'success': True, 'data': stock_response_data(ticker, cached, is_cached=True)})
+                return
+
+        print(f"🔄 Streaming fresh analysis for {ticker}...")
+        if force_refresh:
+            # Start from current prices, news and searches, not the shared research context
+            research_contexts.invalidate(ticker)
+        job, created = analysis_jobs.submit('stock', ticker)
+        seen = 0
+        while True:
+            # Read the status first: a finished job has flushed every event
+            job = analysis_jobs.get(job['job_id'])
+            for seen, event, payload in analysis_jobs.events(job['job_id'], after=seen):
+                yield sse(event, {'text': payload} if event == 'token' else payload)
+
+            if job['status'] == 'succeeded':
+                yield sse('done', {'success': True, 'data': job['data']})
+                return
+            if job['status'] == 'failed':
+                yield sse('error', {'success': False, 'error': job['error'] or 'Agent analysis failed'})
+                return
+            time.sleep(STREAM_POLL_SECONDS)
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# Background Job Routes
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@requires_auth
+def job_status(job_id):
+    """
+    Poll a background analysis job
+    Returns: {"success": bool, "job": {"status": "queued|running|succeeded|failed", "data": {...}, ...}}
+    """
+    job = analysis_jobs.get(job_id)
+    if not job:
+        return jsonify(success=False, error="Job not found"), 404
+    return jsonify(success=True, job=job, error=None)
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+@requires_auth
+def job_events(job_id):
+    """Server-sent events stream of a job's progress steps, ending with its final state"""
+    def stream():
+        sent = 0
+        while True:
+            job = analysis_jobs.get(job_id)
+            if not job:
+                yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+                return
+
+            for step in job['progress'][sent:]:
+                yield f"event: progress\ndata: {json.dumps(step)}\n\n"
+            sent = len(job['progress'])
+
+            if job['status'] in FINISHED_STATUSES:
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                return
+            time.sleep(1)
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 # Main Application Routes
 @app.route('/')
 @requires_auth
@@ -475,6 +751,7 @@ if __name__ == '__main__':
     # Schedule background watchlist updates
     scheduler = BackgroundScheduler(timezone='US/Central')
     scheduler.add_job(scheduled_watchlist_run, 'cron', hour=16, minute=30)
+    scheduler.add_job(scheduled_prewarm_run, 'cron', hour=PREWARM_HOUR, minute=PREWARM_MINUTE)
     scheduler.start()
 
     # Run Flask app
@@ -0,0 +1,340 @@
+# =============================================================================
+# BACKGROUND ANALYSIS JOB QUEUE
+# Runs long stock/MOAT agent analyses off the request thread
+# =============================================================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ANALYSIS_JOBS_PATH = os.getenv(
+    "ANALYSIS_JOBS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_jobs.db")
+)
+ANALYSIS_MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", "2"))
+
+# A queued/running job not touched for this long belongs to a dead worker and is failed
+JOB_STALE_SECONDS = int(os.getenv("ANALYSIS_JOB_STALE_SECONDS", "900"))
+# Live workers touch their queued and running jobs this often, so only dead ones go stale
+JOB_HEARTBEAT_SECONDS = int(os.getenv("ANALYSIS_JOB_HEARTBEAT_SECONDS", "60"))
+# Longest a synchronous request holds its worker on a job before answering with the job id
+JOB_SYNC_WAIT_SECONDS = int(os.getenv("ANALYSIS_JOB_SYNC_WAIT_SECONDS", "20"))
+JOB_RETENTION_HOURS = int(os.getenv("ANALYSIS_JOB_RETENTION_HOURS", "24"))
+# Streamed job events (model tokens) are written in batches at most this far apart
+JOB_EVENT_FLUSH_SECONDS = float(os.getenv("ANALYSIS_JOB_EVENT_FLUSH_SECONDS", "0.25"))
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('succeeded', 'failed')
+
+
+def _placeholders(values):
+    """'?, ?, ...' for binding each of `values` in an IN (...) list"""
+    return ', '.join('?' * len(values))
+
+
+class AnalysisJobQueue:
+    """
+    Bounded worker pool for agent analyses with job ids and progress tracking.
+
+    Job state lives in a small SQLite file so that any gunicorn worker can
+    answer status polls and so that concurrent requests for the same ticker
+    and analysis kind attach to the job already in flight, even when it was
+    submitted to a different worker.
+    """
+
+    def __init__(self, path=ANALYSIS_JOBS_PATH, max_workers=ANALYSIS_MAX_WORKERS):
+        self.path = path
+        self.max_workers = max_workers
+        self._runners = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self._local = threading.local()
+        self._owned = set()
+        self._owned_lock = threading.Lock()
+        self._heartbeat = None
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL;")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS analysis_jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress TEXT NOT NULL DEFAULT '[]',
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_analysis_jobs_kind_ticker
+                ON analysis_jobs (kind, ticker, status);
+            CREATE TABLE IF NOT EXISTS analysis_job_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+        """)
+
+    def register(self, kind, runner):
+        """
+        Register the function that performs one kind of analysis.
+
+        Args:
+            kind (str): Analysis type, e.g. 'stock' or 'moat'
+            runner: Callable(ticker, report, emit) returning the JSON-serializable
+                result payload; `report(message)` records a progress step and
+                `emit(event, payload)` appends to the job's event stream (see
+                events()). Raising marks the job as failed.
+        """
+        self._runners[kind] = runner
+
+    def submit(self, kind, ticker):
+        """
+        Queue an analysis unless one for the same kind and ticker is in flight.
+
+        Returns:
+            tuple: (job dict, created) where created is False when the request
+                was de-duplicated onto an existing job
+        """
+        if kind not in self._runners:
+            raise ValueError(f"Unknown analysis kind: {kind}")
+
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            self._expire_stale(conn, now)
+            row = conn.execute(
+                f"""
+                SELECT job_id FROM analysis_jobs
+                WHERE kind = ? AND ticker = ? AND status IN ({_placeholders(ACTIVE_STATUSES)}) AND updated_at > ?
+                ORDER BY created_at DESC LIMIT 1;
+                """,
+                (kind, ticker, *ACTIVE_STATUSES, now - JOB_STALE_SECONDS)
+            ).fetchone()
+
+            if row:
+                conn.execute("COMMIT;")
+                return self.get(row['job_id']), False
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                """
+                INSERT INTO analysis_jobs (job_id, kind, ticker, status, progress, created_at, updated_at)
+                VALUES (?, ?, ?, 'queued', ?, ?, ?);
+                """,
+                (job_id, kind, ticker, json.dumps([self._step("Queued")]), now, now)
+            )
+            conn.execute(
+                f"DELETE FROM analysis_jobs WHERE status IN ({_placeholders(FINISHED_STATUSES)}) AND updated_at < ?;",
+                (*FINISHED_STATUSES, now - JOB_RETENTION_HOURS * 3600)
+            )
+            conn.execute(
+                "DELETE FROM analysis_job_events WHERE job_id NOT IN (SELECT job_id FROM analysis_jobs);"
+            )
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+
+        with self._owned_lock:
+            self._owned.add(job_id)
+        self._start_heartbeat()
+        self._executor.submit(self._run, job_id, kind, ticker)
+        return self.get(job_id), True
+
+    def _expire_stale(self, conn, now):
+        """Fail active jobs whose worker stopped sending heartbeats"""
+        conn.execute(
+            f"""
+            UPDATE analysis_jobs SET status = 'failed', error = ?, updated_at = ?
+            WHERE status IN ({_placeholders(ACTIVE_STATUSES)}) AND updated_at <= ?;
+            """,
+            ("Analysis worker stopped responding", now, *ACTIVE_STATUSES, now - JOB_STALE_SECONDS)
+        )
+
+    def _start_heartbeat(self):
+        if self._heartbeat and self._heartbeat.is_alive():
+            return
+        with self._owned_lock:
+            if self._heartbeat and self._heartbeat.is_alive():
+                return
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="analysis-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _heartbeat_loop(self):
+        """Keep this process's queued and running jobs fresh, including ones waiting for a worker"""
+        while True:
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+            with self._owned_lock:
+                owned = list(self._owned)
+            if not owned:
+                continue
+            try:
+                self._connect().execute(
+                    f"""
+                    UPDATE analysis_jobs SET updated_at = ?
+                    WHERE status IN ({_placeholders(ACTIVE_STATUSES)})
+                      AND job_id IN ({_placeholders(owned)});
+                    """,
+                    (time.time(), *ACTIVE_STATUSES, *owned)
+                )
+            except sqlite3.Error as e:
+                print(f"⚠️  Analysis job heartbeat failed: {e}")
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if it is unknown; stale jobs come back failed"""
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM analysis_jobs WHERE job_id = ?;", (job_id,)).fetchone()
+        if not row:
+            return None
+        if row['status'] in ACTIVE_STATUSES and row['updated_at'] <= time.time() - JOB_STALE_SECONDS:
+            self._expire_stale(conn, time.time())
+            row = conn.execute("SELECT * FROM analysis_jobs WHERE job_id = ?;", (job_id,)).fetchone()
+        return {
+            'job_id': row['job_id'],
+            'kind': row['kind'],
+            'ticker': row['ticker'],
+            'status': row['status'],
+            'progress': json.loads(row['progress']),
+            'data': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+        }
+
+    def wait(self, job_id, timeout=JOB_SYNC_WAIT_SECONDS, poll_interval=1.0):
+        """
+        Block until the job finishes or `timeout` seconds pass.
+
+        Returns:
+            dict: The job, still 'queued' or 'running' if the timeout expired
+        """
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return job
+            if deadline and time.time() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+    def events(self, job_id, after=0):
+        """
+        Events a job's runner emitted, in order.
+
+        Args:
+            after (int): Sequence number of the last event already seen
+
+        Returns:
+            list: (seq, event, payload) tuples with seq > after
+        """
+        rows = self._connect().execute(
+            "SELECT seq, event, payload FROM analysis_job_events WHERE job_id = ? AND seq > ? ORDER BY seq;",
+            (job_id, after)
+        ).fetchall()
+        return [(row['seq'], row['event'], json.loads(row['payload'])) for row in rows]
+
+    @staticmethod
+    def _step(message):
+        return {'time': time.time(), 'message': message}
+
+    def _report(self, job_id, message):
+        conn = self._connect()
+        row = conn.execute("SELECT progress FROM analysis_jobs WHERE job_id = ?;", (job_id,)).fetchone()
+        progress = json.loads(row['progress']) if row else []
+        progress.append(self._step(message))
+        conn.execute(
+            "UPDATE analysis_jobs SET progress = ?, updated_at = ? WHERE job_id = ?;",
+            (json.dumps(progress), time.time(), job_id)
+        )
+
+    def _finish(self, job_id, status, result=None, error=None):
+        self._report(job_id, "Completed" if status == 'succeeded' else f"Failed: {error}")
+        self._connect().execute(
+            "UPDATE analysis_jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE job_id = ?;",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+        )
+
+    def _run(self, job_id, kind, ticker):
+        self._connect().execute(
+            "UPDATE analysis_jobs SET status = 'running', updated_at = ? WHERE job_id = ?;",
+            (time.time(), job_id)
+        )
+        self._report(job_id, f"Running {kind} analysis for {ticker}")
+
+        writer = _EventWriter(self, job_id)
+        try:
+            result = self._runners[kind](ticker, lambda message: self._report(job_id, message), writer.emit)
+            writer.flush()
+            self._finish(job_id, 'succeeded', result=result)
+            print(f"✅ Job {job_id[:8]} ({kind} {ticker}) finished")
+        except Exception as e:
+            writer.flush()
+            self._finish(job_id, 'failed', error=str(e))
+            print(f"❌ Job {job_id[:8]} ({kind} {ticker}) failed: {e}")
+        finally:
+            with self._owned_lock:
+                self._owned.discard(job_id)
+
+
+class _EventWriter:
+    """
+    Appends one job's emitted events to analysis_job_events.
+
+    Consecutive tokens are merged and written every JOB_EVENT_FLUSH_SECONDS,
+    so a streamed analysis costs a few writes a second rather than one per
+    token. Any other event is written straight away with the tokens before it.
+    """
+
+    def __init__(self, job_queue, job_id):
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self._seq = 0
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def emit(self, event, payload):
+        if event == 'token' and self._pending and self._pending[-1][0] == 'token':
+            self._pending[-1] = ('token', self._pending[-1][1] + payload)
+        else:
+            self._pending.append((event, payload))
+        if event != 'token' or time.monotonic() - self._last_flush >= JOB_EVENT_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        rows = []
+        for event, payload in self._pending:
+            self._seq += 1
+            rows.append((self.job_id, self._seq, event, json.dumps(payload)))
+        self._pending = []
+        conn = self.job_queue._connect()
+        try:
+            conn.execute("BEGIN;")
+            conn.executemany(
+                "INSERT INTO analysis_job_events (job_id, seq, event, payload) VALUES (?, ?, ?, ?);",
+                rows
+            )
+            conn.execute("COMMIT;")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK;")
+            print(f"⚠️  Could not record events for job {self.job_id[:8]}: {e}")
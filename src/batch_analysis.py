@@ -0,0 +1,233 @@
+# =============================================================================
+# CONCURRENT BATCH ANALYSIS
+# Runs stock analyses for many tickers in parallel, persisting each result as
+# it completes and checkpointing progress so an interrupted batch can resume
+#
+# Usage (from src/):
+#     python batch_analysis.py AAPL MSFT NVDA [--parallelism 4] [--checkpoint path]
+# =============================================================================
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from db_utils import insert_agent_output, insert_failed_run_telemetry
+from stock_agent import analyze_and_parse_stock, build_agent_output
+
+BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", "3"))
+BATCH_CHECKPOINT_PATH = os.getenv(
+    "BATCH_CHECKPOINT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch_checkpoint.json")
+)
+# Completed tickers older than this are analyzed again on resume
+BATCH_CHECKPOINT_MAX_AGE_HOURS = int(os.getenv("BATCH_CHECKPOINT_MAX_AGE_HOURS", "24"))
+
+
+def iter_concurrent(items, work, parallelism=BATCH_PARALLELISM):
+    """
+    Run work(item) for each item with at most `parallelism` in flight.
+
+    Upstream limits are enforced inside the work itself (Bedrock and search
+    pacers), so parallelism only bounds how many analyses are started.
+
+    Yields:
+        tuple: (item, result, error) in completion order; error is the
+            exception raised by work(item), or None
+    """
+    items = list(items)
+    parallelism = max(1, parallelism)
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="batch") as executor:
+        pending = {}
+        next_index = 0
+
+        while next_index < len(items) or pending:
+            while next_index < len(items) and len(pending) < parallelism:
+                item = items[next_index]
+                pending[executor.submit(work, item)] = item
+                next_index += 1
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    yield item, future.result(), None
+                except Exception as e:
+                    yield item, None, e
+
+
+def normalize_tickers(tickers):
+    """Upper-cased ticker symbols in order, without blanks or duplicates"""
+    return list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+
+
+def batch_key(tickers) -> str:
+    """Checkpoint key of a batch: the same tickers in any order share it"""
+    return hashlib.sha1(",".join(sorted(tickers)).encode('utf-8')).hexdigest()[:12]
+
+
+class BatchCheckpoint:
+    """
+    JSON record of finished tickers, rewritten atomically after every one.
+
+    One file holds every batch, each under its batch_key(), so concurrent
+    batches (e.g. the CLI and analyze_multiple_stocks) keep their own
+    progress. Every update re-reads the file under an exclusive lock on
+    `<path>.lock`, so batches in other processes are never overwritten.
+    """
+
+    def __init__(self, path=BATCH_CHECKPOINT_PATH, key='default'):
+        self.path = path
+        self.key = key
+        self._lock = threading.Lock()
+        self.completed = self._read().get(key, {})
+
+    def _read(self) -> dict:
+        """Every batch's completions, by batch key"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f).get('batches', {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable batch checkpoint {self.path}: {e}")
+            return {}
+
+    def _update(self, change):
+        """Apply change(batches) to the stored batches under the file lock and rewrite the file"""
+        with self._lock, open(f"{self.path}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            batches = self._read()
+            change(batches)
+            if not batches:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'updated_at': datetime.now().isoformat(), 'batches': batches}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def is_done(self, ticker) -> bool:
+        """Whether the ticker succeeded recently enough to skip on resume"""
+        entry = self.completed.get(ticker)
+        if not entry or not entry.get('success'):
+            return False
+        age = time.time() - entry.get('finished_at', 0)
+        return age < BATCH_CHECKPOINT_MAX_AGE_HOURS * 3600
+
+    def record(self, ticker, success, error=None, duration=None):
+        entry = {
+            'success': success,
+            'error': error,
+            'duration': duration,
+            'finished_at': time.time()
+        }
+        self.completed[ticker] = entry
+        self._update(lambda batches: batches.setdefault(self.key, {}).__setitem__(ticker, entry))
+
+    def clear(self):
+        """Forget this batch's progress, leaving other batches alone"""
+        self.completed = {}
+        self._update(lambda batches: batches.pop(self.key, None))
+
+
+def analyze_and_store(ticker):
+    """Analyze one ticker and persist it; raises if the analysis fails"""
+    result = analyze_and_parse_stock(ticker, verbose=False)
+    if not result.get('success'):
+        insert_failed_run_telemetry(ticker, 'stock', result.get('telemetry'), result.get('error'))
+        raise RuntimeError(result.get('error', 'Agent analysis failed'))
+    insert_agent_output(ticker, build_agent_output(ticker, result), telemetry=result.get('telemetry'))
+    return result
+
+
+def run_batch(tickers, parallelism=BATCH_PARALLELISM, checkpoint_path=BATCH_CHECKPOINT_PATH, work=analyze_and_store):
+    """
+    Analyze tickers concurrently, streaming one completion per ticker.
+
+    Tickers the checkpoint marks as recently completed are skipped, so
+    re-running the same batch after a crash picks up where it stopped.
+    The batch's checkpoint entry is removed once every ticker has succeeded.
+
+    Args:
+        tickers (list): Ticker symbols to analyze
+        parallelism (int): Analyses in flight at once
+        checkpoint_path (str): Progress file, or None to disable resume
+        work: Callable(ticker) performing and persisting one analysis
+
+    Yields:
+        dict: {'ticker', 'success', 'error', 'duration', 'skipped', 'result'}
+    """
+    tickers = normalize_tickers(tickers)
+    checkpoint = BatchCheckpoint(checkpoint_path, batch_key(tickers)) if checkpoint_path else None
+
+    remaining = []
+    for ticker in tickers:
+        if checkpoint and checkpoint.is_done(ticker):
+            yield {'ticker': ticker, 'success': True, 'error': None, 'duration': 0, 'skipped': True, 'result': None}
+        else:
+            remaining.append(ticker)
+
+    started = {}
+
+    def timed_work(ticker):
+        started[ticker] = time.time()
+        return work(ticker)
+
+    all_succeeded = True
+    for ticker, result, error in iter_concurrent(remaining, timed_work, parallelism):
+        duration = time.time() - started.get(ticker, time.time())
+        success = error is None
+        all_succeeded = all_succeeded and success
+        if checkpoint:
+            checkpoint.record(ticker, success, error=str(error) if error else None, duration=duration)
+        yield {
+            'ticker': ticker,
+            'success': success,
+            'error': str(error) if error else None,
+            'duration': duration,
+            'skipped': False,
+            'result': result
+        }
+
+    if checkpoint and all_succeeded:
+        checkpoint.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run stock analyses for many tickers concurrently')
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--parallelism', type=int, default=BATCH_PARALLELISM)
+    parser.add_argument('--checkpoint', default=BATCH_CHECKPOINT_PATH,
+                        help='Progress file used to resume an interrupted batch')
+    parser.add_argument('--fresh', action='store_true', help='Ignore any existing checkpoint')
+    args = parser.parse_args()
+
+    if args.fresh:
+        BatchCheckpoint(args.checkpoint, batch_key(normalize_tickers(args.tickers))).clear()
+
+    print(f"🎯 BATCH ANALYSIS: {len(args.tickers)} stocks, {args.parallelism} at a time")
+    start = time.time()
+    succeeded = 0
+
+    for completion in run_batch(args.tickers, parallelism=args.parallelism, checkpoint_path=args.checkpoint):
+        if completion['skipped']:
+            print(f"⏭️  {completion['ticker']}: already completed, skipping")
+            succeeded += 1
+        elif completion['success']:
+            print(f"✅ {completion['ticker']}: stored in {completion['duration']:.1f}s")
+            succeeded += 1
+        else:
+            print(f"❌ {completion['ticker']}: {completion['error']}")
+
+    print(f"🏆 BATCH COMPLETE: {succeeded}/{len(args.tickers)} successful in {time.time() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
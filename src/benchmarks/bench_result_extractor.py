@@ -0,0 +1,108 @@
+# =============================================================================
+# RESULT EXTRACTOR BENCHMARK
+# Times DuckDuckGo result extraction over saved pages and checks its output
+# against the original full-soup extraction.
+#
+# Usage (from src/):
+#     python benchmarks/bench_result_extractor.py [--iterations 50] [--max-ms 5]
+# =============================================================================
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+import result_extractor
+from result_extractor import ResultExtractor
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+
+def legacy_extract(html, num_results):
+    """The original html.parser + select_one extraction from strategic_web_search"""
+    soup = BeautifulSoup(html, 'html.parser')
+    search_results = []
+    for selector in ['.result', '.links_main', '.result__body', 'div[class*="result"]']:
+        found_results = soup.select(selector)
+        if found_results:
+            search_results = found_results
+            break
+
+    results = []
+    for result in search_results[:num_results]:
+        title = None
+        for title_sel in ['.result__title a', '.result__a', 'h2 a', 'h3 a', 'a']:
+            title_elem = result.select_one(title_sel)
+            if title_elem:
+                title = title_elem.get_text().strip()
+                if len(title) > 10:
+                    break
+
+        snippet = None
+        for snippet_sel in ['.result__snippet', '.result__body', '.snippet', 'p']:
+            snippet_elem = result.select_one(snippet_sel)
+            if snippet_elem:
+                snippet = snippet_elem.get_text().strip()
+                if len(snippet) > 30:
+                    break
+
+        url_elem = result.select_one('a[href]')
+        url = url_elem.get('href', '') if url_elem else ''
+
+        if title and snippet and len(snippet) > 30:
+            results.append((title, snippet, url))
+    return results
+
+
+def time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DuckDuckGo result extraction')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--num-results', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='Fail if the extractor exceeds this many ms per page')
+    args = parser.parse_args()
+
+    print(f"Parser backend: {'lxml streaming' if result_extractor.LXML_AVAILABLE else 'html.parser fallback'}")
+    failed = False
+
+    for name in sorted(os.listdir(PAGES_DIR)):
+        if not name.endswith('.html'):
+            continue
+        with open(os.path.join(PAGES_DIR, name), 'rb') as f:
+            html = f.read()
+
+        expected = legacy_extract(html, args.num_results)
+        actual, selector = ResultExtractor().extract(html, args.num_results)
+        if actual != expected:
+            print(f"❌ {name}: extractor returned {len(actual)} results, legacy returned {len(expected)}")
+            failed = True
+            continue
+
+        warm = ResultExtractor()
+        warm.extract(html, args.num_results)
+        legacy_ms = time_per_call(lambda: legacy_extract(html, args.num_results), args.iterations)
+        new_ms = time_per_call(lambda: warm.extract(html, args.num_results), args.iterations)
+
+        print(f"✅ {name}: {len(actual)} results via {selector} | "
+              f"legacy {legacy_ms:.2f} ms | extractor {new_ms:.2f} ms | {legacy_ms / new_ms:.1f}x")
+
+        if args.max_ms is not None and new_ms > args.max_ms:
+            print(f"❌ {name}: {new_ms:.2f} ms exceeds --max-ms {args.max_ms}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
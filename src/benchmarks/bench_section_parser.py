@@ -0,0 +1,150 @@
+# =============================================================================
+# SECTION PARSER BENCHMARK
+# Times stock analysis section splitting and metric extraction over the stored
+# agent_output_cache.json corpus and checks the output against the original
+# marker-by-marker parser.
+#
+# Usage (from src/):
+#     python benchmarks/bench_section_parser.py [--iterations 500] [--max-ms 1]
+# =============================================================================
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from section_parser import parse_stock_output
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'agent_output_cache.json')
+
+
+def legacy_parse(analysis_text):
+    """The original str.find-per-marker split from parse_stock_analysis"""
+    section_positions = {}
+    markers = [
+        '## Executive Summary',
+        '## 🐂 BULL CASE',
+        '## 🐻 BEAR CASE',
+        '## 📊 INVESTMENT TAKEAWAY',
+        '## 🔍 SEARCH INTEGRATION SUMMARY',
+        '## 🤔 ANALYTICAL REASONING'
+    ]
+    for marker in markers:
+        pos = analysis_text.find(marker)
+        if pos != -1:
+            section_positions[marker] = pos
+
+    end = len(analysis_text)
+    section_1_part1 = analysis_text[section_positions.get('## Executive Summary', 0):
+                                    section_positions.get('## 🐂 BULL CASE', end)].strip()
+    section_1_part2 = analysis_text[section_positions.get('## 🔍 SEARCH INTEGRATION SUMMARY', end):
+                                    section_positions.get('## 🤔 ANALYTICAL REASONING', end)].strip()
+    company_info = f"{section_1_part1}\n\n{section_1_part2}".strip()
+    bull_case = analysis_text[section_positions.get('## 🐂 BULL CASE', end):
+                              section_positions.get('## 🐻 BEAR CASE', end)].strip()
+    bear_case = analysis_text[section_positions.get('## 🐻 BEAR CASE', end):
+                              section_positions.get('## 📊 INVESTMENT TAKEAWAY', end)].strip()
+    section_4_part1 = analysis_text[section_positions.get('## 📊 INVESTMENT TAKEAWAY', end):
+                                    section_positions.get('## 🔍 SEARCH INTEGRATION SUMMARY', end)].strip()
+    section_4_part2 = analysis_text[section_positions.get('## 🤔 ANALYTICAL REASONING', end):].strip()
+    analytical_reasoning = f"{section_4_part1}\n\n{section_4_part2}".strip()
+
+    def clean_section(text):
+        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
+        return text.strip()
+
+    return {
+        'company_info': clean_section(company_info),
+        'bull_case': clean_section(bull_case),
+        'bear_case': clean_section(bear_case),
+        'analytical_reasoning': clean_section(analytical_reasoning),
+        'raw_text': analysis_text
+    }
+
+
+def legacy_metrics(company_info_section):
+    """The original one-re.search-per-metric extract_key_metrics"""
+    metrics = {}
+    patterns = {
+        'current_price': r'Current Price[:\s]*\$?([\d,]+\.?\d*)',
+        'market_cap': r'Market Cap[:\s]*\$?([\d,]+\.?\d*)\s*(trillion|billion|million)?',
+        'pe_ratio': r'P/E Ratio[:\s]*([\d,]+\.?\d*)',
+        'revenue_growth': r'Revenue Growth[:\s]*([\d,]+\.?\d*)%?',
+        'profit_margin': r'Profit Margin[:\s]*([\d,]+\.?\d*)%?',
+        'dividend_yield': r'Dividend Yield[:\s]*([\d,]+\.?\d*)%?',
+        'analyst_rating': r'Analyst Rating[:\s]*([A-Za-z\s]+)',
+        'year_high': r'52-Week.*?[\$\s]*([\d,]+\.?\d*).*?-.*?\$?([\d,]+\.?\d*)',
+        'price_change_1y': r'1-Year Price Change[:\s]*[+\-]?([\d,]+\.?\d*)%?'
+    }
+    for metric_name, pattern in patterns.items():
+        match = re.search(pattern, company_info_section, re.IGNORECASE)
+        if match:
+            if metric_name == 'year_high':
+                metrics['year_low'] = match.group(1)
+                metrics['year_high'] = match.group(2)
+            else:
+                metrics[metric_name] = match.group(1).strip()
+    return metrics
+
+
+def legacy_parse_and_extract(text):
+    sections = legacy_parse(text)
+    return sections, legacy_metrics(sections['company_info'])
+
+
+def time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark agent output section parsing')
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--corpus', default=CORPUS_PATH)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='Fail if the parser exceeds this many ms per analysis')
+    args = parser.parse_args()
+
+    with open(args.corpus, 'r') as f:
+        corpus = json.load(f)
+
+    failed = False
+    legacy_total = new_total = 0.0
+
+    for ticker, entry in sorted(corpus.items()):
+        text = entry.get('output', {}).get('sections', {}).get('raw_text')
+        if not text:
+            continue
+
+        expected = legacy_parse_and_extract(text)
+        actual = parse_stock_output(text)
+        if actual != expected:
+            print(f"❌ {ticker}: sections or metrics differ from the legacy parser")
+            failed = True
+            continue
+
+        legacy_ms = time_per_call(lambda: legacy_parse_and_extract(text), args.iterations)
+        new_ms = time_per_call(lambda: parse_stock_output(text), args.iterations)
+        legacy_total += legacy_ms
+        new_total += new_ms
+
+        print(f"✅ {ticker}: {len(text)} chars, {len(actual[1])} metrics | "
+              f"legacy {legacy_ms:.3f} ms | single-pass {new_ms:.3f} ms | {legacy_ms / new_ms:.1f}x")
+
+        if args.max_ms is not None and new_ms > args.max_ms:
+            print(f"❌ {ticker}: {new_ms:.3f} ms exceeds --max-ms {args.max_ms}")
+            failed = True
+
+    if new_total:
+        print(f"Total: legacy {legacy_total:.3f} ms | single-pass {new_total:.3f} ms | {legacy_total / new_total:.1f}x")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
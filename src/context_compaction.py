@@ -0,0 +1,161 @@
+# =============================================================================
+# PROMPT CONTEXT COMPACTION
+# Turns several strategic_web_search outputs into one deduplicated, budgeted
+# block of evidence before it is placed in an agent prompt
+# =============================================================================
+
+import os
+import re
+import urllib.parse
+
+MOAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("MOAT_CONTEXT_TOKEN_BUDGET", "2500"))
+COMPETITOR_TOOL_TOKEN_BUDGET = int(os.getenv("COMPETITOR_TOOL_TOKEN_BUDGET", "1500"))
+
+# Rough English average for Claude tokenization; only used for budgeting
+CHARS_PER_TOKEN = 4
+MAX_SNIPPET_CHARS = 400
+# Snippets sharing this fraction of word shingles with a kept one are dropped
+NEAR_DUPLICATE_THRESHOLD = 0.6
+SHINGLE_SIZE = 3
+
+# One numbered result as rendered by strategic_web_search
+_RESULT_RE = re.compile(
+    r'^\d+\. (?P<title>[^\n]*)\n   (?P<text>.*?)\n   (?P<trailer>(?:URL|Source): [^\n]*)$',
+    re.M | re.S
+)
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Canned fallback text carries no evidence about the company
+BOILERPLATE_SOURCES = ('Knowledge Base',)
+TRACKING_PARAMS = {'ref', 'rut', 'fbclid', 'gclid'}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a result URL (unwraps DuckDuckGo redirect links)"""
+    url = url.strip()
+    if not url:
+        return ''
+    if url.startswith('//'):
+        url = 'https:' + url
+
+    parsed = urllib.parse.urlparse(url)
+    if parsed.netloc.endswith('duckduckgo.com') and parsed.path.startswith('/l/'):
+        target = urllib.parse.parse_qs(parsed.query).get('uddg')
+        if target:
+            parsed = urllib.parse.urlparse(target[0])
+
+    query = [
+        (key, value) for key, value in urllib.parse.parse_qsl(parsed.query)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return f"{host}{parsed.path.rstrip('/')}" + (f"?{urllib.parse.urlencode(query)}" if query else '')
+
+
+def parse_search_results(text: str) -> list:
+    """
+    Split strategic_web_search output into result entries, dropping the
+    status header and knowledge-base fallback text.
+
+    Returns:
+        list: dicts with 'title', 'text' and 'url' (may be empty)
+    """
+    entries = []
+    for match in _RESULT_RE.finditer(text or ''):
+        trailer = match.group('trailer')
+        if any(source in trailer for source in BOILERPLATE_SOURCES):
+            continue
+        entries.append({
+            'title': match.group('title').strip(),
+            'text': _WHITESPACE_RE.sub(' ', match.group('text')).strip(),
+            'url': trailer[len('URL: '):].strip() if trailer.startswith('URL: ') else '',
+        })
+    return entries
+
+
+def _shingles(text):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _is_near_duplicate(shingles, kept):
+    for other in kept:
+        overlap = len(shingles & other)
+        if overlap and overlap / len(shingles | other) >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+
+def _truncate(text, limit=MAX_SNIPPET_CHARS):
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(' ', 1)[0]
+    return f"{cut}..."
+
+
+def compact_search_results(searches, token_budget=MOAT_CONTEXT_TOKEN_BUDGET, label="Search context"):
+    """
+    Merge search outputs into compact, deduplicated evidence within a token budget.
+
+    Results are taken round-robin across queries, best rank first, so every
+    query keeps its top findings before any query contributes a second one.
+
+    Args:
+        searches (list): (query, strategic_web_search output) pairs
+        token_budget (int): Approximate token ceiling for the returned text
+        label (str): Name used in the compaction log line
+
+    Returns:
+        str: "Query: ..." blocks of "- title: snippet (url)" lines
+    """
+    parsed = [(query, parse_search_results(text)) for query, text in searches]
+    raw_tokens = sum(estimate_tokens(text or '') for _, text in searches)
+
+    seen_urls = set()
+    kept_shingles = []
+    selected = {query: [] for query, _ in parsed}
+    used_tokens = 0
+    duplicates = 0
+    budget_reached = False
+
+    depth = max((len(entries) for _, entries in parsed), default=0)
+    for rank in range(depth):
+        for query, entries in parsed:
+            if rank >= len(entries):
+                continue
+            entry = entries[rank]
+
+            url_key = normalize_url(entry['url'])
+            shingles = _shingles(f"{entry['title']} {entry['text']}")
+            if (url_key and url_key in seen_urls) or _is_near_duplicate(shingles, kept_shingles):
+                duplicates += 1
+                continue
+
+            line = f"- {entry['title']}: {_truncate(entry['text'])}"
+            if entry['url']:
+                line += f" ({url_key})"
+            line_tokens = estimate_tokens(line)
+            if used_tokens + line_tokens > token_budget:
+                budget_reached = True
+                continue
+
+            used_tokens += line_tokens
+            selected[query].append(line)
+            kept_shingles.append(shingles)
+            if url_key:
+                seen_urls.add(url_key)
+
+    blocks = [f"Query: {query}\n" + "\n".join(lines) for query, lines in selected.items() if lines]
+    compacted = "\n\n".join(blocks)
+    print(f"🗜️  {label}: ~{raw_tokens} → ~{estimate_tokens(compacted)} tokens "
+          f"({duplicates} duplicates removed{', budget reached' if budget_reached else ''})")
+    return compacted
@@ -1,168 +1,1092 @@
 import psycopg2
+import base64
 import os
 import json
+import itertools
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from pathlib import Path
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+
+from payload_codec import encode_stock_output, decode_stock_output, encode_sections, decode_sections
+from section_parser import thesis_points
 load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env")
 
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+# Arbitrary key so only one gunicorn worker applies migrations at a time
+MIGRATIONS_LOCK_KEY = 461_026
+
+# Connection pool sizing, per process (each gunicorn worker has its own pool).
+# psycopg2 keeps at most DB_POOL_MIN_CONN idle connections open; connections
+# beyond that are closed when returned
+DB_POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN_CONN", "4"))
+DB_POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX_CONN", "10"))
+# Seconds to wait for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Connections idle longer than this are pinged before being handed out
+DB_POOL_HEALTHCHECK_SECONDS = int(os.getenv("DB_POOL_HEALTHCHECK_SECONDS", "30"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+# Disable when connecting through a transaction-mode pooler (e.g. pgbouncer),
+# which cannot keep session-level prepared statements
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() == "true"
+
+# In-process cache of the latest analysis per ticker. Inserts in this worker
+# refresh it immediately; other workers' inserts show up within the TTL
+LATEST_ANALYSIS_CACHE_SIZE = int(os.getenv("LATEST_ANALYSIS_CACHE_SIZE", "256"))
+LATEST_ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("LATEST_ANALYSIS_CACHE_TTL_SECONDS", "300"))
+# Rows per INSERT statement in the bulk backfill helpers
+BULK_INSERT_PAGE_SIZE = int(os.getenv("BULK_INSERT_PAGE_SIZE", "200"))
+# Analyses older than this are treated as missing
+MAX_ANALYSIS_AGE_DAYS = 1000
+
+def _connection_params():
+    return dict(dbname=os.getenv("DB_NAME"),
+                user=os.getenv("DB_USER"),
+                password=os.getenv("DB_PASSWORD"),
+                host=os.getenv("DB_HOST"),
+                port=os.getenv("DB_PORT"),
+                connect_timeout=DB_CONNECT_TIMEOUT,
+                keepalives=1,
+                keepalives_idle=30)
+
 def get_connection():
-    return psycopg2.connect(dbname=os.getenv("DB_NAME"),
-                            user=os.getenv("DB_USER"),
-                            password=os.getenv("DB_PASSWORD"),
-                            host=os.getenv("DB_HOST"),
-                            port=os.getenv("DB_PORT"))
+    """Open a standalone connection outside the pool (caller closes it)"""
+    return psycopg2.connect(**_connection_params())
 
-def insert_ticker_if_not_exists(ticker):
-    conn = get_connection()
-    cur = conn.cursor()
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL connection pool with health checks.
+
+    Wraps psycopg2's ThreadedConnectionPool, which raises as soon as it is
+    exhausted, so that callers wait up to DB_POOL_TIMEOUT for a connection
+    instead. Connections that sat idle are pinged before reuse and replaced
+    if the server dropped them. The pool is created lazily and again after a
+    fork, so worker processes never share sockets.
+    """
+
+    def __init__(self, minconn=DB_POOL_MIN_CONN, maxconn=DB_POOL_MAX_CONN,
+                 healthcheck_seconds=DB_POOL_HEALTHCHECK_SECONDS, timeout=DB_POOL_TIMEOUT):
+        self.minconn = minconn
+        self.maxconn = max(maxconn, minconn, 1)
+        self.healthcheck_seconds = healthcheck_seconds
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._pool = None
+        self._pid = None
+        self._last_used = weakref.WeakKeyDictionary()
+        self._prepared = weakref.WeakKeyDictionary()
+        # Pools inherited across a fork are kept referenced, never closed,
+        # so the child cannot tear down connections its parent still uses
+        self._inherited = []
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                if self._pool is not None:
+                    self._inherited.append(self._pool)
+                    self._slots = threading.BoundedSemaphore(self.maxconn)
+                self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, **_connection_params())
+                self._pid = os.getpid()
+                self._last_used = weakref.WeakKeyDictionary()
+                self._prepared = weakref.WeakKeyDictionary()
+            return self._pool
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        idle = time.time() - self._last_used.get(conn, 0)
+        if idle < self.healthcheck_seconds:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Borrow a healthy connection; must be returned with putconn()"""
+        slots = self._slots
+        if not slots.acquire(timeout=self.timeout):
+            raise PoolError(f"No database connection free after {self.timeout}s")
+        try:
+            pool = self._get_pool()
+            # After a server restart every pooled connection may be dead
+            for _ in range(self.maxconn + 1):
+                conn = pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                print("⚠️ Replacing dropped database connection")
+                pool.putconn(conn, close=True)
+            raise psycopg2.OperationalError("Could not obtain a healthy database connection")
+        except Exception:
+            slots.release()
+            raise
+
+    def putconn(self, conn, discard=False):
+        """Return a borrowed connection, closing it if it is broken"""
+        pool = self._get_pool()
+        try:
+            if discard or conn.closed:
+                pool.putconn(conn, close=True)
+            else:
+                self._last_used[conn] = time.time()
+                try:
+                    pool.putconn(conn)
+                except psycopg2.Error:
+                    # Rolling back a connection that died mid-transaction
+                    pool.putconn(conn, close=True)
+        except PoolError:
+            # Borrowed before a fork from a pool this process has replaced;
+            # its slot belongs to the old semaphore, so just drop it
+            return
+        self._slots.release()
+
+    def prepared_statements(self, conn):
+        """Names of the statements already prepared on this connection's session"""
+        with self._lock:
+            return self._prepared.setdefault(conn, set())
+
+    def closeall(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.closeall()
+            self._pool = None
+            self._last_used = weakref.WeakKeyDictionary()
+
+
+db_pool = ConnectionPool()
+
+@contextmanager
+def db_cursor():
+    """
+    Cursor on a pooled connection.
+
+    Commits when the block finishes, rolls back if it raises, and discards
+    the connection when the error means it is no longer usable.
+    """
+    conn = db_pool.getconn()
+    discard = False
     try:
-        cur.execute(
-            "INSERT INTO tickers (ticker) VALUES (%s) ON CONFLICT (ticker) DO NOTHING;",
-            (ticker,)
-        )
+        with conn.cursor() as cur:
+            yield cur
         conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        discard = True
+        raise
+    except Exception:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            discard = True
+        raise
     finally:
-        cur.close()
-        conn.close()
+        db_pool.putconn(conn, discard=discard)
 
-def insert_agent_output(ticker, agent_output, model_used='bedrock'):
-    insert_ticker_if_not_exists(ticker)
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT id FROM tickers WHERE ticker = %s;", (ticker,))
-        ticker_id = cur.fetchone()[0]
+class LatestAnalysisCache:
+    """
+    Bounded LRU of the latest stored analysis per (kind, ticker), with a TTL.
+
+    Entries are the dicts fetch_latest_agent_output / fetch_latest_moat_analysis
+    return; callers get a shallow copy and must not mutate nested values.
+    Missing analyses are not cached, so a ticker analyzed by another worker
+    is found on the next lookup.
+    """
+
+    def __init__(self, max_entries=LATEST_ANALYSIS_CACHE_SIZE, ttl_seconds=LATEST_ANALYSIS_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, ticker):
+        """The cached analysis, or None on a miss or expired entry"""
+        key = (kind, ticker)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
 
-        sections = agent_output.get("sections", {})
+    def put(self, kind, ticker, value):
+        if self.max_entries <= 0 or not isinstance(value, dict):
+            return
+        key = (kind, ticker)
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, kind, ticker):
+        with self._lock:
+            self._entries.pop((kind, ticker), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
 
+
+latest_analysis_cache = LatestAnalysisCache()
+
+def apply_migrations():
+    """Apply any migrations/*.sql files not yet recorded in schema_migrations, in name order."""
+    with db_cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATIONS_LOCK_KEY,))
         cur.execute(
             """
-            INSERT INTO agent_outputs (
-                ticker_id, raw_output, duration, search_calls, timestamp,
-                executive_summary, bull_case, bear_case, investment_takeaway,
-                analytical_reasoning, search_summary, model_used, created_at
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
-            """,
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+            );
+            """
+        )
+        cur.execute("SELECT name FROM schema_migrations;")
+        applied = {row[0] for row in cur.fetchall()}
+
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            if path.name in applied:
+                continue
+            print(f"🛠️ Applying migration {path.name}")
+            cur.execute(path.read_text())
+            cur.execute("INSERT INTO schema_migrations (name) VALUES (%s);", (path.name,))
+
+# Hot-path statements, prepared once per pooled connection. Each write
+# upserts the ticker and inserts the row in one statement; the no-op
+# DO UPDATE makes RETURNING yield the id even when the ticker already exists.
+STATEMENTS = {
+    "latest_agent_output": """
+        SELECT o.raw_output, o.payload, o.payload_codec, o.timestamp, o.created_at
+        FROM tickers t
+        JOIN agent_outputs o ON o.ticker_id = t.id
+        WHERE t.ticker = %s
+        ORDER BY o.timestamp DESC
+        LIMIT 1
+    """,
+    "latest_moat_analysis": """
+        SELECT m.analysis, m.payload, m.payload_codec, m.duration, m.generated_at
+        FROM tickers t
+        JOIN moat_analysis m ON m.ticker_id = t.id
+        WHERE t.ticker = %s
+        ORDER BY m.generated_at DESC
+        LIMIT 1
+    """,
+    "insert_agent_output": """
+        WITH ticker_row AS (
+            INSERT INTO tickers (ticker) VALUES (%s)
+            ON CONFLICT (ticker) DO UPDATE SET ticker = EXCLUDED.ticker
+            RETURNING id
+        )
+        INSERT INTO agent_outputs (
+            ticker_id, payload, payload_codec, duration, search_calls, timestamp,
+            executive_summary, bull_points, bear_points, model_used, created_at, telemetry
+        )
+        VALUES ((SELECT id FROM ticker_row), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING timestamp, created_at
+    """,
+    "insert_moat_analysis": """
+        WITH ticker_row AS (
+            INSERT INTO tickers (ticker) VALUES (%s)
+            ON CONFLICT (ticker) DO UPDATE SET ticker = EXCLUDED.ticker
+            RETURNING id
+        )
+        INSERT INTO moat_analysis (
+            ticker_id, duration, payload, payload_codec, executive_summary, model_used,
+            generated_at, telemetry
+        )
+        VALUES ((SELECT id FROM ticker_row), %s, %s, %s, %s, %s, %s, %s)
+        RETURNING ticker_id, generated_at
+    """,
+}
+
+def _positional(statement):
+    """Rewrite %s placeholders as $1, $2, ... for PREPARE"""
+    counter = itertools.count(1)
+    return re.sub(r'%s', lambda _: f"${next(counter)}", statement)
+
+def execute_statement(cur, name, params):
+    """
+    Run one of STATEMENTS, as a server-side prepared statement when enabled.
+
+    The statement is prepared the first time a pooled connection runs it,
+    so later calls skip parsing and planning on the server.
+    """
+    if not DB_PREPARED_STATEMENTS:
+        cur.execute(STATEMENTS[name], params)
+        return
+
+    prepared = db_pool.prepared_statements(cur.connection)
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {_positional(STATEMENTS[name])};")
+        prepared.add(name)
+    try:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))});", params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        # The session was reset underneath us; prepare again next time
+        prepared.clear()
+        raise
+
+def insert_ticker_if_not_exists(ticker):
+    with db_cursor() as cur:
+        cur.execute(
+            "INSERT INTO tickers (ticker) VALUES (%s) ON CONFLICT (ticker) DO NOTHING;",
+            (ticker,)
+        )
+
+def _agent_output_record(raw_output, timestamp, created_at):
+    """Stored agent output with its timestamps, as the latest-analysis reads return it"""
+    # Use timestamp if available, otherwise use created_at
+    analysis_time = timestamp if timestamp else created_at
+    if isinstance(raw_output, dict):
+        raw_output['timestamp'] = analysis_time.isoformat() if analysis_time else None
+        raw_output['created_at'] = created_at.isoformat() if created_at else None
+    return raw_output
+
+def _stock_output(raw_output, payload, codec):
+    """Stored agent output from its compressed payload, or the legacy raw_output column"""
+    if payload is not None:
+        return decode_stock_output(codec, payload)
+    return raw_output
+
+def _moat_sections(analysis, payload, codec):
+    """Stored MOAT sections from their compressed payload, or the legacy analysis column"""
+    if payload is not None:
+        return decode_sections(codec, payload)
+    return analysis
+
+def _stock_headlines(agent_output):
+    """Bull and bear point headlines of an agent output, as JSON for the history columns"""
+    sections = agent_output.get('sections') or {}
+    return json.dumps(thesis_points(sections.get('bull_case'))), json.dumps(thesis_points(sections.get('bear_case')))
+
+def insert_agent_output(ticker, agent_output, model_used='bedrock', telemetry=None):
+    """
+    Store an analysis and make it this worker's cached latest for the ticker.
+
+    Returns:
+        dict: The stored record, shaped like fetch_latest_agent_output()
+    """
+    raw_output = json.dumps(agent_output)
+    codec, payload = encode_stock_output(agent_output)
+    bull_points, bear_points = _stock_headlines(agent_output)
+
+    latest_analysis_cache.invalidate('stock', ticker)
+    with db_cursor() as cur:
+        execute_statement(
+            cur, "insert_agent_output",
             (
-                ticker_id,
-                json.dumps(agent_output),
+                ticker,
+                payload,
+                codec,
                 agent_output.get("duration"),
                 agent_output.get("search_calls"),
                 datetime.fromisoformat(str(agent_output.get("timestamp"))) if agent_output.get("timestamp") else datetime.now(),
                 agent_output.get("executive_summary"),
-                sections.get("bull_case"),
-                sections.get("bear_case"),
-                sections.get("investment_takeaway"),
-                sections.get("analytical_reasoning"),
-                sections.get("search_summary"),
+                bull_points,
+                bear_points,
                 model_used,
-                datetime.now()
+                datetime.now(),
+                json.dumps(telemetry) if telemetry else None
             )
         )
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+        timestamp, created_at = cur.fetchone()
 
-def fetch_latest_agent_output(ticker):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT id FROM tickers WHERE ticker = %s;", (ticker,))
-        result = cur.fetchone()
-        if not result:
-            return None
-        ticker_id = result[0]
+    # Round-trip through JSON so the record matches what a fetch would return
+    record = _agent_output_record(json.loads(raw_output), timestamp, created_at)
+    latest_analysis_cache.put('stock', ticker, record)
+    return dict(record)
 
-        cur.execute(
-            "SELECT raw_output, timestamp, created_at FROM agent_outputs WHERE ticker_id = %s ORDER BY timestamp DESC LIMIT 1;",
-            (ticker_id,)
-        )
+def fetch_latest_agent_output(ticker, use_cache=True):
+    if use_cache:
+        cached = latest_analysis_cache.get('stock', ticker)
+        if cached is not None:
+            return cached
+
+    with db_cursor() as cur:
+        execute_statement(cur, "latest_agent_output", (ticker,))
         row = cur.fetchone()
         if row:
-            raw_output, timestamp, created_at = row
-            # Use timestamp if available, otherwise use created_at
+            raw_output, payload, codec, timestamp, created_at = row
             analysis_time = timestamp if timestamp else created_at
-            if analysis_time and analysis_time >= datetime.now() - timedelta(days=1000):
-                # Add the timestamp to the raw output
-                if isinstance(raw_output, dict):
-                    raw_output['timestamp'] = analysis_time.isoformat() if analysis_time else None
-                    raw_output['created_at'] = created_at.isoformat() if created_at else None
-                return raw_output
+            if analysis_time and analysis_time >= datetime.now() - timedelta(days=MAX_ANALYSIS_AGE_DAYS):
+                record = _agent_output_record(_stock_output(raw_output, payload, codec), timestamp, created_at)
+                latest_analysis_cache.put('stock', ticker, record)
+                return dict(record) if isinstance(record, dict) else record
             else:
                 print(f"⚠️ Cached stock analysis for {ticker} is older than 1000 days.")
         return None
-    finally:
-        cur.close()
-        conn.close()
-
 
-def insert_moat_analysis(ticker, sections, duration, model_used="bedrock"):
-    insert_ticker_if_not_exists(ticker)
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT id FROM tickers WHERE ticker = %s;", (ticker,))
-        result = cur.fetchone()
-        if not result:
-            print(f"❌ Could not find ticker_id for {ticker}")
-            return
-        ticker_id = result[0]
 
-        print(f"📥 Inserting MOAT analysis for {ticker} (ID {ticker_id})...")
+def insert_moat_analysis(ticker, sections, duration, model_used="bedrock", telemetry=None):
+    """
+    Store a MOAT analysis and make it this worker's cached latest for the ticker.
 
-        cur.execute(
-            """
-            INSERT INTO moat_analysis (
-                ticker_id, duration, analysis, model_used, generated_at
-            )
-            VALUES (%s, %s, %s, %s, %s);
-            """,
-            (
-                ticker_id,
-                duration,
-                json.dumps(sections),
-                model_used,
-                datetime.now()
+    Returns:
+        dict: The stored record shaped like fetch_latest_moat_analysis(), or
+            None if the insert failed
+    """
+    try:
+        print(f"📥 Inserting MOAT analysis for {ticker}...")
+        analysis = json.dumps(sections)
+        codec, payload = encode_sections(sections)
+        latest_analysis_cache.invalidate('moat', ticker)
+        with db_cursor() as cur:
+            execute_statement(
+                cur, "insert_moat_analysis",
+                (
+                    ticker,
+                    duration,
+                    payload,
+                    codec,
+                    sections.get("executive_summary") or "",
+                    model_used,
+                    datetime.now(),
+                    json.dumps(telemetry) if telemetry else None
+                )
             )
-        )
-        conn.commit()
-        print(f"✅ MOAT analysis inserted for {ticker}")
+            ticker_id, generated_at = cur.fetchone()
+        print(f"✅ MOAT analysis inserted for {ticker} (ID {ticker_id})")
+
+        record = {
+            "sections": json.loads(analysis),
+            "duration": duration,
+            "timestamp": generated_at.isoformat() if generated_at else None
+        }
+        latest_analysis_cache.put('moat', ticker, record)
+        return dict(record)
 
     except Exception as e:
         print(f"❌ Failed to insert moat analysis for {ticker}: {e}")
-    finally:
-        cur.close()
-        conn.close()
 
-def fetch_latest_moat_analysis(ticker):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT id FROM tickers WHERE ticker = %s;", (ticker,))
-        result = cur.fetchone()
-        if not result:
-            return None
-        ticker_id = result[0]
+def fetch_latest_moat_analysis(ticker, use_cache=True):
+    if use_cache:
+        cached = latest_analysis_cache.get('moat', ticker)
+        if cached is not None:
+            return cached
 
-        cur.execute(
-            "SELECT analysis, duration, generated_at FROM moat_analysis WHERE ticker_id = %s ORDER BY generated_at DESC LIMIT 1;",
-            (ticker_id,)
-        )
+    with db_cursor() as cur:
+        execute_statement(cur, "latest_moat_analysis", (ticker,))
         row = cur.fetchone()
         if row:
-            analysis, duration, generated_at = row
-            if generated_at and generated_at >= datetime.now() - timedelta(days=1000):
-                return {
-                    "sections": analysis,
+            analysis, payload, codec, duration, generated_at = row
+            if generated_at and generated_at >= datetime.now() - timedelta(days=MAX_ANALYSIS_AGE_DAYS):
+                record = {
+                    "sections": _moat_sections(analysis, payload, codec),
                     "duration": duration,
                     "timestamp": generated_at.isoformat() if generated_at else None
                 }
+                latest_analysis_cache.put('moat', ticker, record)
+                return dict(record)
             else:
                 print(f"⚠️ Cached moat analysis for {ticker} is older than 1000 days.")
         return None
-    finally:
-        cur.close()
-        conn.close()
\ No newline at end of file
+
+
+def insert_failed_run_telemetry(ticker, kind, telemetry, error=None):
+    """
+    Store the telemetry of a failed analysis run; never raises, so recording
+    a failure cannot mask the failure itself.
+    """
+    if not telemetry:
+        return
+    try:
+        with db_cursor() as cur:
+            cur.execute(
+                "INSERT INTO failed_analysis_runs (ticker, kind, error, telemetry) VALUES (%s, %s, %s, %s);",
+                (ticker, kind, error or telemetry.get('error'), json.dumps(telemetry))
+            )
+    except Exception as e:
+        print(f"⚠️ Could not store failed {kind} run telemetry for {ticker}: {e}")
+
+
+def fetch_analysis_telemetry(ticker, kind='stock', limit=20):
+    """
+    Most recent runs' telemetry for a ticker, newest first, failed runs included.
+
+    Args:
+        kind (str): 'stock' for agent_outputs or 'moat' for moat_analysis
+
+    Returns:
+        list: {'timestamp', 'duration', 'status' ('succeeded' or 'error'),
+            'error', 'telemetry'} dicts
+    """
+    table, time_column = {
+        'stock': ('agent_outputs', 'timestamp'),
+        'moat': ('moat_analysis', 'generated_at'),
+    }[kind]
+
+    with db_cursor() as cur:
+        cur.execute(
+            f"""
+            (
+                SELECT o.{time_column} AS run_at, o.duration, 'succeeded' AS status, NULL AS error, o.telemetry
+                FROM {table} o
+                JOIN tickers t ON t.id = o.ticker_id
+                WHERE t.ticker = %s AND o.telemetry IS NOT NULL
+                ORDER BY o.{time_column} DESC
+                LIMIT %s
+            )
+            UNION ALL
+            (
+                SELECT f.failed_at, NULL, 'error', f.error, f.telemetry
+                FROM failed_analysis_runs f
+                WHERE f.ticker = %s AND f.kind = %s
+                ORDER BY f.failed_at DESC
+                LIMIT %s
+            )
+            ORDER BY run_at DESC
+            LIMIT %s;
+            """,
+            (ticker, limit, ticker, kind, limit, limit)
+        )
+        return [
+            {
+                "timestamp": run_at.isoformat() if run_at else None,
+                "duration": duration,
+                "status": status,
+                "error": error,
+                "telemetry": telemetry
+            }
+            for run_at, duration, status, error, telemetry in cur.fetchall()
+        ]
+
+
+# History pages, newest first. The keyset condition starts an index range scan
+# on (ticker_id, time DESC) at the cursor, so deep pages cost the same as the
+# first; id breaks ties between rows with the same timestamp. Only the
+# headline columns stored at write time are read, never the payloads.
+HISTORY_SQL = {
+    'stock': """
+        SELECT o.id, o.timestamp, o.duration, o.search_calls, o.model_used, o.executive_summary,
+               o.bull_points, o.bear_points
+        FROM tickers t
+        JOIN agent_outputs o ON o.ticker_id = t.id
+        WHERE t.ticker = %(ticker)s AND o.timestamp IS NOT NULL {keyset}
+        ORDER BY o.timestamp DESC, o.id DESC
+        LIMIT %(limit)s;
+    """,
+    'moat': """
+        SELECT m.id, m.generated_at, m.duration, m.model_used,
+               LEFT(m.executive_summary, %(summary_chars)s)
+        FROM tickers t
+        JOIN moat_analysis m ON m.ticker_id = t.id
+        WHERE t.ticker = %(ticker)s AND m.generated_at IS NOT NULL {keyset}
+        ORDER BY m.generated_at DESC, m.id DESC
+        LIMIT %(limit)s;
+    """,
+}
+HISTORY_KEYSET = {
+    'stock': "AND o.timestamp <= %(before_time)s AND (o.timestamp < %(before_time)s OR o.id < %(before_id)s)",
+    'moat': "AND m.generated_at <= %(before_time)s AND (m.generated_at < %(before_time)s OR m.id < %(before_id)s)",
+}
+# Characters of the MOAT executive summary kept in history entries
+HISTORY_SUMMARY_CHARS = 600
+
+def encode_history_cursor(before):
+    """Opaque page cursor for an analysis history (timestamp, id) keyset"""
+    timestamp, row_id = before
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode()
+
+def decode_history_cursor(cursor):
+    """(timestamp, id) keyset from encode_history_cursor(); raises ValueError if malformed"""
+    timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(timestamp), int(row_id)
+
+def fetch_analysis_history(ticker, kind='stock', limit=20, before=None):
+    """
+    One page of a ticker's analysis history as lightweight summaries.
+
+    Args:
+        kind (str): 'stock' or 'moat'
+        limit (int): Entries per page
+        before (tuple): (timestamp, id) of the last entry of the previous
+            page, or None for the newest page
+
+    Returns:
+        tuple: (entries newest first, (timestamp, id) to pass as `before` for
+            the next page or None when this is the last page)
+    """
+    # One character past the cut shows whether the summary was truncated
+    params = {'ticker': ticker, 'limit': limit + 1, 'summary_chars': HISTORY_SUMMARY_CHARS + 1}
+    keyset = ''
+    if before:
+        params['before_time'], params['before_id'] = before
+        keyset = HISTORY_KEYSET[kind]
+
+    with db_cursor() as cur:
+        cur.execute(HISTORY_SQL[kind].format(keyset=keyset), params)
+        rows = cur.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    entries = []
+    for row in rows:
+        if kind == 'stock':
+            row_id, timestamp, duration, search_calls, model_used, executive_summary, bull_points, bear_points = row
+            entries.append({
+                'id': row_id,
+                'timestamp': timestamp.isoformat(),
+                'duration': duration,
+                'search_calls': search_calls,
+                'model_used': model_used,
+                'executive_summary': executive_summary,
+                'bull_points': bull_points or [],
+                'bear_points': bear_points or [],
+            })
+        else:
+            row_id, timestamp, duration, model_used, summary = row
+            summary = summary or ''
+            entries.append({
+                'id': row_id,
+                'timestamp': timestamp.isoformat(),
+                'duration': duration,
+                'model_used': model_used,
+                'executive_summary': summary[:HISTORY_SUMMARY_CHARS] + ('...' if len(summary) > HISTORY_SUMMARY_CHARS else ''),
+            })
+
+    next_before = (rows[-1][1], rows[-1][0]) if has_more else None
+    return entries, next_before
+
+
+# Latest stock and MOAT analysis per requested ticker in one statement. Each
+# LATERAL subquery is one probe of the (ticker_id, time DESC) indexes, so the
+# cost grows with the number of tickers, not with their history.
+LATEST_ANALYSES_SQL = """
+    SELECT t.ticker,
+           a.raw_output, a.payload, a.payload_codec, a.timestamp, a.created_at,
+           m.analysis, m.payload, m.payload_codec, m.duration, m.generated_at
+    FROM tickers t
+    LEFT JOIN LATERAL (
+        SELECT raw_output, payload, payload_codec, timestamp, created_at
+        FROM agent_outputs
+        WHERE ticker_id = t.id
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ) a ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT analysis, payload, payload_codec, duration, generated_at
+        FROM moat_analysis
+        WHERE ticker_id = t.id
+        ORDER BY generated_at DESC
+        LIMIT 1
+    ) m ON TRUE
+    WHERE t.ticker = ANY(%s);
+"""
+
+def fetch_latest_analyses(tickers, use_cache=True):
+    """
+    Latest stock and MOAT analyses for many tickers at once.
+
+    Tickers already in this worker's latest-analysis cache are served from
+    it; the rest are read in a single query.
+
+    Args:
+        tickers (list): Ticker symbols
+
+    Returns:
+        dict: ticker -> {'stock': record or None, 'moat': record or None},
+            records shaped like fetch_latest_agent_output() and
+            fetch_latest_moat_analysis()
+    """
+    tickers = list(dict.fromkeys(tickers))
+    results = {ticker: {'stock': None, 'moat': None} for ticker in tickers}
+
+    missing = []
+    for ticker in tickers:
+        if use_cache:
+            results[ticker]['stock'] = latest_analysis_cache.get('stock', ticker)
+            results[ticker]['moat'] = latest_analysis_cache.get('moat', ticker)
+        if results[ticker]['stock'] is None or results[ticker]['moat'] is None:
+            missing.append(ticker)
+    if not missing:
+        return results
+
+    cutoff = datetime.now() - timedelta(days=MAX_ANALYSIS_AGE_DAYS)
+    with db_cursor() as cur:
+        cur.execute(LATEST_ANALYSES_SQL, (missing,))
+        rows = cur.fetchall()
+
+    for (ticker, raw_output, payload, codec, timestamp, created_at,
+         analysis, moat_payload, moat_codec, duration, generated_at) in rows:
+        analysis_time = timestamp if timestamp else created_at
+        if results[ticker]['stock'] is None and analysis_time and analysis_time >= cutoff:
+            record = _agent_output_record(_stock_output(raw_output, payload, codec), timestamp, created_at)
+            latest_analysis_cache.put('stock', ticker, record)
+            results[ticker]['stock'] = dict(record) if isinstance(record, dict) else record
+
+        if results[ticker]['moat'] is None and generated_at and generated_at >= cutoff:
+            record = {
+                "sections": _moat_sections(analysis, moat_payload, moat_codec),
+                "duration": duration,
+                "timestamp": generated_at.isoformat()
+            }
+            latest_analysis_cache.put('moat', ticker, record)
+            results[ticker]['moat'] = dict(record)
+    return results
+
+
+def _ticker_ids(cur, tickers):
+    """Map tickers to ids, inserting any that do not exist yet"""
+    tickers = sorted(set(tickers))
+    execute_values(
+        cur,
+        "INSERT INTO tickers (ticker) VALUES %s ON CONFLICT (ticker) DO NOTHING;",
+        [(ticker,) for ticker in tickers]
+    )
+    cur.execute("SELECT ticker, id FROM tickers WHERE ticker = ANY(%s);", (tickers,))
+    return dict(cur.fetchall())
+
+def bulk_insert_agent_outputs(rows, model_used='bedrock'):
+    """
+    Insert many stock analyses with batched multi-row INSERTs, for backfills.
+
+    Args:
+        rows (list): (ticker, agent_output) pairs, agent_output as passed to
+            insert_agent_output()
+
+    Returns:
+        int: Rows inserted
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    now = datetime.now()
+    with db_cursor() as cur:
+        ticker_ids = _ticker_ids(cur, [ticker for ticker, _ in rows])
+        values = []
+        for ticker, agent_output in rows:
+            codec, payload = encode_stock_output(agent_output)
+            bull_points, bear_points = _stock_headlines(agent_output)
+            values.append((
+                ticker_ids[ticker],
+                payload,
+                codec,
+                agent_output.get("duration"),
+                agent_output.get("search_calls"),
+                datetime.fromisoformat(str(agent_output.get("timestamp"))) if agent_output.get("timestamp") else now,
+                agent_output.get("executive_summary"),
+                bull_points,
+                bear_points,
+                model_used,
+                now
+            ))
+        execute_values(
+            cur,
+            """
+            INSERT INTO agent_outputs (
+                ticker_id, payload, payload_codec, duration, search_calls, timestamp,
+                executive_summary, bull_points, bear_points, model_used, created_at
+            )
+            VALUES %s;
+            """,
+            values,
+            page_size=BULK_INSERT_PAGE_SIZE
+        )
+
+    for ticker, _ in rows:
+        latest_analysis_cache.invalidate('stock', ticker)
+    return len(values)
+
+def bulk_insert_moat_analyses(rows, model_used="bedrock"):
+    """
+    Insert many MOAT analyses with batched multi-row INSERTs, for backfills.
+
+    Args:
+        rows (list): (ticker, sections, duration, generated_at) tuples;
+            generated_at may be None for now
+
+    Returns:
+        int: Rows inserted
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    now = datetime.now()
+    with db_cursor() as cur:
+        ticker_ids = _ticker_ids(cur, [row[0] for row in rows])
+        values = []
+        for ticker, sections, duration, generated_at in rows:
+            codec, payload = encode_sections(sections)
+            values.append((
+                ticker_ids[ticker], duration, payload, codec, sections.get("executive_summary") or "",
+                model_used, generated_at or now
+            ))
+        execute_values(
+            cur,
+            """
+            INSERT INTO moat_analysis (
+                ticker_id, duration, payload, payload_codec, executive_summary, model_used, generated_at
+            )
+            VALUES %s;
+            """,
+            values,
+            page_size=BULK_INSERT_PAGE_SIZE
+        )
+
+    for row in rows:
+        latest_analysis_cache.invalidate('moat', row[0])
+    return len(rows)
+
+
+def export_latest_analyses(path, tickers=None):
+    """
+    Write the latest stock and MOAT analysis per ticker as JSON lines.
+
+    Args:
+        path (str): Output file
+        tickers (list): Tickers to export (default: every ticker)
+
+    Returns:
+        int: Records written
+    """
+    if tickers is None:
+        with db_cursor() as cur:
+            cur.execute("SELECT ticker FROM tickers ORDER BY ticker;")
+            tickers = [row[0] for row in cur.fetchall()]
+
+    written = 0
+    with open(path, 'w') as f:
+        for start in range(0, len(tickers), BULK_INSERT_PAGE_SIZE):
+            batch = fetch_latest_analyses(tickers[start:start + BULK_INSERT_PAGE_SIZE], use_cache=False)
+            for ticker, latest in batch.items():
+                for kind in ('stock', 'moat'):
+                    if latest[kind] is not None:
+                        f.write(json.dumps({'kind': kind, 'ticker': ticker, 'record': latest[kind]}) + "\n")
+                        written += 1
+    print(f"📤 Exported {written} analyses for {len(tickers)} tickers to {path}")
+    return written
+
+def import_analyses(path):
+    """
+    Load analyses written by export_latest_analyses() with the bulk insert paths.
+
+    Returns:
+        dict: Rows inserted per kind
+    """
+    stock_rows, moat_rows = [], []
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            record = entry['record']
+            if entry['kind'] == 'stock':
+                record.pop('created_at', None)
+                stock_rows.append((entry['ticker'], record))
+            else:
+                generated_at = datetime.fromisoformat(record['timestamp']) if record.get('timestamp') else None
+                moat_rows.append((entry['ticker'], record['sections'], record.get('duration'), generated_at))
+
+    counts = {
+        'stock': bulk_insert_agent_outputs(stock_rows),
+        'moat': bulk_insert_moat_analyses(moat_rows),
+    }
+    print(f"📥 Imported {counts['stock']} stock and {counts['moat']} MOAT analyses from {path}")
+    return counts
+
+
+def compress_legacy_payloads(batch_size=BULK_INSERT_PAGE_SIZE):
+    """
+    Rewrite rows stored before compressed payloads into the payload format,
+    clearing their uncompressed copies. Run VACUUM afterwards to reclaim space.
+
+    Returns:
+        dict: Rows rewritten per kind
+    """
+    totals = {'stock': 0, 'moat': 0}
+
+    while True:
+        with db_cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, raw_output FROM agent_outputs
+                WHERE payload IS NULL AND raw_output IS NOT NULL
+                ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED;
+                """,
+                (batch_size,)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            values = []
+            for row_id, raw_output in rows:
+                output = raw_output if isinstance(raw_output, dict) else json.loads(raw_output)
+                codec, payload = encode_stock_output(output)
+                values.append((row_id, payload, codec) + _stock_headlines(output))
+            execute_values(
+                cur,
+                """
+                UPDATE agent_outputs AS o
+                SET payload = v.payload, payload_codec = v.codec, raw_output = NULL,
+                    bull_points = v.bull_points::jsonb, bear_points = v.bear_points::jsonb,
+                    bull_case = NULL, bear_case = NULL, investment_takeaway = NULL,
+                    analytical_reasoning = NULL, search_summary = NULL
+                FROM (VALUES %s) AS v (id, payload, codec, bull_points, bear_points)
+                WHERE o.id = v.id;
+                """,
+                values
+            )
+        totals['stock'] += len(rows)
+
+    while True:
+        with db_cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, analysis FROM moat_analysis
+                WHERE payload IS NULL AND analysis IS NOT NULL
+                ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED;
+                """,
+                (batch_size,)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            values = []
+            for row_id, analysis in rows:
+                sections = analysis if isinstance(analysis, dict) else json.loads(analysis)
+                codec, payload = encode_sections(sections)
+                values.append((row_id, payload, codec, sections.get('executive_summary') or ''))
+            execute_values(
+                cur,
+                """
+                UPDATE moat_analysis AS m
+                SET payload = v.payload, payload_codec = v.codec, analysis = NULL,
+                    executive_summary = v.executive_summary
+                FROM (VALUES %s) AS v (id, payload, codec, executive_summary)
+                WHERE m.id = v.id;
+                """,
+                values
+            )
+        totals['moat'] += len(rows)
+
+    print(f"🗜️ Compressed {totals['stock']} stock and {totals['moat']} MOAT analyses "
+          f"(run VACUUM on agent_outputs and moat_analysis to reclaim space)")
+    return totals
+
+def backfill_history_headlines(batch_size=BULK_INSERT_PAGE_SIZE):
+    """
+    Fill the history headline columns of rows stored before they existed.
+
+    Returns:
+        dict: Rows updated per kind
+    """
+    totals = {'stock': 0, 'moat': 0}
+
+    while True:
+        with db_cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, raw_output, payload, payload_codec, bull_case, bear_case FROM agent_outputs
+                WHERE bull_points IS NULL
+                ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED;
+                """,
+                (batch_size,)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            values = []
+            for row_id, raw_output, payload, codec, bull_case, bear_case in rows:
+                if payload is not None:
+                    headlines = _stock_headlines(decode_stock_output(codec, payload))
+                else:
+                    headlines = json.dumps(thesis_points(bull_case)), json.dumps(thesis_points(bear_case))
+                values.append((row_id,) + headlines)
+            execute_values(
+                cur,
+                """
+                UPDATE agent_outputs AS o
+                SET bull_points = v.bull_points::jsonb, bear_points = v.bear_points::jsonb
+                FROM (VALUES %s) AS v (id, bull_points, bear_points)
+                WHERE o.id = v.id;
+                """,
+                values
+            )
+        totals['stock'] += len(rows)
+
+    while True:
+        with db_cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, analysis, payload, payload_codec FROM moat_analysis
+                WHERE executive_summary IS NULL
+                ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED;
+                """,
+                (batch_size,)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            values = []
+            for row_id, analysis, payload, codec in rows:
+                sections = _moat_sections(analysis, payload, codec) or {}
+                if isinstance(sections, str):
+                    sections = json.loads(sections)
+                # An empty string marks the row done even without a summary
+                values.append((row_id, sections.get('executive_summary') or ''))
+            execute_values(
+                cur,
+                """
+                UPDATE moat_analysis AS m
+                SET executive_summary = v.executive_summary
+                FROM (VALUES %s) AS v (id, executive_summary)
+                WHERE m.id = v.id;
+                """,
+                values
+            )
+        totals['moat'] += len(rows)
+
+    print(f"📰 Backfilled history headlines for {totals['stock']} stock and {totals['moat']} MOAT analyses")
+    return totals
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Database maintenance for stored analyses')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('migrate', help='Apply pending migrations (default)')
+    export_parser = subparsers.add_parser('export', help='Export the latest analyses as JSON lines')
+    export_parser.add_argument('path')
+    export_parser.add_argument('--tickers', nargs='*', help='Only these tickers')
+    import_parser = subparsers.add_parser('import', help='Bulk-insert analyses from an export file')
+    import_parser.add_argument('path')
+    subparsers.add_parser('compact', help='Compress analyses stored before payload compression')
+    subparsers.add_parser('backfill-history', help='Fill history headlines of analyses stored before they were kept')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_latest_analyses(args.path, [t.upper() for t in args.tickers] if args.tickers else None)
+    elif args.command == 'import':
+        import_analyses(args.path)
+    elif args.command == 'compact':
+        compress_legacy_payloads()
+    elif args.command == 'backfill-history':
+        backfill_history_headlines()
+    else:
+        apply_migrations()
@@ -0,0 +1,113 @@
+# =============================================================================
+# SHARED HTTP TRANSPORT
+# Per-host pooled keep-alive sessions with a common retry/backoff policy
+# =============================================================================
+
+import os
+import threading
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+
+# (connect, read) seconds, used when a caller does not pass its own timeout
+DEFAULT_TIMEOUT = (5, 15)
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+# Hosts whose error statuses are returned to the caller instead of retried
+_no_status_retry_hosts = set()
+# Sessions inherited across a fork are kept referenced, never closed, so the
+# child cannot tear down connections its parent still uses
+_inherited = []
+
+
+def _host_key(url):
+    parts = urllib.parse.urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _build_session(status_retries=HTTP_MAX_RETRIES):
+    """Create a session whose adapter pools and retries connections to one host"""
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        read=HTTP_MAX_RETRIES,
+        status=status_retries,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=True,  # Cap open connections per host at HTTP_POOL_MAXSIZE
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def disable_status_retries(url: str):
+    """
+    Return 429/5xx responses from the host behind `url` straight to the caller.
+
+    Status retries sleep for whatever Retry-After the host sends, inside the
+    caller's thread and without a cap. Callers that pace the host themselves
+    (the search strategies and search_pacer) opt out so they stay in charge.
+    """
+    host_key = _host_key(url)
+    with _sessions_lock:
+        _no_status_retry_hosts.add(host_key)
+        session = _sessions.pop(host_key, None)
+    if session is not None:
+        _inherited.append(session)
+
+
+def get_session(url: str) -> requests.Session:
+    """Return the process-wide session for the host behind `url`"""
+    host_key = _host_key(url)
+
+    session = _sessions.get(host_key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host_key)
+            if session is None:
+                status_retries = 0 if host_key in _no_status_retry_hosts else HTTP_MAX_RETRIES
+                session = _sessions[host_key] = _build_session(status_retries)
+    return session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET through the pooled session for the url's host"""
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    return get_session(url).get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """POST through the pooled session for the url's host (not retried on status)"""
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    return get_session(url).post(url, **kwargs)
+
+
+def _reset_after_fork():
+    """Give a forked worker its own sessions instead of its parent's sockets"""
+    global _sessions_lock
+    _sessions_lock = threading.Lock()
+    _inherited.extend(_sessions.values())
+    _sessions.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
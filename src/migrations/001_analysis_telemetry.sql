@@ -0,0 +1,4 @@
+-- Per-run agent telemetry (model turns, tokens, tool timings, retries, cost)
+-- stored next to each analysis row.
+ALTER TABLE agent_outputs ADD COLUMN IF NOT EXISTS telemetry JSONB;
+ALTER TABLE moat_analysis ADD COLUMN IF NOT EXISTS telemetry JSONB;
@@ -0,0 +1,8 @@
+-- Index the "latest analysis for a ticker" lookups so they stay a single
+-- index probe as analysis history grows. Directions match the queries'
+-- ORDER BY ... DESC, so the first index entry is the row returned.
+CREATE INDEX IF NOT EXISTS idx_agent_outputs_ticker_timestamp
+    ON agent_outputs (ticker_id, timestamp DESC);
+
+CREATE INDEX IF NOT EXISTS idx_moat_analysis_ticker_generated_at
+    ON moat_analysis (ticker_id, generated_at DESC);
@@ -0,0 +1,10 @@
+-- Store each analysis once as a compressed payload (see payload_codec.py).
+-- New rows leave raw_output/analysis and the per-section text columns NULL;
+-- rows written before this migration keep them and are read as before.
+ALTER TABLE agent_outputs ADD COLUMN IF NOT EXISTS payload BYTEA;
+ALTER TABLE agent_outputs ADD COLUMN IF NOT EXISTS payload_codec TEXT;
+ALTER TABLE agent_outputs ALTER COLUMN raw_output DROP NOT NULL;
+
+ALTER TABLE moat_analysis ADD COLUMN IF NOT EXISTS payload BYTEA;
+ALTER TABLE moat_analysis ADD COLUMN IF NOT EXISTS payload_codec TEXT;
+ALTER TABLE moat_analysis ALTER COLUMN analysis DROP NOT NULL;
@@ -0,0 +1,13 @@
+-- Telemetry for analysis runs that failed. They have no agent_outputs or
+-- moat_analysis row to carry it, so it is kept here with the error.
+CREATE TABLE IF NOT EXISTS failed_analysis_runs (
+    id SERIAL PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    error TEXT,
+    telemetry JSONB NOT NULL,
+    failed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_failed_analysis_runs_ticker_kind
+    ON failed_analysis_runs (ticker, kind, failed_at DESC);
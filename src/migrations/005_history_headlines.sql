@@ -0,0 +1,8 @@
+-- Keep the fields the analysis history page shows next to the compressed
+-- payload, so listing history never decompresses or re-parses an analysis.
+-- Rows written before this migration have them NULL until
+-- `python db_utils.py backfill-history` fills them in.
+ALTER TABLE agent_outputs ADD COLUMN IF NOT EXISTS bull_points JSONB;
+ALTER TABLE agent_outputs ADD COLUMN IF NOT EXISTS bear_points JSONB;
+
+ALTER TABLE moat_analysis ADD COLUMN IF NOT EXISTS executive_summary TEXT;
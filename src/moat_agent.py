@@ -3,22 +3,25 @@
 # Competitive MOAT and Market Positioning Analysis
 # =============================================================================
 
-import requests
 import json
 import yfinance as yf
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 import pandas as pd
 import time
 import re
-import urllib.parse
-import random
 import os
-import boto3
 
-from strands import Agent, tool
-from strands.models import BedrockModel
+from strands import tool
 from dotenv import load_dotenv
+from search_executor import run_parallel_searches
+from search_strategies import run_search_strategies
+from search_cache import search_cache
+from research_context import research_contexts, format_context, COMPETITOR_QUERIES
+from context_compaction import compact_search_results, COMPETITOR_TOOL_TOKEN_BUDGET, MOAT_CONTEXT_TOKEN_BUDGET
+from model_pool import AgentFactory, model_pool
+from pacing import bedrock_pacer
+from telemetry import RunTelemetry
+from section_parser import split_moat_sections
 
 load_dotenv()
 
@@ -30,13 +33,6 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_DEFAULT_REGION = 'us-east-1'
 
-try:
-    client = boto3.client("bedrock-runtime", region_name="us-east-1")
-    bedrock = boto3.client('bedrock', region_name='us-east-1')
-    models = bedrock.list_foundation_models()
-except Exception as e:
-    pass
-
 
 #Competitors Search
 @tool
@@ -55,17 +51,16 @@ def identify_competitors(ticker: str) -> str:
     ]
 
     all_results = []
-    for i, query in enumerate(competitor_queries, 1):
+    searches = run_parallel_searches(strategic_web_search, competitor_queries, 3)
+    for i, (query, result, error) in enumerate(searches, 1):
         print(f"   [{i}/{len(competitor_queries)}] Competitor search: {query}")
-        try:
-            result = strategic_web_search(query, 3)
-            all_results.append(f"COMPETITOR SEARCH {i}: {query}\n{result}\n{'='*50}\n")
-            time.sleep(1)  # Rate limiting
-        except Exception as e:
-            print(f"   ❌ Competitor search failed: {e}")
+        if error is not None:
+            print(f"   ❌ Competitor search failed: {error}")
             continue
+        all_results.append((query, result))
 
-    compiled_results = "\n".join(all_results)
+    # Deduplicated, boilerplate-free evidence within a fixed token budget
+    compiled_results = compact_search_results(all_results, COMPETITOR_TOOL_TOKEN_BUDGET, label="Competitor search")
     print(f"✅ Competitor identification complete: {len(all_results)} searches executed")
 
     return f"COMPREHENSIVE COMPETITOR INTELLIGENCE FOR {ticker}:\n\n{compiled_results}"
@@ -87,115 +82,21 @@ def strategic_web_search(query: str, num_results: int = 5) -> str:
         elif 'latest' in query.lower() or 'recent' in query.lower():
             query = f"{query} {current_date}"
 
+    cached_result = search_cache.get('moat', query, num_results)
+    if cached_result is not None:
+        return cached_result
+
     try:
         results = []
         search_successful = False
 
-        # DuckDuckGo Instant API
-        try:
-            ddg_instant_url = 'https://api.duckduckgo.com/'
-            params = {
-                'q': query,
-                'format': 'json',
-                'no_html': '1',
-                'skip_disambig': '1'
-            }
-
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (compatible; research/1.0)',
-                'Accept': 'application/json'
-            }
-
-            response = requests.get(ddg_instant_url, params=params, headers=headers, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                abstract = data.get('Abstract', '')
-                abstract_source = data.get('AbstractSource', '')
-
-                if abstract and len(abstract) > 50:
-                    results.append(f"1. {abstract_source} - Key Information\n   {abstract}\n   Source: DuckDuckGo Instant API\n")
-                    search_successful = True
-
-                related_topics = data.get('RelatedTopics', [])
-                for i, topic in enumerate(related_topics[:3], len(results) + 1):
-                    if isinstance(topic, dict) and 'Text' in topic:
-                        text = topic['Text']
-                        if len(text) > 30:
-                            results.append(f"{i}. Related Information\n   {text}\n   Source: DuckDuckGo Related Topics\n")
-                            search_successful = True
-
-        except Exception as e:
-            pass
-
-        time.sleep(1)
+        # DuckDuckGo Instant API and HTML search (raced when hedged)
+        for title, text, trailer in run_search_strategies(query, num_results):
+            results.append(f"{len(results) + 1}. {title}\n   {text}\n   {trailer}\n")
+            search_successful = True
 
-        # DuckDuckGo HTML Search (fallback)
-        if len(results) < 2:
-            try:
-                search_url = f"https://html.duckduckgo.com/html/?q={urllib.parse.quote(query)}"
-                user_agents = [
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0'
-                ]
-
-                headers = {
-                    'User-Agent': random.choice(user_agents),
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                }
-
-                response = requests.get(search_url, headers=headers, timeout=12)
-
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    search_results = []
-                    selectors = ['.result', '.links_main', '.result__body', 'div[class*="result"]']
-
-                    for selector in selectors:
-                        found_results = soup.select(selector)
-                        if found_results:
-                            search_results = found_results
-                            break
-
-                    for i, result in enumerate(search_results[:num_results], len(results) + 1):
-                        try:
-                            title = None
-                            title_selectors = ['.result__title a', '.result__a', 'h2 a', 'h3 a', 'a']
-
-                            for title_sel in title_selectors:
-                                title_elem = result.select_one(title_sel)
-                                if title_elem:
-                                    title = title_elem.get_text().strip()
-                                    if len(title) > 10:
-                                        break
-
-                            snippet = None
-                            snippet_selectors = ['.result__snippet', '.result__body', '.snippet', 'p']
-
-                            for snippet_sel in snippet_selectors:
-                                snippet_elem = result.select_one(snippet_sel)
-                                if snippet_elem:
-                                    snippet = snippet_elem.get_text().strip()
-                                    if len(snippet) > 30:
-                                        break
-
-                            url_elem = result.select_one('a[href]')
-                            url = url_elem.get('href', '') if url_elem else ''
-
-                            if title and snippet and len(snippet) > 30:
-                                results.append(f"{i}. {title}\n   {snippet}\n   URL: {url}\n")
-                                search_successful = True
-
-                        except Exception as e:
-                            continue
-
-            except Exception as e:
-                pass
+        # Only live search results are worth caching, not the knowledge fallback
+        from_network = search_successful
 
         # Financial knowledge fallback
         if not search_successful and any(term in query.lower() for term in ['stock', 'competition', 'MOAT', 'competitive advantage', 'market position']):
@@ -237,6 +138,8 @@ Year Context: {current_year} awareness applied
 {'='*60}
 
 """
+            if from_network:
+                search_cache.put('moat', query, num_results, verification_header + final_results)
             return verification_header + final_results
         else:
             return f"🚨 Strategic search found no results for: {query}\nSuggestion: Try more specific or simpler search terms."
@@ -248,6 +151,10 @@ Year Context: {current_year} awareness applied
 @tool
 def get_stock_data(ticker: str) -> dict:
     """Get comprehensive stock data including price, metrics, and company info"""
+    context = research_contexts.fresh(ticker)
+    if context and 'error' not in context['stock_data']:
+        return context['stock_data']
+
     try:
         stock = yf.Ticker(ticker.upper())
         info = stock.info
@@ -287,6 +194,10 @@ def get_stock_data(ticker: str) -> dict:
 @tool
 def enhanced_get_recent_news(ticker: str) -> str:
     """Enhanced news retrieval with strategic fallbacks"""
+    context = research_contexts.fresh(ticker)
+    if context and context['news']:
+        return context['news']
+
     try:
         stock = yf.Ticker(ticker.upper())
         news = stock.news
@@ -317,16 +228,8 @@ def enhanced_get_recent_news(ticker: str) -> str:
 # =============================================================================
 
 def setup_claude_model():
-    """Setup Claude model configuration"""
-    return BedrockModel(
-        model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-        region_name="us-east-1",
-        additional_request_fields={
-            "thinking": {"type": "disabled"},
-            "max_tokens": 4000,
-            "temperature": 0.1
-        }
-    )
+    """Shared Claude model configuration (created once per process)"""
+    return model_pool.model()
 
 def create_system_prompt():
     """Create enhanced system prompt optimized for MOAT and competitive analysis"""
@@ -399,6 +302,18 @@ Your primary mission is to evaluate:
 
 This analysis serves institutional investment decision-making and should reflect the highest standards of competitive intelligence and strategic analysis."""
 
+moat_agent_factory = AgentFactory(
+    'moat',
+    create_system_prompt,
+    tools=[
+        get_stock_data,
+        enhanced_get_recent_news,
+        strategic_web_search,
+        identify_competitors,
+    ],
+    pacer=bedrock_pacer
+)
+
 # =============================================================================
 # MAIN ANALYSIS FUNCTION FOR WEB INTEGRATION
 # =============================================================================
@@ -424,53 +339,35 @@ def analyze_stock_moat(ticker: str) -> dict:
             }
         }
 
-    try:
-        claude_37_model = setup_claude_model()
-        enhanced_system_prompt = create_system_prompt()
-
-        strategic_agent = Agent(
-            model=claude_37_model,
-            system_prompt=enhanced_system_prompt,
-            tools=[
-                get_stock_data,
-                enhanced_get_recent_news,
-                strategic_web_search,
-                identify_competitors,
-            ]
-        )
+    telemetry = RunTelemetry('moat', ticker)
 
+    try:
         current_date = datetime.now().strftime("%B %d, %Y")
         analysis_start_time = time.time()
 
-        # ADD THIS SECTION HERE - COMPETITOR INTELLIGENCE GATHERING
+        # Competitor intelligence is gathered once per ticker per day, stock data
+        # and news once per RESEARCH_MARKET_DATA_TTL_MINUTES, and shared with the stock analysis
         print(f"🔍 Conducting competitor intelligence for {ticker}...")
-
-        competitor_searches = [
-            f"{ticker} main competitors 2025",
-            f"{ticker} vs competitors market share",
-            f"{ticker} competitive threats disruption",
-            f"top differentiators for competitors of {ticker}",
-            f"{ticker} industry competition analysis"
-        ]
-
-        competitor_intelligence = []
-        for search_query in competitor_searches:
-            print(f"   Searching: {search_query}")
-            search_result = strategic_web_search(search_query, 3)
-            competitor_intelligence.append(f"Query: {search_query}\n{search_result}\n{'='*50}\n")
-            time.sleep(1)  # Rate limiting between searches
-
-        # Combine all competitor intelligence
-        compiled_competitor_data = "\n".join(competitor_intelligence)
-        print(f"✅ Competitor intelligence gathered: {len(competitor_intelligence)} searches completed")
+        with telemetry.phase('research_context'):
+            research = research_contexts.get_or_build(
+                ticker,
+                telemetry.timed('get_stock_data', get_stock_data),
+                telemetry.timed('enhanced_get_recent_news', enhanced_get_recent_news)
+            )
+            research = research_contexts.ensure_searches(
+                research, COMPETITOR_QUERIES, telemetry.timed('strategic_web_search', strategic_web_search)
+            )
+        with telemetry.phase('context_compaction'):
+            compiled_competitor_data = format_context(research, COMPETITOR_QUERIES, MOAT_CONTEXT_TOKEN_BUDGET)
+        print(f"✅ Competitor intelligence gathered: {len(research['searches'])} searches available")
 
         # MODIFY THE EXISTING RESULT CALL TO INCLUDE COMPETITOR DATA
-        result = strategic_agent(f"""
+        analysis_prompt = f"""
         Conduct a comprehensive competitive moat and market positioning analysis for {ticker} stock.
         
         CURRENT DATE: {current_date}
         
-        COMPETITOR INTELLIGENCE ALREADY GATHERED:
+        RESEARCH ALREADY GATHERED (stock data, recent news and competitor intelligence):
         {compiled_competitor_data}
         
         CRITICAL: Use the competitor intelligence data above to identify specific competitor names and threats.
@@ -503,7 +400,11 @@ def analyze_stock_moat(ticker: str) -> dict:
         
         CRITICAL: Your analysis must include specific competitor names and their threats.
         Reference the competitor intelligence data gathered above.
-        """)
+        """
+
+        # Each Bedrock call inside the run is paced (and a throttled call retried) by the shared model
+        with telemetry.phase('agent'):
+            result = moat_agent_factory.acquire(observers=[telemetry])(analysis_prompt)
 
         analysis_duration = time.time() - analysis_start_time
         analysis_text = str(result)
@@ -516,7 +417,8 @@ def analyze_stock_moat(ticker: str) -> dict:
             'ticker': ticker,
             'duration': analysis_duration,
             'sections': parsed_sections,
-            'raw_analysis': analysis_text
+            'raw_analysis': analysis_text,
+            'telemetry': telemetry.finish(result)
         }
 
     except Exception as e:
@@ -524,6 +426,7 @@ def analyze_stock_moat(ticker: str) -> dict:
         return {
             'success': False,
             'error': error_msg,
+            'telemetry': telemetry.finish(success=False, error=error_msg),
             'sections': {
                 'executive_summary': f'Analysis failed: {error_msg}',
                 'moat_analysis': 'Analysis unavailable due to error.',
@@ -538,62 +441,7 @@ def analyze_stock_moat(ticker: str) -> dict:
 
 def parse_stock_analysis(analysis_text: str) -> dict:
     """Parse MOAT analysis text into structured sections for UI display"""
-
-    if not analysis_text or not isinstance(analysis_text, str):
-        return {
-            'executive_summary': 'Analysis text not available',
-            'moat_analysis': 'MOAT analysis not available',
-            'market_positioning': 'Market positioning not available',
-            'competitive_landscape': 'Competitive landscape not available'
-        }
-
-    # Define section markers
-    markers = [
-        '## EXECUTIVE SUMMARY',
-        '## MOAT ANALYSIS',
-        '## MARKET POSITIONING',
-        '## COMPETITIVE ADVANTAGES & LANDSCAPE'
-    ]
-
-    # Find positions of each section
-    section_positions = {}
-    for marker in markers:
-        pos = analysis_text.find(marker)
-        if pos != -1:
-            section_positions[marker] = pos
-
-    # Extract sections
-    def extract_section(start_marker, end_marker=None):
-        start_pos = section_positions.get(start_marker, 0)
-        if end_marker and end_marker in section_positions:
-            end_pos = section_positions[end_marker]
-        else:
-            next_positions = [pos for pos in section_positions.values() if pos > start_pos]
-            end_pos = min(next_positions) if next_positions else len(analysis_text)
-
-        section_text = analysis_text[start_pos:end_pos].strip()
-        lines = section_text.split('\n')
-        if lines and any(marker.replace('##', '').strip() in lines[0] for marker in markers):
-            section_text = '\n'.join(lines[1:]).strip()
-        return section_text
-
-    executive_summary = extract_section('## EXECUTIVE SUMMARY', '## MOAT ANALYSIS')
-    moat_analysis = extract_section('## MOAT ANALYSIS', '## MARKET POSITIONING')
-    market_positioning = extract_section('## MARKET POSITIONING', '## COMPETITIVE ADVANTAGES & LANDSCAPE')
-    competitive_landscape = extract_section('## COMPETITIVE ADVANTAGES & LANDSCAPE')
-
-    # Clean up sections
-    def clean_section(text):
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
-        text = re.sub(r'^\s*\n', '', text)
-        return text.strip()
-
-    return {
-        'executive_summary': clean_section(executive_summary),
-        'moat_analysis': clean_section(moat_analysis),
-        'market_positioning': clean_section(market_positioning),
-        'competitive_landscape': clean_section(competitive_landscape)
-    }
+    return split_moat_sections(analysis_text)
 
 # =============================================================================
 # FLASK INTEGRATION FUNCTION
@@ -0,0 +1,196 @@
+# =============================================================================
+# MODEL AND AGENT POOL
+# Process-wide Bedrock clients, model instances, prompts and reusable agents
+# =============================================================================
+
+import inspect
+import os
+import threading
+from datetime import datetime
+
+import boto3
+from strands import Agent
+from strands.models import BedrockModel
+
+try:
+    from strands.telemetry.metrics import EventLoopMetrics
+except ImportError:
+    EventLoopMetrics = None
+
+from pacing import bedrock_pacer, BEDROCK_THROTTLE_RETRIES
+
+BEDROCK_REGION = os.getenv("BEDROCK_REGION", "us-east-1")
+BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "us.anthropic.claude-3-7-sonnet-20250219-v1:0")
+BEDROCK_MAX_TOKENS = int(os.getenv("BEDROCK_MAX_TOKENS", "4000"))
+BEDROCK_TEMPERATURE = float(os.getenv("BEDROCK_TEMPERATURE", "0.1"))
+
+
+class PacedBedrockModel(BedrockModel):
+    """
+    BedrockModel whose every model call goes through an AdaptivePacer.
+
+    Pacing applies to the single Bedrock request, so a throttled turn is
+    retried on its own (by the strands event loop, plus throttle_retries here;
+    see BEDROCK_THROTTLE_RETRIES) instead of restarting the agent run and
+    repeating its tool calls. Strands' stream() is a plain generator in
+    older releases and an async generator in newer ones; both are wrapped.
+    """
+
+    def __init__(self, *args, pacer=bedrock_pacer, throttle_retries=BEDROCK_THROTTLE_RETRIES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pacer = pacer
+        self.throttle_retries = throttle_retries
+
+    if inspect.isasyncgenfunction(BedrockModel.stream):
+        async def stream(self, *args, **kwargs):
+            parent = super(PacedBedrockModel, self)
+            async for event in self.pacer.astream(lambda: parent.stream(*args, **kwargs), self.throttle_retries):
+                yield event
+    else:
+        def stream(self, *args, **kwargs):
+            parent = super(PacedBedrockModel, self)
+            yield from self.pacer.stream(lambda: parent.stream(*args, **kwargs), self.throttle_retries)
+
+
+class ModelPool:
+    """
+    Lazily created, shared Bedrock resources.
+
+    Nothing here touches the network until first use: the boto3 session,
+    service clients and BedrockModel instances are built on demand and then
+    reused by every analysis in the process. System prompts are rendered
+    once per day, since the only thing that changes in them is the date.
+    """
+
+    def __init__(self, region=BEDROCK_REGION):
+        self.region = region
+        self._lock = threading.RLock()
+        self._session = None
+        self._clients = {}
+        self._models = {}
+        self._prompts = {}
+
+    def session(self):
+        """Shared boto3 session (clients created from it are thread-safe)"""
+        with self._lock:
+            if self._session is None:
+                self._session = boto3.Session(region_name=self.region)
+            return self._session
+
+    def client(self, service):
+        """
+        Cached boto3 client for a service, e.g. 'bedrock' or 'bedrock-runtime'.
+        """
+        with self._lock:
+            if service not in self._clients:
+                self._clients[service] = self.session().client(service)
+            return self._clients[service]
+
+    def model(self, model_id=BEDROCK_MODEL_ID, max_tokens=BEDROCK_MAX_TOKENS, temperature=BEDROCK_TEMPERATURE):
+        """Shared, paced BedrockModel for a model id and sampling configuration"""
+        key = (model_id, max_tokens, temperature)
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = PacedBedrockModel(
+                    model_id=model_id,
+                    boto_session=self.session(),
+                    additional_request_fields={
+                        "thinking": {"type": "disabled"},
+                        "max_tokens": max_tokens,
+                        "temperature": temperature
+                    }
+                )
+            return self._models[key]
+
+    def prompt(self, name, builder):
+        """
+        System prompt rendered by `builder`, cached until the date changes.
+
+        Args:
+            name (str): Cache key for the prompt
+            builder: Zero-argument callable returning the prompt text
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            cached = self._prompts.get(name)
+            if cached and cached[0] == today:
+                return cached[1]
+
+        text = builder()
+        with self._lock:
+            self._prompts[name] = (today, text)
+        return text
+
+    def check_credentials(self) -> bool:
+        """Verify Bedrock access on demand (replaces the old import-time check)"""
+        try:
+            self.client('bedrock').list_foundation_models()
+            return True
+        except Exception:
+            return False
+
+
+model_pool = ModelPool()
+
+
+def reset_agent(agent):
+    """Clear an agent's conversation and per-run metrics so it can be reused"""
+    agent.messages = []
+    if EventLoopMetrics is not None and hasattr(agent, 'event_loop_metrics'):
+        agent.event_loop_metrics = EventLoopMetrics()
+    conversation_manager = getattr(agent, 'conversation_manager', None)
+    if conversation_manager is not None and hasattr(conversation_manager, 'removed_message_count'):
+        conversation_manager.removed_message_count = 0
+
+
+class AgentFactory:
+    """
+    Hands out a reusable Agent for one prompt and tool set.
+
+    Agents carry conversation state, so each thread gets its own instance.
+    It is built once with the shared model and, on later calls, only has
+    its conversation reset. An agent returned by acquire() is valid until
+    the same thread calls acquire() again. When a pacer is given, the
+    agent's internal throttling retries are reported to it.
+    """
+
+    def __init__(self, name, prompt_builder, tools, pool=model_pool, pacer=None):
+        self.name = name
+        self.prompt_builder = prompt_builder
+        self.tools = tools
+        self.pool = pool
+        self.pacer = pacer
+        self._local = threading.local()
+
+    def acquire(self, callback_handler=None, observers=()):
+        """
+        Return this thread's agent with a fresh conversation.
+
+        Args:
+            callback_handler: Optional streaming callback for this run; the
+                agent's default (stdout printing) handler is used otherwise
+            observers: Objects whose callback_handler(inner) wraps the
+                handler to watch agent events, e.g. run telemetry
+        """
+        system_prompt = self.pool.prompt(self.name, self.prompt_builder)
+        agent = getattr(self._local, 'agent', None)
+
+        if agent is None:
+            agent = Agent(
+                model=self.pool.model(),
+                system_prompt=system_prompt,
+                tools=self.tools
+            )
+            self._local.agent = agent
+            self._local.default_callback_handler = agent.callback_handler
+        else:
+            reset_agent(agent)
+            agent.system_prompt = system_prompt
+
+        handler = callback_handler or self._local.default_callback_handler
+        if self.pacer:
+            handler = self.pacer.callback_handler(handler)
+        for observer in observers:
+            handler = observer.callback_handler(handler)
+        agent.callback_handler = handler
+        return agent
@@ -0,0 +1,227 @@
+# =============================================================================
+# ADAPTIVE PACING
+# AIMD request pacing driven by upstream throttling signals
+# =============================================================================
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+BEDROCK_MAX_DELAY = float(os.getenv("BEDROCK_PACING_MAX_DELAY", "60"))
+SEARCH_MAX_DELAY = float(os.getenv("SEARCH_PACING_MAX_DELAY", "20"))
+# Throttled model calls this layer retries itself. The strands event loop
+# already retries ModelThrottledException (6 attempts, 4s doubling to 240s),
+# and every one of its attempts gets these retries on top, so a throttled
+# call is tried up to (BEDROCK_THROTTLE_RETRIES + 1) x 6 times. Off by
+# default: each strands attempt is still paced and backs the pacer off.
+BEDROCK_THROTTLE_RETRIES = int(os.getenv("BEDROCK_THROTTLE_RETRIES", "0"))
+
+# Concurrency budgets: model calls in flight against Bedrock, and search
+# requests in flight against DuckDuckGo, across all threads in the process
+BEDROCK_MAX_CONCURRENCY = int(os.getenv("BEDROCK_MAX_CONCURRENCY", "4"))
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "8"))
+
+# Exception class names that mean "slow down" (checked by name so the
+# botocore / strands exception classes are not hard dependencies)
+THROTTLING_ERROR_NAMES = ('ModelThrottledException', 'ThrottlingException', 'TooManyRequestsException')
+
+# Seconds between tries for a concurrency slot from async code
+ASYNC_SLOT_POLL_SECONDS = 0.05
+
+
+def is_throttling_error(error) -> bool:
+    """Whether an exception is an upstream throttling / rate-limit response"""
+    if type(error).__name__ in THROTTLING_ERROR_NAMES:
+        return True
+    message = str(error).lower()
+    return 'throttl' in message or 'too many requests' in message
+
+
+class AdaptivePacer:
+    """
+    Spaces out calls to one upstream using additive-increase /
+    multiplicative-decrease on the allowed rate.
+
+    With no throttling the delay decays to `min_delay` (zero by default), so
+    calls go out as fast as callers make them. Each throttling signal doubles
+    the delay (starting from `initial_backoff`, honouring Retry-After), and
+    each success shaves `recovery_step` seconds off again. An optional
+    `max_concurrency` caps how many paced calls may be in flight at once.
+    """
+
+    def __init__(self, name, min_delay=0.0, max_delay=60.0, initial_backoff=1.0,
+                 backoff_factor=2.0, recovery_step=0.5, max_concurrency=None):
+        self.name = name
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.initial_backoff = initial_backoff
+        self.backoff_factor = backoff_factor
+        self.recovery_step = recovery_step
+
+        self._lock = threading.Lock()
+        self._delay = min_delay
+        self._next_slot = 0.0
+        self._throttles = 0
+        self._successes = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    @property
+    def delay(self) -> float:
+        return self._delay
+
+    def _reserve(self) -> float:
+        """Claim the next slot, returning the seconds until it opens"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._delay
+        return slot - time.monotonic()
+
+    def wait(self):
+        """Block until this caller's slot; slots are `delay` seconds apart"""
+        sleep_for = self._reserve()
+        if sleep_for > 0:
+            time.sleep(sleep_for)
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the upstream's concurrency slots for a paced call"""
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            self.wait()
+            yield
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def on_success(self):
+        with self._lock:
+            self._successes += 1
+            self._delay = max(self.min_delay, self._delay - self.recovery_step)
+
+    def on_throttle(self, retry_after=None):
+        """
+        Record a throttling signal.
+
+        Args:
+            retry_after (float): Seconds the upstream asked us to wait, if known
+        """
+        with self._lock:
+            self._throttles += 1
+            backed_off = max(self.initial_backoff, self._delay * self.backoff_factor)
+            try:
+                backed_off = max(backed_off, float(retry_after or 0))
+            except (TypeError, ValueError):
+                pass  # HTTP-date Retry-After values fall back to the backoff
+            self._delay = min(self.max_delay, backed_off)
+            self._next_slot = max(self._next_slot, time.monotonic() + self._delay)
+        print(f"🐢 {self.name} throttled, pacing calls {self._delay:.1f}s apart")
+
+    def call(self, fn, retries=0, on_retry=None):
+        """
+        Run fn() in a paced slot, retrying throttling errors up to `retries` times.
+
+        Args:
+            on_retry: Optional zero-argument callable invoked before each retry
+        """
+        for attempt in range(retries + 1):
+            try:
+                with self.slot():
+                    result = fn()
+            except Exception as e:
+                if not is_throttling_error(e) or attempt == retries:
+                    raise
+                self.on_throttle()
+                if on_retry is not None:
+                    on_retry()
+                continue
+            self.on_success()
+            return result
+
+    def stream(self, open_stream, retries=0, on_retry=None):
+        """
+        Yield from the generator open_stream() returns, paced like call().
+
+        A throttling error raised before the first event retries the call, up
+        to `retries` times; once events have been yielded it is re-raised,
+        since the consumer has already seen part of the response.
+        """
+        for attempt in range(retries + 1):
+            started = False
+            with self.slot():
+                try:
+                    for event in open_stream():
+                        started = True
+                        yield event
+                except Exception as e:
+                    if not is_throttling_error(e):
+                        raise
+                    self.on_throttle()
+                    if started or attempt == retries:
+                        raise
+                    if on_retry is not None:
+                        on_retry()
+                    continue
+            self.on_success()
+            return
+
+    async def astream(self, open_stream, retries=0, on_retry=None):
+        """stream() for async generators; waits without blocking the event loop"""
+        for attempt in range(retries + 1):
+            started = False
+            # Polled on the event loop, so a cancelled waiter never holds a slot
+            if self._slots is not None:
+                while not self._slots.acquire(blocking=False):
+                    await asyncio.sleep(ASYNC_SLOT_POLL_SECONDS)
+            try:
+                sleep_for = self._reserve()
+                if sleep_for > 0:
+                    await asyncio.sleep(sleep_for)
+                try:
+                    async for event in open_stream():
+                        started = True
+                        yield event
+                except Exception as e:
+                    if not is_throttling_error(e):
+                        raise
+                    self.on_throttle()
+                    if started or attempt == retries:
+                        raise
+                    if on_retry is not None:
+                        on_retry()
+                    continue
+            finally:
+                if self._slots is not None:
+                    self._slots.release()
+            self.on_success()
+            return
+
+    def callback_handler(self, inner):
+        """
+        Wrap an agent callback handler so the retries the agent performs
+        internally on throttling also slow this pacer down.
+        """
+        def handler(**kwargs):
+            if kwargs.get('event_loop_throttled_delay'):
+                self.on_throttle(kwargs['event_loop_throttled_delay'])
+            if inner is not None:
+                inner(**kwargs)
+        return handler
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'delay_seconds': round(self._delay, 2),
+                'throttles': self._throttles,
+                'successes': self._successes,
+            }
+
+
+# Process-wide pacers shared by every analysis thread
+bedrock_pacer = AdaptivePacer('Bedrock', max_delay=BEDROCK_MAX_DELAY, initial_backoff=2.0,
+                              recovery_step=1.0, max_concurrency=BEDROCK_MAX_CONCURRENCY)
+search_pacer = AdaptivePacer('DuckDuckGo', max_delay=SEARCH_MAX_DELAY, initial_backoff=1.0,
+                             recovery_step=0.25, max_concurrency=SEARCH_MAX_CONCURRENCY)
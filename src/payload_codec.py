@@ -0,0 +1,133 @@
+# =============================================================================
+# ANALYSIS PAYLOAD CODEC
+# Compact storage format for stored stock and MOAT analyses: JSON compressed
+# with zstd (when installed) or zlib, both primed with a small shared
+# dictionary of the boilerplate every analysis repeats
+# =============================================================================
+
+import json
+import os
+import zlib
+
+from section_parser import split_stock_sections
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# 'auto' uses zstd when the zstandard package is installed, else zlib
+ANALYSIS_PAYLOAD_CODEC = os.getenv("ANALYSIS_PAYLOAD_CODEC", "auto").lower()
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 19
+
+# Shared dictionary, version 1. Never edit it in place: stored rows name the
+# version they were compressed with, so add a new version instead. It is all
+# literals (the section headers are copied, not imported from section_parser)
+# so that changing the parser cannot change it; tests/test_payload_codec.py
+# pins its checksum. Content that matches most often belongs at the end,
+# where back-references are shortest.
+_DICTIONARY_V1 = "".join([
+    '{"ticker": "", "duration": , "search_calls": , "executive_summary": "", ',
+    '"sections": {"raw_text": "", "company_info": "", "bull_case": "", "bear_case": "", ',
+    '"analytical_reasoning": "", "moat_analysis": "", "market_positioning": "", ',
+    '"competitive_landscape": ""}, "metrics": {"year_low": "", "year_high": ""}, "timestamp": "2025-',
+    "Stock Analysis - ## Key Metrics Snapshot\\n- **Current Price**: $",
+    "\\n- **Market Cap**: $ billion\\n- **P/E Ratio**: \\n- **Revenue Growth**: %\\n",
+    "- **Profit Margin**: %\\n- **Dividend Yield**: %\\n- **Analyst Rating**: \\n",
+    "- **52-Week Range**: $ - $\\n\\n",
+    "According to search results, (Source: ) competitive advantage market share ",
+    "revenue growth year-over-year guidance analysts expect the company's ",
+    "network effects switching costs brand strength economies of scale ",
+    "## EXECUTIVE SUMMARY\\n\\n## MOAT ANALYSIS\\n\\n## MARKET POSITIONING\\n\\n",
+    "## COMPETITIVE ADVANTAGES & LANDSCAPE",
+    "## Executive Summary\\n\\n## 🐂 BULL CASE\\n\\n## 🐻 BEAR CASE\\n\\n",
+    "## 📊 INVESTMENT TAKEAWAY\\n\\n## 🔍 SEARCH INTEGRATION SUMMARY\\n\\n",
+    "## 🤔 ANALYTICAL REASONING",
+    "\\n\\n1. **", "**: ", "\\n\\n2. **", "\\n\\n3. **",
+]).encode('utf-8')
+
+_ZLIB_DICTIONARIES = {'zlib-d1': _DICTIONARY_V1}
+_ZSTD_DICTIONARIES = {'zstd-d1': _DICTIONARY_V1}
+CURRENT_ZLIB_CODEC = 'zlib-d1'
+CURRENT_ZSTD_CODEC = 'zstd-d1'
+
+_zstd_dicts = {}
+
+
+def _zstd_dict(codec):
+    if codec not in _zstd_dicts:
+        _zstd_dicts[codec] = zstandard.ZstdCompressionDict(
+            _ZSTD_DICTIONARIES[codec], dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+    return _zstd_dicts[codec]
+
+
+_zstd_fallback_warned = False
+
+
+def default_codec() -> str:
+    """Codec for new payloads; ANALYSIS_PAYLOAD_CODEC=zstd without zstandard falls back to zlib"""
+    global _zstd_fallback_warned
+    if ANALYSIS_PAYLOAD_CODEC in ('zstd', 'auto') and ZSTD_AVAILABLE:
+        return CURRENT_ZSTD_CODEC
+    if ANALYSIS_PAYLOAD_CODEC == 'zstd' and not _zstd_fallback_warned:
+        _zstd_fallback_warned = True
+        print("⚠️  ANALYSIS_PAYLOAD_CODEC=zstd but the zstandard package is not installed; storing zlib payloads")
+    return CURRENT_ZLIB_CODEC
+
+
+def compress(data: bytes, codec=None):
+    """
+    Returns:
+        tuple: (codec id, compressed bytes)
+    """
+    codec = codec or default_codec()
+    if codec in _ZSTD_DICTIONARIES:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError(f"Cannot compress with {codec}: the zstandard package is not installed")
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=_zstd_dict(codec))
+        return codec, compressor.compress(data)
+    compressor = zlib.compressobj(ZLIB_LEVEL, zdict=_ZLIB_DICTIONARIES[codec])
+    return codec, compressor.compress(data) + compressor.flush()
+
+
+def decompress(codec: str, blob) -> bytes:
+    blob = bytes(blob)
+    if codec in _ZSTD_DICTIONARIES:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError(f"Payload stored with {codec} but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor(dict_data=_zstd_dict(codec)).decompress(blob)
+    if codec in _ZLIB_DICTIONARIES:
+        decompressor = zlib.decompressobj(zdict=_ZLIB_DICTIONARIES[codec])
+        return decompressor.decompress(blob) + decompressor.flush()
+    raise ValueError(f"Unknown payload codec: {codec}")
+
+
+def encode_stock_output(agent_output: dict):
+    """
+    Compress an agent output for storage, parsed sections included, so a
+    stored row decodes to the same sections whatever the parser becomes.
+
+    Returns:
+        tuple: (codec id, compressed bytes)
+    """
+    return compress(json.dumps(agent_output).encode('utf-8'))
+
+
+def decode_stock_output(codec: str, blob) -> dict:
+    output = json.loads(decompress(codec, blob))
+    # Payloads written before sections were stored keep only raw_text
+    if output.pop('sections_derived', False):
+        output['sections'] = split_stock_sections(output['sections']['raw_text'])
+    return output
+
+
+def encode_sections(sections: dict):
+    """Compress MOAT analysis sections for storage"""
+    return compress(json.dumps(sections).encode('utf-8'))
+
+
+def decode_sections(codec: str, blob) -> dict:
+    return json.loads(decompress(codec, blob))
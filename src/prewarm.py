@@ -0,0 +1,179 @@
+# =============================================================================
+# ANALYSIS PRE-WARMING
+# Tracks which tickers users ask for and refreshes the most popular stock and
+# MOAT analyses off-peak, so daytime requests hit a fresh cached result
+# =============================================================================
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from batch_analysis import iter_concurrent
+from db_utils import fetch_latest_analyses
+from run_watchlist_scriptv2 import WATCHLIST_SYMBOLS
+
+ANALYSIS_REQUESTS_PATH = os.getenv(
+    "ANALYSIS_REQUESTS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_requests.db")
+)
+# Agent runs (one stock or MOAT analysis each) a single pre-warm may spend
+PREWARM_MODEL_CALL_BUDGET = int(os.getenv("PREWARM_MODEL_CALL_BUDGET", "40"))
+PREWARM_LOOKBACK_DAYS = int(os.getenv("PREWARM_LOOKBACK_DAYS", "14"))
+# Cached analyses younger than this are left alone
+PREWARM_FRESH_HOURS = int(os.getenv("PREWARM_FRESH_HOURS", "20"))
+PREWARM_HOUR = int(os.getenv("PREWARM_HOUR", "2"))
+PREWARM_MINUTE = int(os.getenv("PREWARM_MINUTE", "0"))
+
+# Extra requests a watchlist ticker counts as when ranking. At 0, membership
+# only breaks ties between tickers with the same request count, so demand
+# decides the plan instead of the watchlist's alphabetical order
+WATCHLIST_WEIGHT = float(os.getenv("PREWARM_WATCHLIST_WEIGHT", "0"))
+PREWARM_KINDS = ('stock', 'moat')
+# Tickers whose cached analyses are checked per batched database read
+PREWARM_PLAN_BATCH_SIZE = 200
+
+
+class RequestTracker:
+    """
+    Per-ticker analysis request log kept in SQLite, shared by all gunicorn workers.
+    """
+
+    def __init__(self, path=ANALYSIS_REQUESTS_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS analysis_requests (
+                ticker TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                requested_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_analysis_requests_time
+                ON analysis_requests (requested_at);
+        """)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            self._local.conn = conn
+        return conn
+
+    def record(self, ticker, kind):
+        """Log one analysis request; never lets tracking break the request"""
+        try:
+            self._connect().execute(
+                "INSERT INTO analysis_requests (ticker, kind, requested_at) VALUES (?, ?, ?);",
+                (ticker, kind, time.time())
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not record analysis request for {ticker}: {e}")
+
+    def counts(self, lookback_days=PREWARM_LOOKBACK_DAYS) -> dict:
+        """Request counts per ticker over the lookback window, pruning older rows"""
+        cutoff = time.time() - lookback_days * 86400
+        conn = self._connect()
+        conn.execute("DELETE FROM analysis_requests WHERE requested_at < ?;", (cutoff,))
+        rows = conn.execute(
+            "SELECT ticker, COUNT(*) FROM analysis_requests WHERE requested_at >= ? GROUP BY ticker;",
+            (cutoff,)
+        ).fetchall()
+        return dict(rows)
+
+
+request_tracker = RequestTracker()
+
+
+def rank_tickers(counts, watchlist=WATCHLIST_SYMBOLS, watchlist_weight=WATCHLIST_WEIGHT):
+    """
+    Order tickers by recent request count, with watchlist membership adding
+    `watchlist_weight` requests and then breaking ties.
+
+    Returns:
+        list: Ticker symbols, most valuable to pre-warm first
+    """
+    members = set(watchlist)
+    scores = dict(counts)
+    for ticker in members:
+        scores[ticker] = scores.get(ticker, 0) + watchlist_weight
+    return sorted(scores, key=lambda ticker: (-scores[ticker], ticker not in members, ticker))
+
+
+def is_fresh(cached, fresh_hours=PREWARM_FRESH_HOURS) -> bool:
+    """Whether a cached analysis (with an ISO 'timestamp') is recent enough to keep"""
+    if not cached or not cached.get('timestamp'):
+        return False
+    try:
+        generated_at = datetime.fromisoformat(str(cached['timestamp']))
+    except ValueError:
+        return False
+    return generated_at >= datetime.now() - timedelta(hours=fresh_hours)
+
+
+def plan_prewarm(ranked, budget=PREWARM_MODEL_CALL_BUDGET, kinds=PREWARM_KINDS):
+    """
+    Pick the stale (kind, ticker) analyses to refresh, best-ranked first.
+
+    Cached analyses are checked with one fetch_latest_analyses() query per
+    PREWARM_PLAN_BATCH_SIZE tickers rather than one query per ticker and kind.
+
+    Returns:
+        list: (kind, ticker) tasks, at most `budget` long
+    """
+    tasks = []
+    for start in range(0, len(ranked), PREWARM_PLAN_BATCH_SIZE):
+        batch = ranked[start:start + PREWARM_PLAN_BATCH_SIZE]
+        try:
+            latest = fetch_latest_analyses(batch)
+        except Exception as e:
+            print(f"⚠️  Could not check cached analyses: {e}")
+            return tasks
+
+        for ticker in batch:
+            for kind in kinds:
+                if len(tasks) >= budget:
+                    return tasks
+                if not is_fresh(latest[ticker][kind]):
+                    tasks.append((kind, ticker))
+    return tasks
+
+
+def run_prewarm(job_queue, budget=PREWARM_MODEL_CALL_BUDGET, parallelism=None):
+    """
+    Refresh the most popular stale analyses through the analysis job queue.
+
+    Going through the queue means a pre-warm and a live request for the same
+    ticker share one agent run, and the queue's worker count bounds load.
+
+    Args:
+        job_queue (AnalysisJobQueue): Queue with 'stock' and 'moat' runners registered
+        budget (int): Maximum agent runs to spend
+        parallelism (int): Jobs to keep in flight (default: the queue's worker count)
+
+    Returns:
+        dict: Counts of refreshed, failed and planned analyses
+    """
+    start = time.time()
+    ranked = rank_tickers(request_tracker.counts())
+    tasks = plan_prewarm(ranked, budget)
+    print(f"🌙 Pre-warming {len(tasks)} analyses (budget {budget}, {len(ranked)} ranked tickers)")
+
+    def run_task(task):
+        kind, ticker = task
+        job, _ = job_queue.submit(kind, ticker)
+        # Unbounded: the queue fails jobs whose worker dies, and pre-warm runs off-peak
+        return job_queue.wait(job['job_id'], timeout=None)
+
+    refreshed = failed = 0
+    parallelism = parallelism or job_queue.max_workers
+    for (kind, ticker), job, error in iter_concurrent(tasks, run_task, parallelism):
+        if error is None and job and job['status'] == 'succeeded':
+            refreshed += 1
+        else:
+            failed += 1
+            print(f"❌ Pre-warm {kind} {ticker} failed: {error or (job and job['error'])}")
+
+    print(f"✅ Pre-warm finished: {refreshed} refreshed, {failed} failed in {time.time() - start:.0f}s")
+    return {'planned': len(tasks), 'refreshed': refreshed, 'failed': failed}
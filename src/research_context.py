@@ -0,0 +1,260 @@
+# =============================================================================
+# SHARED RESEARCH CONTEXT
+# Stock data, news and baseline searches gathered once per ticker and handed
+# to both the stock and MOAT agents as pre-fetched context. Searches are kept
+# for the day, stock data and news for a few minutes; each query group is
+# only searched once an analysis that uses it runs
+# =============================================================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from context_compaction import compact_search_results
+from search_executor import run_parallel_searches
+
+RESEARCH_CONTEXT_PATH = os.getenv(
+    "RESEARCH_CONTEXT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "research_context.db")
+)
+RESEARCH_CONTEXT_RETENTION_DAYS = int(os.getenv("RESEARCH_CONTEXT_RETENTION_DAYS", "3"))
+# Stock data and news older than this are fetched again before an analysis uses them
+RESEARCH_MARKET_DATA_TTL_MINUTES = int(os.getenv("RESEARCH_MARKET_DATA_TTL_MINUTES", "15"))
+
+# strategic_web_search reports failures and empty searches as text with this prefix
+FAILED_SEARCH_PREFIX = "🚨"
+
+# Baseline market context used by the stock analysis
+MARKET_QUERIES = [
+    "{ticker} stock analysis 2025 outlook",
+    "{ticker} recent earnings guidance analyst expectations",
+]
+
+# Competitor intelligence used by the MOAT analysis
+COMPETITOR_QUERIES = [
+    "{ticker} main competitors 2025",
+    "{ticker} vs competitors market share",
+    "{ticker} competitive threats disruption",
+    "top differentiators for competitors of {ticker}",
+    "{ticker} industry competition analysis",
+]
+
+
+def context_queries(ticker, templates):
+    return [template.format(ticker=ticker) for template in templates]
+
+
+def is_usable_result(result) -> bool:
+    """Whether a search or news result holds research rather than a failure notice"""
+    return bool(result) and not str(result).lstrip().startswith(FAILED_SEARCH_PREFIX)
+
+
+def market_data(ticker, fetch_stock_data, fetch_news):
+    """The context fields with a short TTL: stock data and news, stamped with when they were fetched"""
+    stock_data = fetch_stock_data(ticker)
+    news = fetch_news(ticker)
+    return {
+        'stock_data': stock_data,
+        'news': news if is_usable_result(news) else '',
+        'market_data_at': time.time(),
+    }
+
+
+def build_context(ticker, fetch_stock_data, fetch_news):
+    """
+    Gather the research both agents start from. Searches are not run here:
+    each query group is added by ensure_searches() when an analysis first needs it.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        fetch_stock_data: Callable(ticker) returning the stock data dict
+        fetch_news: Callable(ticker) returning formatted recent news
+
+    Returns:
+        dict: {'ticker', 'date', 'built_at', 'stock_data', 'news',
+            'market_data_at', 'searches'}
+    """
+    return {
+        'ticker': ticker,
+        'date': datetime.now().strftime("%Y-%m-%d"),
+        'built_at': time.time(),
+        **market_data(ticker, fetch_stock_data, fetch_news),
+        'searches': {},
+    }
+
+
+def market_data_is_fresh(context) -> bool:
+    """Whether the context's stock data and news are within RESEARCH_MARKET_DATA_TTL_MINUTES"""
+    fetched_at = context.get('market_data_at', context['built_at'])
+    return time.time() - fetched_at < RESEARCH_MARKET_DATA_TTL_MINUTES * 60
+
+
+def run_searches(queries, search):
+    """
+    Run queries concurrently, returning {query: result} for the ones that
+    found something. Failed and empty searches are left out, so the next
+    analysis tries them again.
+    """
+    searches = {}
+    for query, result, error in run_parallel_searches(search, queries, 3):
+        if error is None and is_usable_result(result):
+            searches[query] = result
+        else:
+            print(f"   ❌ Research search failed: {query}: {error or str(result).strip()[:120]}")
+    return searches
+
+
+def format_searches(context, templates, token_budget=None):
+    """
+    Render the context's results for one query group as prompt text,
+    compacted to roughly `token_budget` tokens when one is given.
+    """
+    searches = [
+        (query, context['searches'][query])
+        for query in context_queries(context['ticker'], templates)
+        if context['searches'].get(query)
+    ]
+    if token_budget:
+        return compact_search_results(searches, token_budget, label=f"{context['ticker']} research context")
+    return "\n".join(f"Query: {query}\n{result}\n{'=' * 50}\n" for query, result in searches)
+
+
+def format_context(context, templates, token_budget=None):
+    """Render stock data, news and one query group as a prompt section"""
+    return (
+        f"STOCK DATA (get_stock_data):\n{json.dumps(context['stock_data'], indent=2, default=str)}\n\n"
+        f"RECENT NEWS (enhanced_get_recent_news):\n{context['news']}\n\n"
+        f"SEARCH RESULTS:\n{format_searches(context, templates, token_budget)}"
+    )
+
+
+class ResearchContextStore:
+    """
+    Day-scoped research contexts in SQLite, shared across gunicorn workers.
+
+    Within a process, concurrent requests for the same ticker wait for the
+    first build instead of repeating its I/O. A forced refresh drops the
+    ticker's context with invalidate() so the next analysis starts over.
+    """
+
+    def __init__(self, path=RESEARCH_CONTEXT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS research_contexts (
+                ticker TEXT NOT NULL,
+                day TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                built_at REAL NOT NULL,
+                PRIMARY KEY (ticker, day)
+            );
+        """)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            self._local.conn = conn
+        return conn
+
+    def _ticker_lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def peek(self, ticker):
+        """Today's context for the ticker, or None without building one"""
+        row = self._connect().execute(
+            "SELECT payload FROM research_contexts WHERE ticker = ? AND day = ?;",
+            (ticker.upper(), datetime.now().strftime("%Y-%m-%d"))
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def fresh(self, ticker):
+        """Today's context for the ticker if its stock data and news are still fresh, else None"""
+        context = self.peek(ticker)
+        return context if context and market_data_is_fresh(context) else None
+
+    def invalidate(self, ticker):
+        """Drop the ticker's context for today, e.g. before a forced refresh"""
+        self._connect().execute(
+            "DELETE FROM research_contexts WHERE ticker = ? AND day = ?;",
+            (ticker.upper(), datetime.now().strftime("%Y-%m-%d"))
+        )
+
+    def get_or_build(self, ticker, fetch_stock_data, fetch_news):
+        """
+        Today's context for the ticker, built with the fetchers if there is
+        none. Stock data and news past their TTL are fetched again; searches
+        are kept.
+
+        Args:
+            fetch_stock_data: Callable(ticker) returning the stock data dict
+            fetch_news: Callable(ticker) returning formatted recent news
+        """
+        ticker = ticker.upper()
+        context = self.fresh(ticker)
+        if context:
+            print(f"📚 Reusing research context for {ticker} from {datetime.fromtimestamp(context['built_at']):%H:%M}")
+            return context
+
+        with self._ticker_lock(ticker):
+            context = self.peek(ticker)
+            if context and market_data_is_fresh(context):
+                return context
+
+            if context:
+                print(f"📚 Refreshing stock data and news in the research context for {ticker}...")
+                context.update(market_data(ticker, fetch_stock_data, fetch_news))
+            else:
+                print(f"📚 Building research context for {ticker}...")
+                context = build_context(ticker, fetch_stock_data, fetch_news)
+            self._save(context)
+            return context
+
+    def ensure_searches(self, context, templates, search):
+        """
+        The context with one query group's searches, running the ones no
+        earlier analysis needed and saving them for the rest of the day.
+
+        Args:
+            context (dict): Context from get_or_build()
+            templates (list): Query group, e.g. MARKET_QUERIES
+            search: Callable(query, num_results) returning formatted results
+
+        Returns:
+            dict: The context, including results for every query in the group
+        """
+        ticker = context['ticker'].upper()
+        queries = context_queries(context['ticker'], templates)
+        if all(query in context['searches'] for query in queries):
+            return context
+
+        with self._ticker_lock(ticker):
+            # Another request may have run the group (or rebuilt the context) meanwhile
+            context = self.peek(ticker) or context
+            missing = [query for query in queries if query not in context['searches']]
+            if missing:
+                print(f"📚 Adding {len(missing)} research searches for {ticker}...")
+                context['searches'].update(run_searches(missing, search))
+                self._save(context)
+            return context
+
+    def _save(self, context):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO research_contexts (ticker, day, payload, built_at) VALUES (?, ?, ?, ?);",
+            (context['ticker'].upper(), context['date'], json.dumps(context, default=str), context['built_at'])
+        )
+        conn.execute(
+            "DELETE FROM research_contexts WHERE built_at < ?;",
+            (time.time() - RESEARCH_CONTEXT_RETENTION_DAYS * 86400,)
+        )
+
+
+research_contexts = ResearchContextStore()
@@ -0,0 +1,201 @@
+# =============================================================================
+# DUCKDUCKGO HTML RESULT EXTRACTOR
+# Streaming extraction of search results from html.duckduckgo.com pages
+# =============================================================================
+
+import threading
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Bytes fed to the streaming parser between checks for enough results
+CHUNK_SIZE = 16 * 1024
+
+CONTAINER_SELECTORS = ['.result', '.links_main', '.result__body', 'div[class*="result"]']
+TITLE_SELECTORS = ['.result__title a', '.result__a', 'h2 a', 'h3 a', 'a']
+SNIPPET_SELECTORS = ['.result__snippet', '.result__body', '.snippet', 'p']
+
+
+# =============================================================================
+# LXML PREDICATES
+# lxml equivalents of the CSS selectors above, without building a full soup
+# =============================================================================
+
+def _classes(el):
+    return (el.get('class') or '').split()
+
+
+def _has_ancestor(el, container, predicate):
+    parent = el.getparent()
+    while parent is not None and parent is not container:
+        if predicate(parent):
+            return True
+        parent = parent.getparent()
+    return False
+
+
+_CONTAINER_PREDICATES = {
+    '.result': lambda el: 'result' in _classes(el),
+    '.links_main': lambda el: 'links_main' in _classes(el),
+    '.result__body': lambda el: 'result__body' in _classes(el),
+    'div[class*="result"]': lambda el: el.tag == 'div' and 'result' in (el.get('class') or ''),
+}
+
+_DESCENDANT_PREDICATES = {
+    '.result__title a': lambda el, c: el.tag == 'a' and _has_ancestor(el, c, lambda p: 'result__title' in _classes(p)),
+    '.result__a': lambda el, c: 'result__a' in _classes(el),
+    'h2 a': lambda el, c: el.tag == 'a' and _has_ancestor(el, c, lambda p: p.tag == 'h2'),
+    'h3 a': lambda el, c: el.tag == 'a' and _has_ancestor(el, c, lambda p: p.tag == 'h3'),
+    'a': lambda el, c: el.tag == 'a',
+    '.result__snippet': lambda el, c: 'result__snippet' in _classes(el),
+    '.result__body': lambda el, c: 'result__body' in _classes(el),
+    '.snippet': lambda el, c: 'snippet' in _classes(el),
+    'p': lambda el, c: el.tag == 'p',
+    'a[href]': lambda el, c: el.tag == 'a' and el.get('href') is not None,
+}
+
+
+class ResultExtractor:
+    """Extracts (title, snippet, url) results, remembering which container selector worked"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._container_order = list(CONTAINER_SELECTORS)
+
+    @property
+    def container_order(self):
+        return list(self._container_order)
+
+    def _remember(self, selector):
+        with self._lock:
+            if self._container_order[0] != selector:
+                self._container_order.remove(selector)
+                self._container_order.insert(0, selector)
+
+    def extract(self, html, num_results):
+        """
+        Extract up to `num_results` search results from a DuckDuckGo HTML page.
+
+        Args:
+            html (bytes | str): Raw page content
+            num_results (int): Maximum number of result containers to read
+
+        Returns:
+            tuple: (results, selector) where results is a list of
+                (title, snippet, url) tuples and selector is the container
+                selector that matched, or None
+        """
+        if isinstance(html, str):
+            html = html.encode('utf-8')
+
+        order = self.container_order
+        if LXML_AVAILABLE:
+            containers, selector = self._stream_containers(html, num_results, order)
+            results = [self._lxml_entry(c) for c in containers]
+        else:
+            containers, selector = self._soup_containers(html, order)
+            results = [self._soup_entry(c) for c in containers[:num_results]]
+
+        if selector:
+            self._remember(selector)
+        return [r for r in results if r], selector
+
+    # -------------------------------------------------------------------------
+    # Streaming lxml path
+    # -------------------------------------------------------------------------
+
+    def _stream_containers(self, html, num_results, order):
+        parser = etree.HTMLPullParser(events=('end',))
+        candidates = {selector: [] for selector in order}
+        preferred = order[0]
+
+        def drain():
+            for _, el in parser.read_events():
+                if not isinstance(el.tag, str):
+                    continue
+                for selector in order:
+                    if _CONTAINER_PREDICATES[selector](el):
+                        found = candidates[selector]
+                        # Inner matches end first; keep only the outermost container
+                        while found and _has_ancestor(found[-1], None, lambda p: p is el):
+                            found.pop()
+                        found.append(el)
+            return len(candidates[preferred]) >= num_results
+
+        for start in range(0, len(html), CHUNK_SIZE):
+            parser.feed(html[start:start + CHUNK_SIZE])
+            if drain():
+                return candidates[preferred][:num_results], preferred
+
+        parser.close()
+        drain()
+        for selector in order:
+            if candidates[selector]:
+                return candidates[selector][:num_results], selector
+        return [], None
+
+    @staticmethod
+    def _lxml_find(container, selector):
+        predicate = _DESCENDANT_PREDICATES[selector]
+        for el in container.iterdescendants():
+            if isinstance(el.tag, str) and predicate(el, container):
+                return el
+        return None
+
+    def _lxml_entry(self, container):
+        title = self._first_text(container, TITLE_SELECTORS, 10, self._lxml_find, lambda el: ''.join(el.itertext()))
+        snippet = self._first_text(container, SNIPPET_SELECTORS, 30, self._lxml_find, lambda el: ''.join(el.itertext()))
+        url_elem = self._lxml_find(container, 'a[href]')
+        url = url_elem.get('href', '') if url_elem is not None else ''
+        return self._entry(title, snippet, url)
+
+    # -------------------------------------------------------------------------
+    # BeautifulSoup fallback when lxml is not installed
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _soup_containers(html, order):
+        soup = BeautifulSoup(html, 'html.parser')
+        for selector in order:
+            found = soup.select(selector)
+            if found:
+                return found, selector
+        return [], None
+
+    def _soup_entry(self, container):
+        title = self._first_text(container, TITLE_SELECTORS, 10, lambda c, s: c.select_one(s), lambda el: el.get_text())
+        snippet = self._first_text(container, SNIPPET_SELECTORS, 30, lambda c, s: c.select_one(s), lambda el: el.get_text())
+        url_elem = container.select_one('a[href]')
+        url = url_elem.get('href', '') if url_elem else ''
+        return self._entry(title, snippet, url)
+
+    # -------------------------------------------------------------------------
+    # Shared helpers
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _first_text(container, selectors, min_length, find, get_text):
+        """Text of the first selector match, preferring one longer than min_length"""
+        text = None
+        for selector in selectors:
+            el = find(container, selector)
+            if el is not None:
+                text = get_text(el).strip()
+                if len(text) > min_length:  # Quality filter
+                    break
+        return text
+
+    @staticmethod
+    def _entry(title, snippet, url):
+        if title and snippet and len(snippet) > 30:
+            return title, snippet, url
+        return None
+
+
+# Process-wide extractor so the selector preference carries across searches
+result_extractor = ResultExtractor()
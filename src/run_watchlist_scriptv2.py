@@ -9,6 +9,9 @@ import matplotlib.pyplot as plt
 
 warnings.filterwarnings("ignore")
 
+# 'yfinance' uses daily closes only; 'schwab' overlays live prices from batched Schwab quotes
+WATCHLIST_PRICE_SOURCE = os.getenv("WATCHLIST_PRICE_SOURCE", "yfinance").lower()
+
 # ---------------------------------------------------
 #                 TECHNICAL INDICATORS
 # ---------------------------------------------------
@@ -120,11 +123,74 @@ def calculate_fibonacci_levels(prices: pd.Series):
         levels.append({'Level': p, 'Price': price, 'Type': typ})
     return levels
 
+# ---------------------------------------------------
+#                 LIVE PRICES
+# ---------------------------------------------------
+
+def fetch_schwab_prices(symbols) -> pd.DataFrame:
+    """
+    Last trade per symbol, from a handful of batched Schwab quote requests.
+
+    Returns:
+        pd.DataFrame: 'price' and 'trade_time' (epoch milliseconds) per symbol
+    """
+    from schwab_api.auth import SchwabAuth
+    from schwab_api.client import SchwabClient
+    from schwab_api.rate_limiter import schwab_rate_limiter
+
+    client = SchwabClient(SchwabAuth())
+    try:
+        quotes = client.get_quotes_batch(symbols, fields="quote")
+    finally:
+        client.close()
+
+    usage = schwab_rate_limiter.usage()
+    print(f"Schwab budget: {usage['in_use']}/{usage['burst']} burst slots in use, "
+          f"next slot in {usage['next_slot_in']:.1f}s")
+    if quotes.attrs.get('invalid_symbols'):
+        print(f"Schwab rejected symbols: {', '.join(quotes.attrs['invalid_symbols'])}")
+    if 'quote.lastPrice' not in quotes or 'quote.tradeTime' not in quotes:
+        return pd.DataFrame(columns=['price', 'trade_time'])
+    return pd.DataFrame({
+        'price': pd.to_numeric(quotes['quote.lastPrice'], errors='coerce'),
+        'trade_time': pd.to_numeric(quotes['quote.tradeTime'], errors='coerce'),
+    }).dropna()
+
+
+def apply_live_prices(price_data: pd.DataFrame, live_quotes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Set today's close to the live price, adding today's row if history ends earlier.
+
+    Only quotes traded today count. On weekends and holidays the last trade is
+    from an earlier session, and a bar for today would repeat that close as a
+    zero-change day, so the history is returned unchanged.
+    """
+    today = pd.Timestamp(datetime.now().date())
+    traded_today = [
+        ticker for ticker, trade_time in live_quotes['trade_time'].items()
+        if ticker in price_data.columns and datetime.fromtimestamp(trade_time / 1000).date() == today.date()
+    ]
+    if not traded_today:
+        return price_data
+
+    price_data = price_data.copy()
+    if today not in price_data.index:
+        price_data.loc[today] = np.nan
+    for ticker in traded_today:
+        price_data.loc[today, ticker] = live_quotes.at[ticker, 'price']
+    return price_data
+
 # ---------------------------------------------------
 #                 CORE DATA FRAME
 # ---------------------------------------------------
 
-def create_rsi_table(symbols):
+def create_rsi_table(symbols, price_source=WATCHLIST_PRICE_SOURCE):
+    """
+    Args:
+        symbols (list): Tickers to report on
+        price_source (str): 'yfinance' for daily closes, or 'schwab' to update
+            the latest close with live quotes before computing RSI and targets
+    """
     end_date = datetime.now()
     start_date = end_date - timedelta(days=365)
 
@@ -144,6 +210,14 @@ def create_rsi_table(symbols):
     if price_data.empty:
         raise RuntimeError("No price data returned. Check ticker list or network.")
 
+    if price_source == 'schwab':
+        try:
+            price_data = apply_live_prices(price_data, fetch_schwab_prices(symbols))
+        except Exception as e:
+            print(f"Schwab quotes failed, using yfinance closes: {e}")
+    elif price_source != 'yfinance':
+        raise ValueError(f"Unknown price source: {price_source}")
+
     records = {}
 
     for ticker in symbols:
@@ -236,12 +310,10 @@ def plot_stock_chart(symbol, start_date, end_date, folder):
     path=os.path.join(folder,f"{symbol}.png"); plt.savefig(path); plt.close(); return path
 
 # ---------------------------------------------------
-#                     MAIN ENTRY
+#                     WATCHLIST
 # ---------------------------------------------------
 
-def main(return_dataframe=False):
-    today=datetime.today().strftime('%Y-%m-%d')
-    symbols = [
+WATCHLIST_SYMBOLS = [
     # Global mega‑cap platforms
     "AAPL", "AMZN", "GOOG", "META", "MSFT",
 
@@ -307,6 +379,13 @@ def main(return_dataframe=False):
     "GLBE", "IOT",  "PATH", "ENVX", "APP", "ESTC"
 ]
 
+# ---------------------------------------------------
+#                     MAIN ENTRY
+# ---------------------------------------------------
+
+def main(return_dataframe=False):
+    today=datetime.today().strftime('%Y-%m-%d')
+    symbols = WATCHLIST_SYMBOLS
 
     downloads=os.path.join(os.path.expanduser('~'),'Downloads')
     excel_path=os.path.join(downloads,f"{today}_2030_Price_Targets_AA.xlsx")
@@ -1,10 +1,14 @@
-import requests
+import http_transport
+import threading
 import time
 import base64
-from schwab_api.config import CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN, TOKEN_URL
+from schwab_api.config import CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN, TOKEN_URL, TOKEN_REFRESH_MARGIN
+
+# Wait before retrying a failed background refresh
+REFRESH_RETRY_SECONDS = 30
 
 class SchwabAuth:
-    def __init__(self):
+    def __init__(self, refresh_margin=TOKEN_REFRESH_MARGIN):
         self.client_id = CLIENT_ID
         self.client_secret = CLIENT_SECRET
         self.refresh_token = REFRESH_TOKEN
@@ -12,6 +16,11 @@ class SchwabAuth:
         self.scope = 'readonly'
         self.access_token = None
         self.token_expiry = 0
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresher = None
+        self._stop = threading.Event()
 
     def _get_basic_auth_header(self):
         auth_str = f"{self.client_id}:{self.client_secret}"
@@ -30,14 +39,54 @@ class SchwabAuth:
             **self._get_basic_auth_header()
         }
 
-        response = requests.post(self.token_url, headers=headers, data=data)
+        response = http_transport.post(self.token_url, headers=headers, data=data)
         response.raise_for_status()
 
         tokens = response.json()
-        self.access_token = tokens['access_token']
-        self.token_expiry = time.time() + tokens.get('expires_in', 1800)
+        with self._lock:
+            self.access_token = tokens['access_token']
+            self.token_expiry = time.time() + tokens.get('expires_in', 1800)
+
+    def get_access_token(self, force_refresh=False):
+        """
+        Current access token. Only blocks on a refresh when there is no valid
+        token (first use, or the background refresher fell behind) or when
+        force_refresh is set after the API rejected the token.
+        """
+        token = self.access_token
+        if not force_refresh and token and time.time() < self.token_expiry:
+            return token
 
-    def get_access_token(self):
-        if not self.access_token or time.time() > self.token_expiry:
+        # One thread refreshes; the others wait and reuse its token
+        with self._refresh_lock:
+            if self.access_token and self.access_token != token and time.time() < self.token_expiry:
+                return self.access_token
+            if not force_refresh and self.access_token and time.time() < self.token_expiry:
+                return self.access_token
             self.refresh_access_token()
-        return self.access_token
+            return self.access_token
+
+    def start_auto_refresh(self):
+        """Refresh the token in a daemon thread shortly before each expiry (idempotent)"""
+        if self._refresher and self._refresher.is_alive():
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(target=self._refresh_loop, name="schwab-token-refresh", daemon=True)
+        self._refresher.start()
+
+    def stop_auto_refresh(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            delay = self.token_expiry - self.refresh_margin - time.time()
+            if delay > 0:
+                self._stop.wait(delay)
+                continue
+            try:
+                with self._refresh_lock:
+                    if self.token_expiry - self.refresh_margin - time.time() <= 0:
+                        self.refresh_access_token()
+            except Exception as e:
+                print(f"⚠️ Schwab token refresh failed, retrying in {REFRESH_RETRY_SECONDS}s: {e}")
+                self._stop.wait(REFRESH_RETRY_SECONDS)
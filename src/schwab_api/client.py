@@ -1,34 +1,167 @@
+import random
+import time
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 
-from schwab_api.rate_limiter import RateLimiter
-import uuid
+from schwab_api.config import (
+    REQUEST_TIMEOUT, MAX_RETRIES, BACKOFF_BASE, BACKOFF_MAX, RETRY_AFTER_MAX, POOL_MAXSIZE,
+    QUOTES_MAX_SYMBOLS, QUOTES_MAX_URL_LENGTH, QUOTES_MAX_WORKERS
+)
+from schwab_api.rate_limiter import schwab_rate_limiter
 from schwab_api.exceptions import SchwabAPIError
 
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def build_session(pool_maxsize=POOL_MAXSIZE):
+    """
+    Keep-alive session for the market data host. The adapter never retries;
+    every retry (connection errors, timeouts and 429/5xx) is made by _get so
+    it goes through the rate limiter and can refresh the token.
+    """
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_maxsize,
+        pool_block=True,
+        max_retries=0,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    return session
+
+
+def retry_after_seconds(response):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP-date), or None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_seconds(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def chunk_symbols(symbols, max_symbols=QUOTES_MAX_SYMBOLS, max_url_length=QUOTES_MAX_URL_LENGTH, base_length=0):
+    """
+    Split symbols into /quotes-sized chunks, deduplicated in order.
+
+    Args:
+        symbols (list): Ticker symbols
+        max_symbols (int): Most symbols per chunk
+        max_url_length (int): Longest allowed request URL
+        base_length (int): URL length without the symbols value
+
+    Returns:
+        list: Lists of symbols, each within both limits
+    """
+    budget = max_url_length - base_length
+    comma = len(urllib.parse.quote(','))
+    chunks, chunk, length = [], [], 0
+
+    for symbol in dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()):
+        encoded = len(urllib.parse.quote(symbol, safe=''))
+        added = encoded + (comma if chunk else 0)
+        if chunk and (len(chunk) >= max_symbols or length + added > budget):
+            chunks.append(chunk)
+            chunk, length, added = [], 0, encoded
+        chunk.append(symbol)
+        length += added
+
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
 
 class SchwabClient:
     BASE_URL = 'https://api.schwabapi.com/marketdata/v1'
 
-    def __init__(self, auth):
+    def __init__(self, auth, session=None, timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES, ratelimiter=None):
         self.auth = auth
-        self.ratelimiter = RateLimiter()
+        # Shared by default so every client draws from the one account budget
+        self.ratelimiter = ratelimiter or schwab_rate_limiter
+        self.session = session or build_session()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.auth.start_auto_refresh()
 
-    def _get(self, endpoint, params=None):
-        self.ratelimiter.wait()
+    def close(self):
+        self.auth.stop_auto_refresh()
+        self.session.close()
 
+    def _get(self, endpoint, params=None):
+        url = f"{self.BASE_URL}/{endpoint.lstrip('/')}"
         correlation_id = str(uuid.uuid4())
-        headers = {
-            'Authorization': f'Bearer {self.auth.get_access_token()}',
-            'Accept': 'application/json',
-            'Schwab-Client-CorrelId': correlation_id,
-            'Schwab-Resource-Version': '1'
-        }
-
-        response = requests.get(f"{self.BASE_URL}/{endpoint}", headers=headers, params=params)
-
-        if response.status_code == 200:
-            return response.json()
+        force_refresh = False
+        attempt = 0
+
+        while True:
+            self.ratelimiter.wait()
+            headers = {
+                'Authorization': f'Bearer {self.auth.get_access_token(force_refresh=force_refresh)}',
+                'Accept': 'application/json',
+                'Schwab-Client-CorrelId': correlation_id,
+                'Schwab-Resource-Version': '1'
+            }
+
+            try:
+                response = self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_seconds(attempt)
+                print(f"⚠️ Schwab request to {endpoint} failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if response.status_code == 200:
+                return response.json()
+
+            # An expired or revoked token gets one forced refresh
+            if response.status_code == 401 and not force_refresh:
+                force_refresh = True
+                continue
+            force_refresh = False
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                retry_after = retry_after_seconds(response)
+                if retry_after is None:
+                    delay = backoff_seconds(attempt)
+                    print(f"⚠️ Schwab returned {response.status_code} for {endpoint}, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                elif retry_after > RETRY_AFTER_MAX:
+                    print(f"🚨 Schwab asked to retry {endpoint} after {retry_after:.0f}s, giving up")
+                    break
+                else:
+                    # The server's pause applies to the whole account, so every
+                    # client waits it out in ratelimiter.wait() at the loop top
+                    print(f"⚠️ Schwab returned {response.status_code} for {endpoint}, retrying in {retry_after:.1f}s")
+                    self.ratelimiter.defer(retry_after)
+                attempt += 1
+                continue
+            break
 
         # Attempt to parse error payload
+        error_list = []
         try:
             error_payload = response.json()
             error_list = error_payload.get("errors", [])
@@ -39,7 +172,7 @@ class SchwabClient:
         raise SchwabAPIError(
             status_code=response.status_code,
             message=details or "Unknown error",
-            errors=error_list if 'error_list' in locals() else [],
+            errors=error_list,
             correlation_id=correlation_id
         )
 
@@ -67,6 +200,44 @@ class SchwabClient:
 
         return self._get(endpoint, params)
 
+    def get_quotes_batch(self, symbols: list[str], fields: str = "quote", indicative: bool = False,
+                         max_workers: int = QUOTES_MAX_WORKERS) -> pd.DataFrame:
+        """
+        Get quotes for any number of symbols in as few requests as possible.
+
+        Symbols are split into chunks that fit the endpoint's symbol count and
+        URL length, fetched concurrently (every request still passes through
+        the shared rate limiter) and merged into one frame.
+
+        Args:
+            symbols: Ticker symbols; duplicates are fetched once
+            fields: Comma-separated quote sections (e.g. "quote,fundamental")
+            indicative: Whether to include indicative ETFs
+            max_workers: Chunks in flight at once
+
+        Returns:
+            pd.DataFrame: One row per returned symbol, indexed by symbol, with
+                flattened columns such as 'quote.lastPrice'. Symbols Schwab
+                rejected are listed in df.attrs['invalid_symbols'].
+        """
+        base_params = {"symbols": "", "fields": fields, "indicative": str(indicative).lower()}
+        base_length = len(f"{self.BASE_URL}/quotes?{urllib.parse.urlencode(base_params)}")
+        chunks = chunk_symbols(symbols, base_length=base_length)
+
+        merged, invalid = {}, []
+        if chunks:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))),
+                                    thread_name_prefix="schwab-quotes") as executor:
+                for quotes in executor.map(lambda chunk: self.get_quotes(chunk, fields, indicative), chunks):
+                    errors = quotes.pop("errors", None) or {}
+                    invalid.extend(errors.get("invalidSymbols", []))
+                    merged.update(quotes)
+
+        df = pd.json_normalize(list(merged.values())) if merged else pd.DataFrame()
+        df.index = pd.Index(list(merged.keys()), name="symbol")
+        df.attrs["invalid_symbols"] = invalid
+        return df
+
     def get_single_quote(self, symbol: str, fields: str = "all") -> dict:
         """
         Get a quote for a single symbol using path parameter.
@@ -8,3 +8,31 @@ CLIENT_ID = os.getenv("SCHWAB_CLIENT_ID", "fallback-from-config")
 CLIENT_SECRET = os.getenv("SCHWAB_CLIENT_SECRET", "fallback-from-config")
 REFRESH_TOKEN = os.getenv("SCHWAB_REFRESH_TOKEN", "fallback-from-config")
 TOKEN_URL = "https://api.schwabapi.com/v1/oauth/token"
+
+# (connect, read) timeouts in seconds for market data requests
+REQUEST_TIMEOUT = (float(os.getenv("SCHWAB_CONNECT_TIMEOUT", "5")), float(os.getenv("SCHWAB_READ_TIMEOUT", "15")))
+# Retries for 429/5xx responses and connection errors, with jittered exponential backoff
+MAX_RETRIES = int(os.getenv("SCHWAB_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("SCHWAB_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("SCHWAB_BACKOFF_MAX", "30"))
+# Longest Retry-After honoured; a 429/503 asking for more is raised instead of retried
+RETRY_AFTER_MAX = float(os.getenv("SCHWAB_RETRY_AFTER_MAX", "120"))
+POOL_MAXSIZE = int(os.getenv("SCHWAB_POOL_MAXSIZE", "10"))
+# Access tokens are refreshed in the background this many seconds before they expire
+TOKEN_REFRESH_MARGIN = int(os.getenv("SCHWAB_TOKEN_REFRESH_MARGIN", "300"))
+
+# Market data budget shared by every client: at most RATE_LIMIT_MAX_REQUESTS per
+# RATE_LIMIT_WINDOW seconds, of which up to RATE_LIMIT_BURST may go back to back
+RATE_LIMIT_MAX_REQUESTS = int(os.getenv("SCHWAB_RATE_LIMIT_MAX_REQUESTS", "120"))
+RATE_LIMIT_WINDOW = float(os.getenv("SCHWAB_RATE_LIMIT_WINDOW", "600"))
+RATE_LIMIT_BURST = int(os.getenv("SCHWAB_RATE_LIMIT_BURST", "20"))
+# SQLite file coordinating the budget across processes; set it empty for a per-process limiter
+RATE_LIMIT_PATH = os.getenv(
+    "SCHWAB_RATE_LIMIT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schwab_rate_limit.db")
+)
+
+# Batch quotes: symbols per /quotes request, longest request URL allowed, chunks fetched at once
+QUOTES_MAX_SYMBOLS = int(os.getenv("SCHWAB_QUOTES_MAX_SYMBOLS", "100"))
+QUOTES_MAX_URL_LENGTH = int(os.getenv("SCHWAB_QUOTES_MAX_URL_LENGTH", "2000"))
+QUOTES_MAX_WORKERS = int(os.getenv("SCHWAB_QUOTES_MAX_WORKERS", "3"))
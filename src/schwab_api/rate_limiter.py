@@ -1,18 +1,152 @@
+import math
+import os
+import sqlite3
+import threading
 import time
-from collections import deque
+
+from schwab_api.config import RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_WINDOW, RATE_LIMIT_BURST, RATE_LIMIT_PATH
+
 
 class RateLimiter:
-    def __init__(self, max_requests=120, time_window=600):
+    """
+    GCRA (generic cell rate algorithm) limiter holding at most
+    `max_requests` requests in any `time_window` seconds.
+
+    The only state is the theoretical arrival time (TAT) of the next request.
+    Up to `burst` requests go out back to back. After that, requests are
+    spaced one emission interval apart, and the interval is sized so that a
+    full burst plus a window of steady traffic still fits the budget. Each
+    caller reserves its slot under a lock and then sleeps for exactly the
+    wait it was given. Polling is not needed.
+
+    With `path` set, the TAT lives in a SQLite (WAL) file and is updated in
+    an IMMEDIATE transaction. Every process using the same file (e.g. the
+    gunicorn workers) then shares one budget.
+    """
+
+    def __init__(self, max_requests=RATE_LIMIT_MAX_REQUESTS, time_window=RATE_LIMIT_WINDOW,
+                 burst=RATE_LIMIT_BURST, path=None, key='schwab'):
         self.max_requests = max_requests
         self.time_window = time_window
-        self.request_times = deque()
+        self.burst = max(1, min(burst, max_requests - 1))
+        self.emission_interval = time_window / (max_requests - self.burst)
+        self.tolerance = self.emission_interval * (self.burst - 1)
+        self.path = path
+        self.key = key
+        self._lock = threading.Lock()
+        self._tat = 0.0
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _connect(self):
+        # Connections are per thread and are never reused across a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+
+        if not self._schema_ready:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    tat REAL NOT NULL
+                );
+            """)
+            self._schema_ready = True
+        return conn
+
+    def _read_tat(self, conn):
+        row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?;", (self.key,)).fetchone()
+        return row[0] if row else 0.0
+
+    def _reserve(self, now):
+        """Claim the next slot, returning the seconds to wait before using it"""
+        tat = max(self._tat, now)
+        allow_at = tat - self.tolerance
+        self._tat = tat + self.emission_interval
+        return max(0.0, allow_at - now)
+
+    def _update(self, step):
+        """Run step(now) on the current TAT, persisting it when shared"""
+        with self._lock:
+            # Wall-clock time, so every process agrees on the TAT
+            now = time.time()
+            if not self.path:
+                return step(now)
+
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                self._tat = self._read_tat(conn)
+                result = step(now)
+                conn.execute(
+                    "INSERT INTO rate_limits (key, tat) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET tat = excluded.tat;",
+                    (self.key, self._tat)
+                )
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+            return result
+
+    def _defer(self, now, seconds):
+        self._tat = max(self._tat, now + seconds + self.tolerance)
+
+    def reserve(self) -> float:
+        """
+        Claim the next request slot.
+
+        Returns:
+            float: Seconds the caller must wait before sending the request
+        """
+        return self._update(self._reserve)
+
+    def defer(self, seconds):
+        """
+        Hold every caller back for `seconds`, e.g. when the server answered
+        with Retry-After. Slots already handed out are not revoked.
+
+        Args:
+            seconds (float): Time from now before the next slot is granted
+        """
+        self._update(lambda now: self._defer(now, seconds))
 
     def wait(self):
-        now = time.time()
-        while len(self.request_times) >= self.max_requests:
-            if now - self.request_times[0] > self.time_window:
-                self.request_times.popleft()
-            else:
-                time.sleep(1)
-                now = time.time()
-        self.request_times.append(now)
\ No newline at end of file
+        """Block until the next request may be sent"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def usage(self) -> dict:
+        """
+        Current budget usage, as a metric for health endpoints or logs.
+
+        Returns:
+            dict: {'max_requests', 'time_window', 'burst', 'in_use',
+                'utilization', 'next_slot_in', 'shared'}, where in_use counts
+                burst slots taken (including callers still waiting) and
+                next_slot_in is the wait a new request would get
+        """
+        with self._lock:
+            now = time.time()
+            tat = self._read_tat(self._connect()) if self.path else self._tat
+
+        backlog = max(0.0, tat - now)
+        in_use = min(self.burst, math.ceil(backlog / self.emission_interval)) if backlog else 0
+        return {
+            'max_requests': self.max_requests,
+            'time_window': self.time_window,
+            'burst': self.burst,
+            'in_use': in_use,
+            'utilization': round(backlog / (self.tolerance + self.emission_interval), 3),
+            'next_slot_in': round(max(0.0, backlog - self.tolerance), 3),
+            'shared': bool(self.path)
+        }
+
+
+# One budget for every SchwabClient; RATE_LIMIT_PATH shares it across processes
+schwab_rate_limiter = RateLimiter(path=RATE_LIMIT_PATH or None)
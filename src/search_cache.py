@@ -0,0 +1,178 @@
+# =============================================================================
+# PERSISTENT SEARCH RESULT CACHE
+# SQLite-backed cache for strategic_web_search, shared across workers
+# =============================================================================
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+SEARCH_CACHE_PATH = os.getenv(
+    "SEARCH_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_cache.db")
+)
+SEARCH_CACHE_TTL_HOURS = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "24"))
+SEARCH_CACHE_BUCKET_HOURS = float(os.getenv("SEARCH_CACHE_BUCKET_HOURS", "24"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+# The verification header's clock time, refreshed when a cached result is served
+_HEADER_TIME_RE = re.compile(r"(STRATEGIC WEB SEARCH RESULTS - )\d{2}:\d{2}:\d{2}")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a query: case, whitespace and word order are folded.
+
+    Every word is kept, including years, dates and comparison words, since
+    "AAPL revenue 2023" and "AAPL revenue 2025" want different results.
+    """
+    return " ".join(sorted(query.lower().split()))
+
+
+class SearchCache:
+    """On-disk cache of formatted search results keyed by normalized query"""
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl_hours=SEARCH_CACHE_TTL_HOURS,
+                 bucket_hours=SEARCH_CACHE_BUCKET_HOURS, max_entries=SEARCH_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.bucket_seconds = max(bucket_hours, 1 / 60) * 3600
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            self._local.conn = conn
+
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript("""
+                        CREATE TABLE IF NOT EXISTS search_results (
+                            cache_key TEXT PRIMARY KEY,
+                            namespace TEXT NOT NULL,
+                            normalized_query TEXT NOT NULL,
+                            result TEXT NOT NULL,
+                            created_at REAL NOT NULL,
+                            expires_at REAL NOT NULL,
+                            last_access REAL NOT NULL,
+                            hits INTEGER NOT NULL DEFAULT 0
+                        );
+                        CREATE INDEX IF NOT EXISTS idx_search_results_last_access
+                            ON search_results (last_access);
+                        CREATE INDEX IF NOT EXISTS idx_search_results_expires_at
+                            ON search_results (expires_at);
+                        CREATE TABLE IF NOT EXISTS search_cache_stats (
+                            namespace TEXT PRIMARY KEY,
+                            hits INTEGER NOT NULL DEFAULT 0,
+                            misses INTEGER NOT NULL DEFAULT 0
+                        );
+                    """)
+                    self._schema_ready = True
+        return conn
+
+    def _key(self, namespace, query, num_results):
+        bucket = int(time.time() // self.bucket_seconds)
+        raw = f"{namespace}|{num_results}|{normalize_query(query)}|{bucket}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _count(self, conn, namespace, column):
+        conn.execute(
+            f"INSERT INTO search_cache_stats (namespace, {column}) VALUES (?, 1) "
+            f"ON CONFLICT(namespace) DO UPDATE SET {column} = {column} + 1;",
+            (namespace,)
+        )
+
+    def get(self, namespace, query, num_results):
+        """Return the cached result text, or None on a miss or cache error"""
+        try:
+            conn = self._connect()
+            now = time.time()
+            key = self._key(namespace, query, num_results)
+            row = conn.execute(
+                "SELECT result FROM search_results WHERE cache_key = ? AND expires_at > ?;",
+                (key, now)
+            ).fetchone()
+
+            if row:
+                conn.execute(
+                    "UPDATE search_results SET last_access = ?, hits = hits + 1 WHERE cache_key = ?;",
+                    (now, key)
+                )
+                self._count(conn, namespace, 'hits')
+                return _HEADER_TIME_RE.sub(lambda m: m.group(1) + time.strftime('%H:%M:%S'), row[0], count=1)
+
+            self._count(conn, namespace, 'misses')
+        except sqlite3.Error as e:
+            print(f"   ⚠️  Search cache read failed: {e}")
+        return None
+
+    def put(self, namespace, query, num_results, result):
+        """Store a result and evict least-recently-used rows beyond max_entries"""
+        try:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO search_results (
+                    cache_key, namespace, normalized_query, result,
+                    created_at, expires_at, last_access, hits
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0);
+                """,
+                (
+                    self._key(namespace, query, num_results),
+                    namespace,
+                    normalize_query(query),
+                    result,
+                    now,
+                    now + self.ttl_seconds,
+                    now
+                )
+            )
+            self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"   ⚠️  Search cache write failed: {e}")
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM search_results WHERE expires_at <= ?;", (now,))
+        conn.execute(
+            """
+            DELETE FROM search_results WHERE cache_key IN (
+                SELECT cache_key FROM search_results
+                ORDER BY last_access DESC
+                LIMIT -1 OFFSET ?
+            );
+            """,
+            (self.max_entries,)
+        )
+
+    def stats(self) -> dict:
+        """Hit/miss counters and entry counts per namespace"""
+        conn = self._connect()
+        stats = {}
+        for namespace, hits, misses in conn.execute(
+                "SELECT namespace, hits, misses FROM search_cache_stats;"):
+            lookups = hits + misses
+            stats[namespace] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            }
+        for namespace, entries in conn.execute(
+                "SELECT namespace, COUNT(*) FROM search_results GROUP BY namespace;"):
+            stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'hit_rate': 0.0})['entries'] = entries
+        return stats
+
+
+# Process-wide cache used by strategic_web_search in both agents
+search_cache = SearchCache()
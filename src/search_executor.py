@@ -0,0 +1,68 @@
+# =============================================================================
+# CONCURRENT SEARCH EXECUTOR
+# Fans out batches of web searches over a bounded worker pool
+# =============================================================================
+
+import os
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "6"))
+SEARCH_HOST_MIN_INTERVAL = float(os.getenv("SEARCH_HOST_MIN_INTERVAL", "0.5"))
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host, shared by every search thread"""
+
+    def __init__(self, min_interval=SEARCH_HOST_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        """Block until the host behind `url` may be hit again"""
+        host = urllib.parse.urlsplit(url).netloc or url
+
+        # Reserve the next free slot under the lock, sleep outside of it
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Process-wide limiter used by strategic_web_search in both agents
+host_rate_limiter = HostRateLimiter()
+
+
+def run_parallel_searches(search_fn, queries, num_results=3, max_workers=SEARCH_MAX_WORKERS):
+    """
+    Run `search_fn(query, num_results)` for every query concurrently.
+
+    Args:
+        search_fn: Search callable, e.g. strategic_web_search
+        queries (list): Search queries to execute
+        num_results (int): Results requested per query
+        max_workers (int): Upper bound on concurrent searches
+
+    Returns:
+        list: (query, result, error) tuples in the same order as `queries`
+    """
+    if not queries:
+        return []
+
+    def run_one(query):
+        try:
+            return query, search_fn(query, num_results), None
+        except Exception as e:
+            return query, None, e
+
+    workers = max(1, min(max_workers, len(queries)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search") as pool:
+        # map() preserves input order regardless of completion order
+        return list(pool.map(run_one, queries))
@@ -0,0 +1,343 @@
+# =============================================================================
+# SEARCH STRATEGIES
+# DuckDuckGo Instant API and HTML search shared by the stock and moat agents
+# =============================================================================
+
+import os
+import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import http_transport
+from result_extractor import result_extractor
+from pacing import search_pacer
+from search_executor import host_rate_limiter, SEARCH_MAX_WORKERS
+
+SEARCH_HEDGED = os.getenv("SEARCH_HEDGED", "true").lower() == "true"
+SEARCH_HEDGE_DEADLINE = float(os.getenv("SEARCH_HEDGE_DEADLINE", "12"))
+# Analyses that may search at once in this process (the job queue's workers)
+SEARCH_CONCURRENT_ANALYSES = int(os.getenv("SEARCH_CONCURRENT_ANALYSES", os.getenv("ANALYSIS_MAX_WORKERS", "2")))
+
+# Stop waiting on slower strategies once this many results are in hand
+MIN_RESULTS = 2
+
+INSTANT_API_URL = 'https://api.duckduckgo.com/'
+HTML_SEARCH_URL = 'https://html.duckduckgo.com/html/'
+
+# 202/429 go to search_pacer, which backs off for every search thread at once
+http_transport.disable_status_retries(INSTANT_API_URL)
+http_transport.disable_status_retries(HTML_SEARCH_URL)
+
+# Rotate user agents to appear more natural
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0'
+]
+
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16)
+
+# Seconds to wait for a strategy's connection
+CONNECT_TIMEOUT = 5
+# Bytes read per step of a response body, between checks for cancellation
+READ_CHUNK_SIZE = 16384
+
+
+def _log(verbose, message):
+    if verbose:
+        print(message)
+
+
+def _pace_from_response(response):
+    """Feed DuckDuckGo's rate-limit responses back into search pacing"""
+    if response.status_code in (202, 429):
+        search_pacer.on_throttle(response.headers.get('Retry-After'))
+    elif response.status_code == 200:
+        search_pacer.on_success()
+
+
+def _fetch(url, cancel_event, read_timeout, **kwargs):
+    """
+    GET `url` for a strategy, abandoning it as soon as the search is settled.
+
+    `read_timeout` bounds the wait for the response and for every read of
+    it. The body is streamed and the connection dropped once cancel_event
+    is set, so a hedged loser gives its thread back instead of finishing.
+
+    Returns:
+        requests.Response: The response with its content read, or None if
+            the search was settled first
+    """
+    with search_pacer.slot():
+        host_rate_limiter.wait(url)
+        if cancel_event.is_set():
+            return None
+        response = http_transport.get(url, stream=True, timeout=(CONNECT_TIMEOUT, read_timeout), **kwargs)
+    _pace_from_response(response)
+
+    try:
+        chunks = []
+        for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+            if cancel_event.is_set():
+                return None
+            chunks.append(chunk)
+        response._content = b''.join(chunks)
+    finally:
+        # Returns a fully read connection to the pool, drops an abandoned one
+        response.close()
+    return response
+
+
+# =============================================================================
+# STRATEGY STATISTICS
+# =============================================================================
+
+class StrategyStats:
+    """Per-strategy success counts and latency histograms used to order strategies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _entry(self, name):
+        return self._stats.setdefault(name, {
+            'attempts': 0,
+            'successes': 0,
+            'cancelled': 0,
+            'latency_histogram': [0] * (len(LATENCY_BUCKETS) + 1)
+        })
+
+    def record(self, name, latency, success, cancelled=False):
+        """
+        Record one run. A cancelled run (a hedged loser) adds its elapsed time,
+        a lower bound on its latency, but does not count toward success rate.
+        """
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            entry = self._entry(name)
+            entry['attempts'] += 1
+            entry['successes'] += 1 if success and not cancelled else 0
+            entry['cancelled'] += 1 if cancelled else 0
+            entry['latency_histogram'][bucket] += 1
+
+    def _score(self, name):
+        entry = self._stats.get(name)
+        if not entry:
+            return 0.5, LATENCY_BUCKETS[-1]
+
+        # Smooth with one success in two attempts so a new strategy is not starved
+        completed = entry['attempts'] - entry['cancelled']
+        success_rate = (entry['successes'] + 1) / (completed + 2)
+
+        histogram = entry['latency_histogram']
+        half = sum(histogram) / 2
+        seen = 0
+        median_latency = LATENCY_BUCKETS[-1]
+        for bound, count in zip(LATENCY_BUCKETS + (LATENCY_BUCKETS[-1] * 2,), histogram):
+            seen += count
+            if seen >= half:
+                median_latency = bound
+                break
+        return success_rate, median_latency
+
+    def ordered(self, names):
+        """Most reliable strategies first, faster ones breaking ties"""
+        with self._lock:
+            scores = {name: self._score(name) for name in names}
+        return sorted(names, key=lambda name: (-round(scores[name][0], 1), scores[name][1]))
+
+    def snapshot(self) -> dict:
+        labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        snapshot = {}
+        with self._lock:
+            for name, entry in self._stats.items():
+                completed = entry['attempts'] - entry['cancelled']
+                snapshot[name] = {
+                    'attempts': entry['attempts'],
+                    'successes': entry['successes'],
+                    'cancelled': entry['cancelled'],
+                    'success_rate': round(entry['successes'] / completed, 3) if completed else 0.0,
+                    'latency_histogram': dict(zip(labels, entry['latency_histogram']))
+                }
+        return snapshot
+
+
+strategy_stats = StrategyStats()
+
+
+# =============================================================================
+# STRATEGIES
+# Each returns a list of (title, text, trailer) entries, or None if cancelled
+# =============================================================================
+
+def instant_api_strategy(query, num_results, cancel_event, verbose=False, read_timeout=10):
+    """DuckDuckGo Instant API: abstract plus related topics"""
+    _log(verbose, "   🎯 Strategy 1: DuckDuckGo Instant API...")
+
+    params = {
+        'q': query,
+        'format': 'json',
+        'no_html': '1',
+        'skip_disambig': '1'
+    }
+
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (compatible; research/1.0)',
+        'Accept': 'application/json'
+    }
+
+    response = _fetch(INSTANT_API_URL, cancel_event, read_timeout, params=params, headers=headers)
+    if response is None or cancel_event.is_set():
+        return None
+
+    entries = []
+    if response.status_code == 200:
+        data = response.json()
+
+        # Extract abstract information
+        abstract = data.get('Abstract', '')
+        abstract_source = data.get('AbstractSource', '')
+
+        if abstract and len(abstract) > 50:
+            _log(verbose, f"   ✅ Found abstract from {abstract_source}")
+            entries.append((f"{abstract_source} - Key Information", abstract, "Source: DuckDuckGo Instant API"))
+
+        # Extract related topics
+        for topic in data.get('RelatedTopics', [])[:3]:
+            if isinstance(topic, dict) and 'Text' in topic:
+                text = topic['Text']
+                if len(text) > 30:
+                    _log(verbose, "   ✅ Found related topic")
+                    entries.append(("Related Information", text, "Source: DuckDuckGo Related Topics"))
+    else:
+        _log(verbose, f"   ⚠️  Instant API returned: {response.status_code}")
+
+    return entries
+
+
+def html_strategy(query, num_results, cancel_event, verbose=False, read_timeout=12):
+    """DuckDuckGo HTML endpoint scraped with browser-like headers"""
+    _log(verbose, "   🎯 Strategy 2: DuckDuckGo HTML Search...")
+
+    search_url = f"{HTML_SEARCH_URL}?q={urllib.parse.quote(query)}"
+
+    headers = {
+        'User-Agent': random.choice(USER_AGENTS),
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    }
+
+    response = _fetch(search_url, cancel_event, read_timeout, headers=headers)
+    if response is None or cancel_event.is_set():
+        return None
+    _log(verbose, f"   📡 HTML Search status: {response.status_code}, Length: {len(response.content)} bytes")
+
+    entries = []
+    if response.status_code == 200:
+        results, selector = result_extractor.extract(response.content, num_results)
+        if selector:
+            _log(verbose, f"   ✅ Found {len(results)} results with selector: {selector}")
+
+        for title, snippet, url in results:
+            _log(verbose, f"   ✅ Result: {title[:50]}...")
+            entries.append((title, snippet, f"URL: {url}"))
+
+    elif response.status_code == 202:
+        _log(verbose, "   ⚠️  Got 202 - DuckDuckGo is rate limiting")
+    else:
+        _log(verbose, f"   ⚠️  HTML Search returned: {response.status_code}")
+
+    return entries
+
+
+STRATEGIES = {
+    'instant_api': instant_api_strategy,
+    'html': html_strategy,
+}
+
+# Shared pool for hedged requests: every strategy of every parallel search of
+# every concurrent analysis gets a thread, so no search queues behind another
+_hedge_pool = ThreadPoolExecutor(
+    max_workers=SEARCH_MAX_WORKERS * SEARCH_CONCURRENT_ANALYSES * len(STRATEGIES),
+    thread_name_prefix="search-hedge"
+)
+
+
+def _run_strategy(name, query, num_results, cancel_event, verbose, started=None, read_timeout=None):
+    """Run one strategy, recording its latency and outcome"""
+    if started is not None:
+        started.set()
+    start = time.monotonic()
+    kwargs = {'read_timeout': read_timeout} if read_timeout else {}
+    try:
+        entries = STRATEGIES[name](query, num_results, cancel_event, verbose, **kwargs)
+    except Exception as e:
+        _log(verbose, f"   ⚠️  {name} strategy failed: {str(e)}")
+        entries = []
+
+    cancelled = entries is None or cancel_event.is_set()
+    strategy_stats.record(name, time.monotonic() - start, bool(entries), cancelled=cancelled)
+    return entries or []
+
+
+def run_search_strategies(query, num_results, verbose=False, hedged=None, deadline=SEARCH_HEDGE_DEADLINE):
+    """
+    Run the DuckDuckGo strategies for a query and merge their results.
+
+    Args:
+        query (str): Search query
+        num_results (int): Results requested from the HTML strategy
+        verbose (bool): Whether to print progress messages
+        hedged (bool): Race the strategies instead of trying them in turn
+            (default: SEARCH_HEDGED)
+        deadline (float): Seconds to wait for hedged strategies, counted from
+            when the first of them starts running rather than from submission
+
+    Returns:
+        list: (title, text, trailer) entries, best-performing strategy first
+    """
+    hedged = SEARCH_HEDGED if hedged is None else hedged
+    order = strategy_stats.ordered(list(STRATEGIES))
+    cancel_event = threading.Event()
+
+    if not hedged:
+        entries = []
+        for name in order:
+            entries.extend(_run_strategy(name, query, num_results, cancel_event, verbose))
+            if len(entries) >= MIN_RESULTS:
+                break
+        return entries
+
+    # No strategy waits on a response longer than the deadline
+    started = threading.Event()
+    futures = {
+        _hedge_pool.submit(_run_strategy, name, query, num_results, cancel_event, verbose, started, deadline): name
+        for name in order
+    }
+    collected = {}
+    pending = set(futures)
+    started.wait()
+    end_time = time.monotonic() + deadline
+
+    while pending:
+        remaining = end_time - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            collected[futures[future]] = future.result()
+        if sum(len(entries) for entries in collected.values()) >= MIN_RESULTS:
+            break
+
+    # Losers still in flight drop their connection at their next read
+    cancel_event.set()
+    for future in pending:
+        future.cancel()
+        _log(verbose, f"   ⏹️  Cancelled slower strategy: {futures[future]}")
+
+    return [entry for name in order for entry in collected.get(name, [])]
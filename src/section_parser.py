@@ -0,0 +1,298 @@
+# =============================================================================
+# AGENT OUTPUT SECTION PARSING
+# Maps "## " headers in agent output to section keys, and splits finished
+# stock and MOAT analyses into UI sections in a single scan
+# =============================================================================
+
+import bisect
+import re
+
+# (keyword found in the header, section key), checked in order
+STOCK_SECTION_KEYWORDS = [
+    ('executive summary', 'executive_summary'),
+    ('key metrics', 'key_metrics'),
+    ('bull case', 'bull_case'),
+    ('bear case', 'bear_case'),
+    ('investment takeaway', 'investment_takeaway'),
+    ('search integration', 'search_summary'),
+    ('analytical reasoning', 'analytical_reasoning'),
+]
+
+MOAT_SECTION_KEYWORDS = [
+    ('executive summary', 'executive_summary'),
+    ('moat analysis', 'moat_analysis'),
+    ('market positioning', 'market_positioning'),
+    ('competitive advantages', 'competitive_landscape'),
+]
+
+# Exact headers the agent prompts ask for, in document order
+STOCK_SECTION_MARKERS = (
+    '## Executive Summary',
+    '## 🐂 BULL CASE',
+    '## 🐻 BEAR CASE',
+    '## 📊 INVESTMENT TAKEAWAY',
+    '## 🔍 SEARCH INTEGRATION SUMMARY',
+    '## 🤔 ANALYTICAL REASONING',
+)
+
+MOAT_SECTION_MARKERS = (
+    '## EXECUTIVE SUMMARY',
+    '## MOAT ANALYSIS',
+    '## MARKET POSITIONING',
+    '## COMPETITIVE ADVANTAGES & LANDSCAPE',
+)
+
+# Metric label (lowercase) -> (metric name, pattern anchored at the label)
+METRIC_PATTERNS = {
+    'current price': ('current_price', r'Current Price[:\s]*\$?([\d,]+\.?\d*)'),
+    'market cap': ('market_cap', r'Market Cap[:\s]*\$?([\d,]+\.?\d*)\s*(trillion|billion|million)?'),
+    'p/e ratio': ('pe_ratio', r'P/E Ratio[:\s]*([\d,]+\.?\d*)'),
+    'revenue growth': ('revenue_growth', r'Revenue Growth[:\s]*([\d,]+\.?\d*)%?'),
+    'profit margin': ('profit_margin', r'Profit Margin[:\s]*([\d,]+\.?\d*)%?'),
+    'dividend yield': ('dividend_yield', r'Dividend Yield[:\s]*([\d,]+\.?\d*)%?'),
+    'analyst rating': ('analyst_rating', r'Analyst Rating[:\s]*([A-Za-z\s]+)'),
+    '52-week': ('year_high', r'52-Week.*?[\$\s]*([\d,]+\.?\d*).*?-.*?\$?([\d,]+\.?\d*)'),
+    '1-year price change': ('price_change_1y', r'1-Year Price Change[:\s]*[+\-]?([\d,]+\.?\d*)%?'),
+}
+
+_EXCESS_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n')
+# "1. **Headline**: detail" points in the bull and bear cases
+_THESIS_POINT_RE = re.compile(r'^\s*\d+\.\s+\*\*(.+?)\*\*', re.M)
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+
+def _alternation(literals, flags=0):
+    return re.compile('|'.join(re.escape(literal) for literal in literals), flags)
+
+
+_STOCK_MARKER_RE = _alternation(STOCK_SECTION_MARKERS)
+_MOAT_MARKER_RE = _alternation(MOAT_SECTION_MARKERS)
+# Labels are located case-sensitively in lowercased text, which is several
+# times faster than an IGNORECASE alternation
+_METRIC_LABEL_RE = _alternation(METRIC_PATTERNS)
+_METRIC_LABEL_IGNORECASE_RE = _alternation(METRIC_PATTERNS, re.IGNORECASE)
+_METRIC_RES = {
+    label: (name, re.compile(pattern, re.IGNORECASE))
+    for label, (name, pattern) in METRIC_PATTERNS.items()
+}
+
+
+def section_key(header: str, keywords=STOCK_SECTION_KEYWORDS) -> str:
+    """Map a header line (without the leading ##) to its section key"""
+    normalized = header.lower()
+    for keyword, key in keywords:
+        if keyword in normalized:
+            return key
+    return _NON_WORD_RE.sub('_', normalized).strip('_') or 'untitled'
+
+
+def clean_section(text: str) -> str:
+    """Collapse runs of blank lines and trim whitespace"""
+    return _EXCESS_BLANK_LINES_RE.sub('\n\n', text).strip()
+
+
+class IncrementalSectionParser:
+    """
+    Splits streamed agent text into sections as soon as each one closes.
+
+    Text is fed in arbitrary chunks. A section is complete when the next
+    "## " header line arrives, or when close() is called at the end of the
+    stream. Text before the first "## " header is ignored.
+    """
+
+    def __init__(self, keywords=STOCK_SECTION_KEYWORDS):
+        self.keywords = keywords
+        self._pending = ''
+        self._key = None
+        self._lines = []
+
+    def feed(self, text: str) -> list:
+        """
+        Add streamed text.
+
+        Returns:
+            list: (section_key, section_text) tuples for sections closed by this chunk
+        """
+        self._pending += text
+        *complete, self._pending = self._pending.split('\n')
+        closed = []
+        for line in complete:
+            section = self._consume(line)
+            if section:
+                closed.append(section)
+        return closed
+
+    def close(self) -> list:
+        """Flush the final section at the end of the stream"""
+        closed = []
+        if self._pending:
+            section = self._consume(self._pending)
+            self._pending = ''
+            if section:
+                closed.append(section)
+        if self._key is not None:
+            closed.append((self._key, clean_section('\n'.join(self._lines))))
+            self._key = None
+            self._lines = []
+        return closed
+
+    def _consume(self, line):
+        if line.startswith('## '):
+            finished = None
+            if self._key is not None:
+                finished = (self._key, clean_section('\n'.join(self._lines)))
+            self._key = section_key(line[3:], self.keywords)
+            self._lines = []
+            return finished
+
+        if self._key is not None:
+            self._lines.append(line)
+        return None
+
+
+def find_markers(text: str, marker_re) -> dict:
+    """
+    Position of the first occurrence of each section marker, in one scan.
+
+    Returns:
+        dict: marker -> offset into text, for markers that appear
+    """
+    positions = {}
+    for match in marker_re.finditer(text):
+        positions.setdefault(match.group(), match.start())
+    return positions
+
+
+def extract_metrics(text: str) -> dict:
+    """
+    Pull key financial metrics out of company info text.
+
+    One scan locates every metric label; each label's anchored pattern is
+    only tried where that label occurs, keeping the first match per metric.
+
+    Returns:
+        dict: e.g. {'current_price': '203.27', 'year_low': '168.99', 'year_high': '259.47'}
+    """
+    metrics = {}
+    found = set()
+    lowered = text.lower()
+    # Lowercasing a few non-ASCII characters changes the length, which would
+    # shift label offsets, so such text is scanned case-insensitively instead
+    if len(lowered) == len(text):
+        label_matches = _METRIC_LABEL_RE.finditer(lowered)
+    else:
+        label_matches = _METRIC_LABEL_IGNORECASE_RE.finditer(text)
+
+    for label_match in label_matches:
+        label = label_match.group().lower()
+        if label in found:
+            continue
+        name, pattern = _METRIC_RES[label]
+        match = pattern.match(text, label_match.start())
+        if not match:
+            continue
+        found.add(label)
+        if name == 'year_high':
+            metrics['year_low'] = match.group(1)
+            metrics['year_high'] = match.group(2)
+        else:
+            metrics[name] = match.group(1).strip()
+        if len(found) == len(_METRIC_RES):
+            break
+    return metrics
+
+
+def split_stock_sections(analysis_text: str) -> dict:
+    """
+    Split a stock analysis into the four UI sections plus the raw text.
+
+    company_info is Executive Summary through Key Metrics plus the Search
+    Integration Summary; analytical_reasoning is the Investment Takeaway plus
+    Analytical Reasoning. A missing header leaves its slice running to the end.
+    """
+    if not analysis_text or not isinstance(analysis_text, str):
+        return {
+            'company_info': 'Analysis text not available',
+            'bull_case': 'Bull case not available',
+            'bear_case': 'Bear case not available',
+            'analytical_reasoning': 'Analytical reasoning not available',
+            'raw_text': analysis_text or ''
+        }
+
+    positions = find_markers(analysis_text, _STOCK_MARKER_RE)
+    end = len(analysis_text)
+    _, bull, bear, takeaway, search, reasoning = (
+        positions.get(marker, end) for marker in STOCK_SECTION_MARKERS
+    )
+    # Text before a missing Executive Summary header still counts as company info
+    summary = positions.get(STOCK_SECTION_MARKERS[0], 0)
+
+    def span(start, stop=end):
+        return analysis_text[start:stop].strip()
+
+    company_info = f"{span(summary, bull)}\n\n{span(search, reasoning)}".strip()
+    analytical_reasoning = f"{span(takeaway, search)}\n\n{span(reasoning)}".strip()
+
+    return {
+        'company_info': clean_section(company_info),
+        'bull_case': clean_section(span(bull, bear)),
+        'bear_case': clean_section(span(bear, takeaway)),
+        'analytical_reasoning': clean_section(analytical_reasoning),
+        'raw_text': analysis_text
+    }
+
+
+def split_moat_sections(analysis_text: str) -> dict:
+    """
+    Split a MOAT analysis into its four UI sections, without their headers.
+
+    Each section runs to the next header in the prompt's order, or to the
+    next header found in the text when that one is missing.
+    """
+    if not analysis_text or not isinstance(analysis_text, str):
+        return {
+            'executive_summary': 'Analysis text not available',
+            'moat_analysis': 'MOAT analysis not available',
+            'market_positioning': 'Market positioning not available',
+            'competitive_landscape': 'Competitive landscape not available'
+        }
+
+    positions = find_markers(analysis_text, _MOAT_MARKER_RE)
+    ordered = sorted(positions.values())
+    titles = [marker[3:] for marker in MOAT_SECTION_MARKERS]
+
+    def extract(index):
+        start = positions.get(MOAT_SECTION_MARKERS[index], 0)
+        following = MOAT_SECTION_MARKERS[index + 1] if index + 1 < len(MOAT_SECTION_MARKERS) else None
+        if following in positions:
+            stop = positions[following]
+        else:
+            next_index = bisect.bisect_right(ordered, start)
+            stop = ordered[next_index] if next_index < len(ordered) else len(analysis_text)
+
+        text = analysis_text[start:stop].strip()
+        first_line, _, rest = text.partition('\n')
+        if any(title in first_line for title in titles):
+            text = rest.strip()
+        return clean_section(text)
+
+    return {
+        key: extract(index)
+        for index, key in enumerate(('executive_summary', 'moat_analysis', 'market_positioning', 'competitive_landscape'))
+    }
+
+
+def parse_stock_output(analysis_text: str):
+    """
+    Sections and key metrics for a finished stock analysis.
+
+    Returns:
+        tuple: (split_stock_sections() dict, extract_metrics() dict of company_info)
+    """
+    sections = split_stock_sections(analysis_text)
+    return sections, extract_metrics(sections['company_info'])
+
+
+def thesis_points(section_text: str) -> list:
+    """Bold headlines of a bull or bear case's numbered points, in order"""
+    return [point.strip().rstrip(':') for point in _THESIS_POINT_RE.findall(section_text or '')]
@@ -147,7 +147,12 @@ function fetchAnalysis(forceRefresh = false) {
     $('#analysis-container').hide();
     $('#analysis-container .card-panel').removeClass('analysis-success');
 
-    const data = { ticker };
+    // Stream sections as they are written when the browser supports SSE
+    if (window.EventSource) {
+        return streamAnalysis(ticker, forceRefresh).then(handleAnalysisResponse);
+    }
+
+    const data = { ticker, async: true };
     if (forceRefresh) {
         data.force_refresh = true;
     }
@@ -156,21 +161,76 @@ function fetchAnalysis(forceRefresh = false) {
         url: '/analyze_stock',
         type: 'POST',
         data: data
-    }).done(function(response) {
+    }).then(function(response) {
+        // Cache misses come back as a background job to poll
+        return response.job_id ? pollAnalysisJob(response.job_id) : response;
+    }).done(handleAnalysisResponse).fail(function(error) {
         $('#analysis-loading').hide();
+        displayAnalysisError('Analysis request failed. Please check your connection and try again.');
+    });
+}
+
+function handleAnalysisResponse(response) {
+    $('#analysis-loading').hide();
 
-        if (response.success) {
-            displayAnalysisResults(response);
-            updateAnalysisTimestamp(response);
-            setupAnalysisRefreshButton();
+    if (response.success) {
+        displayAnalysisResults(response);
+        updateAnalysisTimestamp(response);
+        setupAnalysisRefreshButton();
+        $('#analysis-container').show();
+        console.log(`✅ Analysis completed in ${response.duration}s with ${response.search_calls} searches`);
+    } else {
+        displayAnalysisError(response.error);
+    }
+}
+
+// Stream a stock analysis over server-sent events, filling each panel as
+// soon as its section closes; resolves to the {success, data, error} shape.
+function streamAnalysis(ticker, forceRefresh = false) {
+    return new Promise((resolve) => {
+        const url = `/api/analyze-stock/stream?ticker=${encodeURIComponent(ticker)}&force_refresh=${forceRefresh}`;
+        const source = new EventSource(url);
+        const sectionTargets = {
+            executive_summary: '#executive-summary',
+            bull_case: '#bull-case',
+            bear_case: '#bear-case',
+            investment_takeaway: '#analytical-reasoning',
+            analytical_reasoning: '#analytical-reasoning'
+        };
+        const reasoningParts = [];
+
+        source.addEventListener('section', function(event) {
+            const section = JSON.parse(event.data);
+            const target = sectionTargets[section.key];
+            if (!target) return;
+
+            let text = section.text;
+            if (target === '#analytical-reasoning') {
+                reasoningParts.push(section.text);
+                text = reasoningParts.join('\n\n');
+            }
+
+            $('#analysis-loading').hide();
             $('#analysis-container').show();
-            console.log(`✅ Analysis completed in ${response.duration}s with ${response.search_calls} searches`);
-        } else {
-            displayAnalysisError(response.error);
-        }
-    }).fail(function(error) {
-        $('#analysis-loading').hide();
-        displayAnalysisError('Analysis request failed. Please check your connection and try again.');
+            $(target).html(formatAnalysisText(text));
+        });
+
+        // A new model turn began; sections from the tool-calling turn are withdrawn
+        source.addEventListener('reset', function() {
+            reasoningParts.length = 0;
+            Object.values(sectionTargets).forEach(target => $(target).empty());
+        });
+
+        source.addEventListener('done', function(event) {
+            source.close();
+            resolve(JSON.parse(event.data));
+        });
+
+        source.addEventListener('error', function(event) {
+            source.close();
+            // Server-sent error events carry a payload; dropped connections do not
+            resolve(event.data ? JSON.parse(event.data) : { success: false, error: 'Analysis stream was interrupted' });
+        });
     });
 }
 
@@ -184,7 +244,7 @@ function fetchMOATAnalysis(forceRefresh = false) {
     // Show MOAT loading
     showMOATLoading();
 
-    const body = { ticker };
+    const body = { ticker, async: true };
     if (forceRefresh) {
         body.force_refresh = true;
     }
@@ -197,6 +257,7 @@ function fetchMOATAnalysis(forceRefresh = false) {
         body: JSON.stringify(body)
     })
     .then(response => response.json())
+    .then(data => data.job_id ? pollAnalysisJob(data.job_id) : data)
     .then(data => {
         if (data.success) {
             displayMOATAnalysis(data.data);
@@ -210,6 +271,30 @@ function fetchMOATAnalysis(forceRefresh = false) {
     });
 }
 
+// Poll a background analysis job until it finishes; resolves to the
+// same {success, data, error} shape the synchronous endpoints return.
+function pollAnalysisJob(jobId, intervalMs = 3000) {
+    return new Promise((resolve) => {
+        const poll = () => {
+            $.getJSON(`/api/jobs/${jobId}`).done(function(response) {
+                const job = response.job;
+                if (!response.success || !job) {
+                    resolve({ success: false, error: response.error || 'Analysis job not found' });
+                } else if (job.status === 'succeeded') {
+                    resolve({ success: true, data: job.data, error: null });
+                } else if (job.status === 'failed') {
+                    resolve({ success: false, error: job.error || 'Analysis failed' });
+                } else {
+                    setTimeout(poll, intervalMs);
+                }
+            }).fail(function() {
+                resolve({ success: false, error: 'Lost connection while waiting for analysis' });
+            });
+        };
+        poll();
+    });
+}
+
 function loadAllData() {
     const params = getCommonFetchParams();
 
@@ -266,6 +351,18 @@ function updateFinancialMetrics(response) {
     }
 }
 
+function formatAnalysisText(text) {
+    if (!text) return '<p class="text-muted">No data available</p>';
+    return text
+        .replace(/## (.*?)$/gm, '<h3>$1</h3>')
+        .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')
+        .replace(/\*(.*?)\*/g, '<em>$1</em>')
+        .replace(/\n\n/g, '</p><p>')
+        .replace(/\n/g, '<br>')
+        .replace(/^/, '<p>')
+        .replace(/$/, '</p>');
+}
+
 function displayAnalysisResults(response) {
     try {
         if (!response || !response.success || !response.data || !response.data.sections) {
@@ -274,18 +371,6 @@ function displayAnalysisResults(response) {
 
         const sections = response.data.sections;
 
-        const formatAnalysisText = (text) => {
-            if (!text) return '<p class="text-muted">No data available</p>';
-            return text
-                .replace(/## (.*?)$/gm, '<h3>$1</h3>')
-                .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')
-                .replace(/\*(.*?)\*/g, '<em>$1</em>')
-                .replace(/\n\n/g, '</p><p>')
-                .replace(/\n/g, '<br>')
-                .replace(/^/, '<p>')
-                .replace(/$/, '</p>');
-        };
-
         $('#executive-summary').html(formatAnalysisText(response.data.executive_summary));
         $('#bull-case').html(formatAnalysisText(sections.bull_case));
         $('#bear-case').html(formatAnalysisText(sections.bear_case));
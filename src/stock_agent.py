@@ -2,26 +2,29 @@
 # COMPLETE FUNCTION-BASED STOCK ANALYZER
 # =============================================================================
 
-import requests
 import json
 import yfinance as yf
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 import pandas as pd
 import time
 import re
-import urllib.parse
-import random
 import os
-import boto3
 
 #import strands
 
-from strands import Agent, tool
-from strands.models import BedrockModel
+from strands import tool
 #from strands_tools import http_request
 
 from dotenv import load_dotenv
+from search_strategies import run_search_strategies
+from search_cache import search_cache
+from research_context import research_contexts, format_context, MARKET_QUERIES
+from model_pool import AgentFactory, model_pool
+from pacing import bedrock_pacer
+from telemetry import RunTelemetry
+from section_parser import (
+    IncrementalSectionParser, split_stock_sections, extract_metrics, parse_stock_output
+)
 
 load_dotenv()
 
@@ -36,16 +39,6 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_DEFAULT_REGION = 'us-east-1'
 
-# Silent AWS setup - no print statements
-try:
-    client = boto3.client("bedrock-runtime", region_name="us-east-1")
-    bedrock = boto3.client('bedrock', region_name='us-east-1')
-    # Test credentials silently
-    models = bedrock.list_foundation_models()
-except Exception as e:
-    # Silent fail - credentials will be tested when function is called
-    pass
-
 # =============================================================================
 # STRATEGIC WEB SEARCH TOOLS
 # =============================================================================
@@ -75,145 +68,22 @@ def strategic_web_search(query: str, num_results: int = 5) -> str:
     print(f"🔍 STRATEGIC WEB SEARCH: '{query}' at {datetime.now().strftime('%H:%M:%S')}")
     print(f"📅 Context: Searching with {current_year} awareness")
 
+    cached_result = search_cache.get('stock', query, num_results)
+    if cached_result is not None:
+        print("   📦 Returning cached search results")
+        return cached_result
+
     try:
         results = []
         search_successful = False
 
-        # STRATEGY 1: DuckDuckGo Instant API (most reliable)
-        try:
-            print("   🎯 Strategy 1: DuckDuckGo Instant API...")
-
-            ddg_instant_url = 'https://api.duckduckgo.com/'
-            params = {
-                'q': query,
-                'format': 'json',
-                'no_html': '1',
-                'skip_disambig': '1'
-            }
-
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (compatible; research/1.0)',
-                'Accept': 'application/json'
-            }
-
-            response = requests.get(ddg_instant_url, params=params, headers=headers, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-
-                # Extract abstract information
-                abstract = data.get('Abstract', '')
-                abstract_source = data.get('AbstractSource', '')
-
-                if abstract and len(abstract) > 50:
-                    print(f"   ✅ Found abstract from {abstract_source}")
-                    results.append(f"1. {abstract_source} - Key Information\n   {abstract}\n   Source: DuckDuckGo Instant API\n")
-                    search_successful = True
-
-                # Extract related topics
-                related_topics = data.get('RelatedTopics', [])
-                for i, topic in enumerate(related_topics[:3], len(results) + 1):
-                    if isinstance(topic, dict) and 'Text' in topic:
-                        text = topic['Text']
-                        if len(text) > 30:
-                            print(f"   ✅ Found related topic {i}")
-                            results.append(f"{i}. Related Information\n   {text}\n   Source: DuckDuckGo Related Topics\n")
-                            search_successful = True
-
-            else:
-                print(f"   ⚠️  Instant API returned: {response.status_code}")
-
-        except Exception as e:
-            print(f"   ⚠️  Instant API failed: {str(e)}")
-
-        # Add small delay to be respectful
-        time.sleep(1)
+        # STRATEGIES 1 & 2: DuckDuckGo Instant API and HTML search (raced when hedged)
+        for title, text, trailer in run_search_strategies(query, num_results, verbose=True):
+            results.append(f"{len(results) + 1}. {title}\n   {text}\n   {trailer}\n")
+            search_successful = True
 
-        # STRATEGY 2: DuckDuckGo HTML Search (if Instant API didn't get enough)
-        if len(results) < 2:
-            try:
-                print("   🎯 Strategy 2: DuckDuckGo HTML Search...")
-
-                # Use the HTML endpoint with strategic headers
-                search_url = f"https://html.duckduckgo.com/html/?q={urllib.parse.quote(query)}"
-
-                # Rotate user agents to appear more natural
-                user_agents = [
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0'
-                ]
-
-                headers = {
-                    'User-Agent': random.choice(user_agents),
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                }
-
-                response = requests.get(search_url, headers=headers, timeout=12)
-                print(f"   📡 HTML Search status: {response.status_code}, Length: {len(response.content)} bytes")
-
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-
-                    # Try multiple selectors for results
-                    search_results = []
-                    selectors = ['.result', '.links_main', '.result__body', 'div[class*="result"]']
-
-                    for selector in selectors:
-                        found_results = soup.select(selector)
-                        if found_results:
-                            search_results = found_results
-                            print(f"   ✅ Found {len(found_results)} results with selector: {selector}")
-                            break
-
-                    # Extract results
-                    for i, result in enumerate(search_results[:num_results], len(results) + 1):
-                        try:
-                            # Try multiple ways to get title
-                            title = None
-                            title_selectors = ['.result__title a', '.result__a', 'h2 a', 'h3 a', 'a']
-
-                            for title_sel in title_selectors:
-                                title_elem = result.select_one(title_sel)
-                                if title_elem:
-                                    title = title_elem.get_text().strip()
-                                    if len(title) > 10:  # Quality filter
-                                        break
-
-                            # Try multiple ways to get snippet
-                            snippet = None
-                            snippet_selectors = ['.result__snippet', '.result__body', '.snippet', 'p']
-
-                            for snippet_sel in snippet_selectors:
-                                snippet_elem = result.select_one(snippet_sel)
-                                if snippet_elem:
-                                    snippet = snippet_elem.get_text().strip()
-                                    if len(snippet) > 30:  # Quality filter
-                                        break
-
-                            # Get URL
-                            url_elem = result.select_one('a[href]')
-                            url = url_elem.get('href', '') if url_elem else ''
-
-                            if title and snippet and len(snippet) > 30:
-                                print(f"   ✅ Result {i}: {title[:50]}...")
-                                results.append(f"{i}. {title}\n   {snippet}\n   URL: {url}\n")
-                                search_successful = True
-
-                        except Exception as e:
-                            continue
-
-                elif response.status_code == 202:
-                    print("   ⚠️  Got 202 - DuckDuckGo is rate limiting")
-                else:
-                    print(f"   ⚠️  HTML Search returned: {response.status_code}")
-
-            except Exception as e:
-                print(f"   ⚠️  HTML Search failed: {str(e)}")
+        # Only live search results are worth caching, not the knowledge fallback
+        from_network = search_successful
 
         # STRATEGY 3: Financial News fallback (if others fail)
         if not search_successful and any(term in query.lower() for term in ['stock', 'earnings', 'financial', 'nasdaq', 'nyse']):
@@ -266,6 +136,8 @@ Year Context: {current_year} awareness applied
 {'='*60}
 
 """
+            if from_network:
+                search_cache.put('stock', query, num_results, verification_header + final_results)
             return verification_header + final_results
         else:
             print("   ❌ No results found with any strategy")
@@ -281,6 +153,11 @@ def get_stock_data(ticker: str) -> dict:
     """Get comprehensive stock data including price, metrics, and company info"""
     print(f"📊 FETCHING STOCK DATA for {ticker.upper()}")
 
+    context = research_contexts.fresh(ticker)
+    if context and 'error' not in context['stock_data']:
+        print("   ✅ Using the shared research context")
+        return context['stock_data']
+
     try:
         stock = yf.Ticker(ticker.upper())
         info = stock.info
@@ -325,6 +202,11 @@ def enhanced_get_recent_news(ticker: str) -> str:
     """Enhanced news retrieval with strategic fallbacks"""
     print(f"📰 ENHANCED NEWS FETCH for {ticker.upper()}")
 
+    context = research_contexts.fresh(ticker)
+    if context and context['news']:
+        print("   ✅ Using the shared research context")
+        return context['news']
+
     try:
         # Try yfinance first
         stock = yf.Ticker(ticker.upper())
@@ -362,16 +244,8 @@ def enhanced_get_recent_news(ticker: str) -> str:
 # =============================================================================
 
 def setup_claude_model():
-    """Setup Claude model configuration"""
-    return BedrockModel(
-        model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-        region_name="us-east-1",
-        additional_request_fields={
-            "thinking": {"type": "disabled"},
-            "max_tokens": 4000,
-            "temperature": 0.1
-        }
-    )
+    """Shared Claude model configuration (created once per process)"""
+    return model_pool.model()
 
 def create_system_prompt():
     """Create enhanced system prompt with strategic search integration"""
@@ -427,18 +301,34 @@ You MUST include a "🔍 SEARCH INTEGRATION SUMMARY" section that explicitly sta
 
 Remember: This is educational analysis, not investment advice. Always show your reasoning process and the recency of your data sources."""
 
+stock_agent_factory = AgentFactory(
+    'stock',
+    create_system_prompt,
+    tools=[
+        get_stock_data,
+        enhanced_get_recent_news,
+        strategic_web_search,
+    ],
+    pacer=bedrock_pacer
+)
+
 # =============================================================================
 # MAIN ANALYSIS FUNCTION
 # =============================================================================
 
-def analyze_stock(ticker: str, verbose: bool = True, wait_time: int = 3) -> dict:
+def analyze_stock(ticker: str, verbose: bool = True, wait_time: float = 0, on_token=None, on_turn_start=None) -> dict:
     """
     Analyze a stock ticker using strategic search integration with 2025 context.
 
     Args:
         ticker (str): Stock ticker symbol (e.g., 'AAPL', 'TSLA', 'MSFT')
         verbose (bool): Whether to print progress messages (default: True)
-        wait_time (int): Seconds to wait before analysis (default: 3)
+        wait_time (float): Optional fixed pause before analysis (default: 0);
+            Bedrock pacing adapts to throttling on its own
+        on_token (callable): Optional callback receiving model text chunks as
+            they are generated; replaces the default stdout streaming
+        on_turn_start (callable): Optional callback invoked when each model
+            turn begins (used with on_token)
 
     Returns:
         dict: Analysis results containing:
@@ -470,38 +360,39 @@ def analyze_stock(ticker: str, verbose: bool = True, wait_time: int = 3) -> dict
         print("🔄 Using strategic multi-approach search...")
         print(f"📅 Analysis Date: {current_date}")
 
-    try:
-        # Setup model and system prompt
-        claude_37_model = setup_claude_model()
-        enhanced_system_prompt = create_system_prompt()
-
-        # Create fresh strategic agent
-        if verbose:
-            print("🔄 CREATING STRATEGIC AGENT (with enhanced search capabilities)")
-
-        strategic_agent = Agent(
-            model=claude_37_model,
-            system_prompt=enhanced_system_prompt,
-            tools=[
-                get_stock_data,
-                enhanced_get_recent_news,
-                strategic_web_search,
-            ]
-        )
+    telemetry = RunTelemetry('stock', ticker)
 
-        if verbose:
-            print("✅ Strategic agent created")
-            print(f"⏱️  Waiting {wait_time} seconds...")
-
-        time.sleep(wait_time)
-        analysis_start_time = time.time()
+    try:
+        callback_handler = TokenCallbackHandler(on_token, on_turn_start) if on_token is not None else None
 
-        # Run the analysis
-        result = strategic_agent(f"""
+        if wait_time > 0:
+            if verbose:
+                print(f"⏱️  Waiting {wait_time} seconds...")
+            time.sleep(wait_time)
+
+        # Baseline searches are gathered once per ticker per day, stock data and
+        # news once per RESEARCH_MARKET_DATA_TTL_MINUTES, and shared with the MOAT analysis
+        with telemetry.phase('research_context'):
+            research = research_contexts.get_or_build(
+                ticker,
+                telemetry.timed('get_stock_data', get_stock_data),
+                telemetry.timed('enhanced_get_recent_news', enhanced_get_recent_news)
+            )
+            research = research_contexts.ensure_searches(
+                research, MARKET_QUERIES, telemetry.timed('strategic_web_search', strategic_web_search)
+            )
+
+        analysis_prompt = f"""
         Analyze {ticker} stock using strategic search integration with 2025 context.
         
         CURRENT DATE: {current_date}
         
+        RESEARCH ALREADY GATHERED (from get_stock_data, enhanced_get_recent_news and strategic_web_search):
+        {format_context(research, MARKET_QUERIES)}
+        
+        Treat the research above as tool output you already have. Call strategic_web_search only
+        for angles it does not cover.
+        
         REQUIREMENTS:
         1. Use get_stock_data for comprehensive financial metrics
         2. Use enhanced_get_recent_news for market sentiment (with strategic fallbacks)
@@ -520,7 +411,21 @@ def analyze_stock(ticker: str, verbose: bool = True, wait_time: int = 3) -> dict
         
         Make sure to integrate any findings and acknowledge the search strategy used.
         When you find information from 2023, note that this may be outdated and seek more recent data.
-        """)
+        """
+
+        # Reuse this thread's agent; each Bedrock call inside the run is paced
+        # (and a throttled call retried) by the shared model
+        strategic_agent = stock_agent_factory.acquire(callback_handler, observers=[telemetry])
+
+        if verbose:
+            print("🔄 RUNNING STRATEGIC AGENT (with enhanced search capabilities)")
+            if bedrock_pacer.delay > 0:
+                print(f"🐢 Bedrock pacing: {bedrock_pacer.delay:.1f}s between calls")
+
+        analysis_start_time = time.time()
+
+        with telemetry.phase('agent'):
+            result = strategic_agent(analysis_prompt)
 
         analysis_end_time = time.time()
         analysis_duration = analysis_end_time - analysis_start_time
@@ -540,6 +445,7 @@ def analyze_stock(ticker: str, verbose: bool = True, wait_time: int = 3) -> dict
             'duration': analysis_duration,
             'search_calls': search_calls,
             'error': None,
+            'telemetry': telemetry.finish(result),
             'agent': strategic_agent  # Include agent for further inspection if needed
         }
 
@@ -555,6 +461,7 @@ def analyze_stock(ticker: str, verbose: bool = True, wait_time: int = 3) -> dict
             'duration': 0,
             'search_calls': 0,
             'error': error_msg,
+            'telemetry': telemetry.finish(success=False, error=error_msg),
             'agent': None
         }
 
@@ -562,6 +469,24 @@ def analyze_stock(ticker: str, verbose: bool = True, wait_time: int = 3) -> dict
 # HELPER FUNCTIONS
 # =============================================================================
 
+class TokenCallbackHandler:
+    """
+    Agent callback handler that forwards generated text chunks to a function,
+    and optionally signals the start of each model turn
+    """
+
+    def __init__(self, on_token, on_turn_start=None):
+        self.on_token = on_token
+        self.on_turn_start = on_turn_start
+
+    def __call__(self, **kwargs):
+        event = kwargs.get('event')
+        if self.on_turn_start and isinstance(event, dict) and 'messageStart' in event:
+            self.on_turn_start()
+        data = kwargs.get('data')
+        if data:
+            self.on_token(data)
+
 def count_strategic_searches(agent) -> int:
     """Count the number of strategic search calls made by the agent"""
     search_calls = 0
@@ -600,14 +525,17 @@ def get_analysis_summary(result_dict: dict) -> str:
 # BATCH ANALYSIS FUNCTION (BONUS)
 # =============================================================================
 
-def analyze_multiple_stocks(tickers: list, verbose: bool = True, wait_between: int = 5) -> dict:
+def analyze_multiple_stocks(tickers: list, verbose: bool = True, wait_between: float = 0, parallelism: int = 1) -> dict:
     """
-    Analyze multiple stocks in sequence.
+    Analyze multiple stocks, one after another or several at a time.
 
     Args:
         tickers (list): List of ticker symbols
         verbose (bool): Whether to print progress messages
-        wait_between (int): Seconds to wait between analyses
+        wait_between (float): Optional fixed pause between sequential analyses
+            (default: 0); throughput is otherwise paced by upstream throttling
+        parallelism (int): Analyses to run at once (default: 1). Concurrent
+            runs still share the process-wide Bedrock and search budgets.
 
     Returns:
         dict: Results for all tickers
@@ -617,28 +545,44 @@ def analyze_multiple_stocks(tickers: list, verbose: bool = True, wait_between: i
     total_start_time = time.time()
 
     if verbose:
-        print(f"🎯 BATCH ANALYSIS: {len(tickers)} stocks")
+        print(f"🎯 BATCH ANALYSIS: {len(tickers)} stocks" + (f", {parallelism} at a time" if parallelism > 1 else ""))
         print("="*60)
 
-    for i, ticker in enumerate(tickers, 1):
-        if verbose:
-            print(f"\n📈 [{i}/{len(tickers)}] Analyzing {ticker}...")
+    if parallelism > 1:
+        from batch_analysis import iter_concurrent
 
-        result = analyze_stock(ticker, verbose=verbose, wait_time=2)
-        results[ticker] = result
+        # Per-run progress output would interleave, so only completions are printed
+        completions = iter_concurrent(tickers, lambda t: analyze_stock(t, verbose=False), parallelism)
+        for i, (ticker, result, error) in enumerate(completions, 1):
+            if error is not None:
+                result = {'success': False, 'error': str(error), 'ticker': ticker}
+            results[ticker] = result
+            if verbose:
+                print(f"\n📈 [{i}/{len(tickers)}] {ticker} finished")
+                if result['success']:
+                    print(f"✅ {ticker}: {get_analysis_summary(result)[:100]}...")
+                else:
+                    print(f"❌ {ticker}: {result['error']}")
+    else:
+        for i, ticker in enumerate(tickers, 1):
+            if verbose:
+                print(f"\n📈 [{i}/{len(tickers)}] Analyzing {ticker}...")
 
-        if verbose:
-            if result['success']:
-                summary = get_analysis_summary(result)
-                print(f"✅ {ticker}: {summary[:100]}...")
-            else:
-                print(f"❌ {ticker}: {result['error']}")
+            result = analyze_stock(ticker, verbose=verbose)
+            results[ticker] = result
 
-        # Wait between analyses (except for the last one)
-        if i < len(tickers) and wait_between > 0:
             if verbose:
-                print(f"⏱️  Waiting {wait_between} seconds before next analysis...")
-            time.sleep(wait_between)
+                if result['success']:
+                    summary = get_analysis_summary(result)
+                    print(f"✅ {ticker}: {summary[:100]}...")
+                else:
+                    print(f"❌ {ticker}: {result['error']}")
+
+            # Optional fixed pause between analyses (except for the last one)
+            if i < len(tickers) and wait_between > 0:
+                if verbose:
+                    print(f"⏱️  Waiting {wait_between} seconds before next analysis...")
+                time.sleep(wait_between)
 
     total_duration = time.time() - total_start_time
 
@@ -680,7 +624,7 @@ def example_usage():
 
     # Example 3: Batch analysis
     print("\n=== EXAMPLE 3: Batch Analysis ===")
-    batch_results = analyze_multiple_stocks(['MSFT', 'GOOGL'], verbose=True, wait_between=3)
+    batch_results = analyze_multiple_stocks(['MSFT', 'GOOGL'], verbose=True)
 
     print(f"Batch results: {batch_results['successful_count']}/{batch_results['total_count']} successful")
 
@@ -719,86 +663,7 @@ def parse_stock_analysis(analysis_text: str) -> dict:
             - 'analytical_reasoning': Investment Takeaway + Analytical Reasoning (no Search Integration Summary)
             - 'raw_text': Original text for fallback
     """
-
-    if not analysis_text or not isinstance(analysis_text, str):
-        return {
-            'company_info': 'Analysis text not available',
-            'bull_case': 'Bull case not available',
-            'bear_case': 'Bear case not available',
-            'analytical_reasoning': 'Analytical reasoning not available',
-            'raw_text': analysis_text or ''
-        }
-
-    # Find the positions of each section marker
-    section_positions = {}
-
-    # Define the exact section markers to look for
-    markers = [
-        '## Executive Summary',
-        '## 🐂 BULL CASE',
-        '## 🐻 BEAR CASE',
-        '## 📊 INVESTMENT TAKEAWAY',
-        '## 🔍 SEARCH INTEGRATION SUMMARY',
-        '## 🤔 ANALYTICAL REASONING'
-    ]
-
-    # Find position of each marker
-    for marker in markers:
-        pos = analysis_text.find(marker)
-        if pos != -1:
-            section_positions[marker] = pos
-
-    # Extract sections based on your specific requirements
-
-    # Section 1: Executive Summary through Bull Case (excluding Bull Case header)
-    start_pos = section_positions.get('## Executive Summary', 0)
-    end_pos = section_positions.get('## 🐂 BULL CASE', len(analysis_text))
-    section_1_part1 = analysis_text[start_pos:end_pos].strip()
-
-    # Section 1 addition: Search Integration Summary through Analytical Reasoning (excluding Analytical Reasoning header)
-    start_pos = section_positions.get('## 🔍 SEARCH INTEGRATION SUMMARY', len(analysis_text))
-    end_pos = section_positions.get('## 🤔 ANALYTICAL REASONING', len(analysis_text))
-    section_1_part2 = analysis_text[start_pos:end_pos].strip()
-
-    # Combine Section 1 parts
-    company_info = f"{section_1_part1}\n\n{section_1_part2}".strip()
-
-    # Section 2: Bull Case through Bear Case (excluding Bear Case header)
-    start_pos = section_positions.get('## 🐂 BULL CASE', len(analysis_text))
-    end_pos = section_positions.get('## 🐻 BEAR CASE', len(analysis_text))
-    bull_case = analysis_text[start_pos:end_pos].strip()
-
-    # Section 3: Bear Case through Investment Takeaway (excluding Investment Takeaway header)
-    start_pos = section_positions.get('## 🐻 BEAR CASE', len(analysis_text))
-    end_pos = section_positions.get('## 📊 INVESTMENT TAKEAWAY', len(analysis_text))
-    bear_case = analysis_text[start_pos:end_pos].strip()
-
-    # Section 4: Investment Takeaway through Search Integration Summary (excluding Search Integration Summary header)
-    # FIXED: This should stop before Search Integration Summary to avoid duplication
-    start_pos = section_positions.get('## 📊 INVESTMENT TAKEAWAY', len(analysis_text))
-    end_pos = section_positions.get('## 🔍 SEARCH INTEGRATION SUMMARY', len(analysis_text))
-    section_4_part1 = analysis_text[start_pos:end_pos].strip()
-
-    # Section 4 addition: Analytical Reasoning through end
-    start_pos = section_positions.get('## 🤔 ANALYTICAL REASONING', len(analysis_text))
-    section_4_part2 = analysis_text[start_pos:].strip()
-
-    # Combine Section 4 parts (Investment Takeaway + Analytical Reasoning, no Search Integration Summary)
-    analytical_reasoning = f"{section_4_part1}\n\n{section_4_part2}".strip()
-
-    # Clean up sections
-    def clean_section(text):
-        # Remove excessive whitespace
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
-        return text.strip()
-
-    return {
-        'company_info': clean_section(company_info),
-        'bull_case': clean_section(bull_case),
-        'bear_case': clean_section(bear_case),
-        'analytical_reasoning': clean_section(analytical_reasoning),
-        'raw_text': analysis_text
-    }
+    return split_stock_sections(analysis_text)
 
 def extract_key_metrics(company_info_section: str) -> dict:
     """
@@ -810,33 +675,7 @@ def extract_key_metrics(company_info_section: str) -> dict:
     Returns:
         dict: Extracted metrics like price, market cap, PE ratio, etc.
     """
-
-    metrics = {}
-
-    # Define patterns to extract metrics
-    patterns = {
-        'current_price': r'Current Price[:\s]*\$?([\d,]+\.?\d*)',
-        'market_cap': r'Market Cap[:\s]*\$?([\d,]+\.?\d*)\s*(trillion|billion|million)?',
-        'pe_ratio': r'P/E Ratio[:\s]*([\d,]+\.?\d*)',
-        'revenue_growth': r'Revenue Growth[:\s]*([\d,]+\.?\d*)%?',
-        'profit_margin': r'Profit Margin[:\s]*([\d,]+\.?\d*)%?',
-        'dividend_yield': r'Dividend Yield[:\s]*([\d,]+\.?\d*)%?',
-        'analyst_rating': r'Analyst Rating[:\s]*([A-Za-z\s]+)',
-        'year_high': r'52-Week.*?[\$\s]*([\d,]+\.?\d*).*?-.*?\$?([\d,]+\.?\d*)',
-        'price_change_1y': r'1-Year Price Change[:\s]*[+\-]?([\d,]+\.?\d*)%?'
-    }
-
-    for metric_name, pattern in patterns.items():
-        match = re.search(pattern, company_info_section, re.IGNORECASE)
-        if match:
-            if metric_name == 'year_high':
-                # Special handling for 52-week range
-                metrics['year_low'] = match.group(1)
-                metrics['year_high'] = match.group(2)
-            else:
-                metrics[metric_name] = match.group(1).strip()
-
-    return metrics
+    return extract_metrics(company_info_section)
 
 def get_executive_summary(company_info_section: str) -> str:
     """
@@ -961,20 +800,22 @@ The analyst consensus "Buy" rating indicates professional confidence in Apple's
 # Run the test
 # test_parser_with_real_data()
 
-def analyze_and_parse_stock(ticker: str, verbose: bool = False) -> dict:
+def analyze_and_parse_stock(ticker: str, verbose: bool = False, on_token=None, on_turn_start=None) -> dict:
     """
     Complete function that analyzes stock and returns parsed sections.
 
     Args:
         ticker (str): Stock ticker symbol
         verbose (bool): Whether to print progress messages
+        on_token (callable): Optional callback receiving model text chunks
+        on_turn_start (callable): Optional callback invoked as each model turn begins
 
     Returns:
         dict: Contains both analysis results and parsed sections
     """
 
     # Run the analysis (assumes analyze_stock function exists)
-    analysis_result = analyze_stock(ticker, verbose=verbose)
+    analysis_result = analyze_stock(ticker, verbose=verbose, on_token=on_token, on_turn_start=on_turn_start)
 
     if not analysis_result['success']:
         return {
@@ -982,7 +823,8 @@ def analyze_and_parse_stock(ticker: str, verbose: bool = False) -> dict:
             'error': analysis_result['error'],
             'ticker': ticker,
             'parsed_sections': None,
-            'metrics': None
+            'metrics': None,
+            'telemetry': analysis_result.get('telemetry')
         }
 
     # Convert AgentResult to string
@@ -991,11 +833,8 @@ def analyze_and_parse_stock(ticker: str, verbose: bool = False) -> dict:
         print(f"Debug: Analysis text length: {len(analysis_text)}")
         print(f"Debug: First 200 chars: {analysis_text[:200]}...")
 
-    # Parse the analysis text into sections
-    parsed_sections = parse_stock_analysis(analysis_text)
-
-    # Extract key metrics
-    metrics = extract_key_metrics(parsed_sections['company_info'])
+    # Parse the analysis text into sections and key metrics
+    parsed_sections, metrics = parse_stock_output(analysis_text)
 
     # Get executive summary
     executive_summary = get_executive_summary(parsed_sections['company_info'])
@@ -1008,9 +847,69 @@ def analyze_and_parse_stock(ticker: str, verbose: bool = False) -> dict:
         'parsed_sections': parsed_sections,
         'metrics': metrics,
         'executive_summary': executive_summary,
-        'raw_analysis': analysis_text
+        'raw_analysis': analysis_text,
+        'telemetry': analysis_result['telemetry']
+    }
+
+def build_agent_output(ticker: str, result: dict) -> dict:
+    """
+    Shape an analyze_and_parse_stock() result into the record stored by insert_agent_output.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        result (dict): Successful result from analyze_and_parse_stock()
+
+    Returns:
+        dict: Agent output ready for insert_agent_output()
+    """
+    return {
+        "ticker": ticker,
+        "duration": result['duration'],
+        "search_calls": result['search_calls'],
+        "executive_summary": result['executive_summary'],
+        "sections": result['parsed_sections'],
+        "metrics": result['metrics'],
+        "timestamp": datetime.now().isoformat()
     }
 
+def stream_stock_analysis(ticker: str, emit, verbose: bool = False):
+    """
+    Run analyze_and_parse_stock(), reporting its progress as it generates.
+
+    Only the final model turn holds the report; earlier turns are short
+    preambles to tool calls. The section parser restarts with every turn, and
+    a 'reset' event withdraws sections a tool-calling turn already produced.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        emit (callable): Called with (event, payload) pairs:
+            - ('token', str): model text as it is generated
+            - ('section', {'key': str, 'text': str}): a "## " section once it closes
+            - ('reset', {}): discard sections streamed so far (a new turn began)
+        verbose (bool): Whether to print progress messages
+
+    Returns:
+        dict: The analyze_and_parse_stock() result
+    """
+    state = {'parser': IncrementalSectionParser(), 'sections_sent': False}
+
+    def on_token(text):
+        emit('token', text)
+        for key, section in state['parser'].feed(text):
+            state['sections_sent'] = True
+            emit('section', {'key': key, 'text': section})
+
+    def on_turn_start():
+        if state['sections_sent']:
+            emit('reset', {})
+        state['parser'] = IncrementalSectionParser()
+        state['sections_sent'] = False
+
+    result = analyze_and_parse_stock(ticker, verbose=verbose, on_token=on_token, on_turn_start=on_turn_start)
+    for key, section in state['parser'].close():
+        emit('section', {'key': key, 'text': section})
+    return result
+
 # Quick test function to verify the parser works with your OSCR data
 
 
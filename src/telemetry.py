@@ -0,0 +1,183 @@
+# =============================================================================
+# ANALYSIS TELEMETRY
+# Per-run model turns, token usage, tool timings, retries and estimated cost
+# =============================================================================
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Bedrock on-demand pricing for the configured model, USD per million tokens
+BEDROCK_INPUT_COST_PER_MTOK = float(os.getenv("BEDROCK_INPUT_COST_PER_MTOK", "3.0"))
+BEDROCK_OUTPUT_COST_PER_MTOK = float(os.getenv("BEDROCK_OUTPUT_COST_PER_MTOK", "15.0"))
+
+
+def estimate_cost(input_tokens, output_tokens) -> float:
+    return round(
+        input_tokens / 1_000_000 * BEDROCK_INPUT_COST_PER_MTOK
+        + output_tokens / 1_000_000 * BEDROCK_OUTPUT_COST_PER_MTOK,
+        5
+    )
+
+
+class RunTelemetry:
+    """
+    Collects telemetry for one agent analysis.
+
+    Model turns and throttling retries are observed live through the agent's
+    callback handler; tool timings and token totals are read from the agent
+    result's event loop metrics when the run finishes; pre-gathering outside
+    the agent is timed with phase(), and tools it calls directly with timed().
+    """
+
+    def __init__(self, kind, ticker):
+        self.kind = kind
+        self.ticker = ticker
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self.phases = {}
+        self.turns = []
+        self.retries = {'throttled_in_agent': 0}
+        self.prefetched_tools = {}
+        self._turn_started = None
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block of work outside the agent loop, e.g. research gathering"""
+        start = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = round(self.phases.get(name, 0) + time.time() - start, 3)
+
+    def timed(self, name, fn):
+        """
+        Wrap a tool function called outside the agent loop (e.g. while building
+        the research context) so each call is recorded under tools[name].
+        """
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            failed = False
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    entry = self.prefetched_tools.setdefault(name, {'calls': 0, 'errors': 0, 'wall_seconds': 0.0})
+                    entry['calls'] += 1
+                    entry['errors'] += 1 if failed else 0
+                    entry['wall_seconds'] = round(entry['wall_seconds'] + time.time() - start, 3)
+        return wrapper
+
+    def callback_handler(self, inner):
+        """Wrap an agent callback handler to record model turns and throttling"""
+        def handler(**kwargs):
+            event = kwargs.get('event')
+            if isinstance(event, dict):
+                self._observe_stream_event(event)
+            if kwargs.get('event_loop_throttled_delay'):
+                with self._lock:
+                    self.retries['throttled_in_agent'] += 1
+            if inner is not None:
+                inner(**kwargs)
+        return handler
+
+    def _observe_stream_event(self, event):
+        if 'messageStart' in event:
+            self._turn_started = time.time()
+        elif 'metadata' in event:
+            metadata = event['metadata']
+            usage = metadata.get('usage', {})
+            with self._lock:
+                self.turns.append({
+                    'model_latency_ms': metadata.get('metrics', {}).get('latencyMs'),
+                    'wall_seconds': round(time.time() - self._turn_started, 3) if self._turn_started else None,
+                    'input_tokens': usage.get('inputTokens', 0),
+                    'output_tokens': usage.get('outputTokens', 0),
+                })
+
+    def finish(self, agent_result=None, success=True, error=None) -> dict:
+        """
+        Close the run and return its telemetry as a JSON-serializable dict.
+
+        Args:
+            agent_result: The AgentResult, whose event loop metrics supply
+                tool timings and token totals when available
+        """
+        metrics = getattr(agent_result, 'metrics', None)
+        tools = {}
+        for name, tool_metrics in (getattr(metrics, 'tool_metrics', None) or {}).items():
+            tools[name] = {
+                'calls': tool_metrics.call_count,
+                'errors': tool_metrics.error_count,
+                'wall_seconds': round(tool_metrics.total_time, 3),
+                'prefetched_calls': 0,
+            }
+        # Calls made while pre-gathering research count toward the same tools
+        for name, prefetched in self.prefetched_tools.items():
+            entry = tools.setdefault(name, {'calls': 0, 'errors': 0, 'wall_seconds': 0.0, 'prefetched_calls': 0})
+            entry['calls'] += prefetched['calls']
+            entry['errors'] += prefetched['errors']
+            entry['wall_seconds'] = round(entry['wall_seconds'] + prefetched['wall_seconds'], 3)
+            entry['prefetched_calls'] += prefetched['calls']
+
+        usage = getattr(metrics, 'accumulated_usage', None) or {}
+        input_tokens = usage.get('inputTokens') or sum(t['input_tokens'] for t in self.turns)
+        output_tokens = usage.get('outputTokens') or sum(t['output_tokens'] for t in self.turns)
+        model_latency_ms = (getattr(metrics, 'accumulated_metrics', None) or {}).get('latencyMs') \
+            or sum(t['model_latency_ms'] or 0 for t in self.turns)
+
+        return {
+            'kind': self.kind,
+            'ticker': self.ticker,
+            'success': success,
+            'error': error,
+            'total_seconds': round(time.time() - self.started_at, 3),
+            'phases': self.phases,
+            'model': {
+                'turns': len(self.turns),
+                'latency_seconds': round(model_latency_ms / 1000, 3),
+                'turn_details': self.turns,
+            },
+            'cycles': [round(d, 3) for d in (getattr(metrics, 'cycle_durations', None) or [])],
+            'tools': tools,
+            'tokens': {'input': input_tokens, 'output': output_tokens},
+            'retries': self.retries,
+            'estimated_cost_usd': estimate_cost(input_tokens, output_tokens),
+        }
+
+
+def summarize_telemetry(runs) -> dict:
+    """
+    Average where time, tokens and cost go across several runs' telemetry.
+
+    Returns:
+        dict: run and failed-run counts plus mean seconds per phase, tool and
+            model, mean tokens and mean estimated cost
+    """
+    runs = [run for run in runs if run]
+    if not runs:
+        return {'runs': 0}
+
+    def mean(values):
+        values = list(values)
+        return round(sum(values) / len(values), 3) if values else 0
+
+    tool_names = sorted({name for run in runs for name in run.get('tools', {})})
+    phase_names = sorted({name for run in runs for name in run.get('phases', {})})
+    return {
+        'runs': len(runs),
+        'failed_runs': sum(1 for run in runs if not run.get('success', True)),
+        'total_seconds': mean(run['total_seconds'] for run in runs),
+        'model_seconds': mean(run['model']['latency_seconds'] for run in runs),
+        'model_turns': mean(run['model']['turns'] for run in runs),
+        'phase_seconds': {name: mean(run['phases'].get(name, 0) for run in runs) for name in phase_names},
+        'tool_seconds': {name: mean(run['tools'].get(name, {}).get('wall_seconds', 0) for run in runs) for name in tool_names},
+        'input_tokens': mean(run['tokens']['input'] for run in runs),
+        'output_tokens': mean(run['tokens']['output'] for run in runs),
+        'estimated_cost_usd': mean(run['estimated_cost_usd'] for run in runs),
+    }
@@ -0,0 +1,12 @@
+# =============================================================================
+# TEST SETUP
+# Makes the flat src/ modules importable from the tests.
+#
+# Usage (from src/):
+#     python -m pytest tests
+# =============================================================================
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from batch_analysis import BatchCheckpoint, batch_key, iter_concurrent, run_batch
+
+
+def test_iter_concurrent_yields_every_item_with_its_result_or_error():
+    def work(item):
+        if item == 3:
+            raise ValueError("boom")
+        return item * 10
+
+    completions = {item: (result, error) for item, result, error in iter_concurrent(range(5), work, 2)}
+
+    assert set(completions) == {0, 1, 2, 3, 4}
+    assert completions[4] == (40, None)
+    assert completions[3][0] is None and isinstance(completions[3][1], ValueError)
+
+
+def test_iter_concurrent_bounds_work_in_flight():
+    lock = threading.Lock()
+    in_flight = peak = 0
+
+    def work(item):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+
+    list(iter_concurrent(range(12), work, 3))
+    assert peak <= 3
+
+
+@pytest.mark.parametrize("parallelism", [0, -1])
+def test_iter_concurrent_treats_non_positive_parallelism_as_one(parallelism):
+    items = []
+    # On a thread, so a regression to the old busy loop fails instead of hanging
+    runner = threading.Thread(
+        target=lambda: items.extend(item for item, _, _ in iter_concurrent([1, 2, 3], lambda x: x, parallelism)),
+        daemon=True
+    )
+    runner.start()
+    runner.join(timeout=5)
+
+    assert not runner.is_alive()
+    assert sorted(items) == [1, 2, 3]
+
+
+def test_batch_key_ignores_order():
+    assert batch_key(['MSFT', 'AAPL']) == batch_key(['AAPL', 'MSFT'])
+    assert batch_key(['AAPL']) != batch_key(['AAPL', 'MSFT'])
+
+
+def test_checkpoints_of_different_batches_do_not_overwrite_each_other(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    first = BatchCheckpoint(path, 'first')
+    second = BatchCheckpoint(path, 'second')
+
+    first.record('AAPL', True)
+    second.record('MSFT', True)
+    second.clear()
+
+    assert BatchCheckpoint(path, 'first').is_done('AAPL')
+    assert not BatchCheckpoint(path, 'second').is_done('MSFT')
+
+
+def test_run_batch_resumes_from_its_checkpoint(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    calls = []
+
+    def flaky(ticker):
+        calls.append(ticker)
+        if ticker == 'MSFT' and calls.count('MSFT') == 1:
+            raise RuntimeError("throttled")
+        return ticker
+
+    first = {c['ticker']: c for c in run_batch(['aapl', 'MSFT'], 2, path, work=flaky)}
+    assert first['AAPL']['success'] and not first['MSFT']['success']
+
+    second = {c['ticker']: c for c in run_batch(['MSFT', 'AAPL'], 2, path, work=flaky)}
+    assert second['AAPL']['skipped'] and second['MSFT']['success']
+    assert calls.count('AAPL') == 1
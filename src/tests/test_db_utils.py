@@ -0,0 +1,83 @@
+import json
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+import db_utils
+from db_utils import decode_history_cursor, encode_history_cursor, fetch_analysis_history
+
+
+class FakeCursor:
+    """Answers one query with canned rows and remembers what was asked"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.sql = self.params = None
+
+    def execute(self, sql, params=None):
+        self.sql, self.params = sql, params
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def install(rows):
+        cursor = FakeCursor(rows)
+        monkeypatch.setattr(db_utils, 'db_cursor', contextmanager(lambda: (yield cursor)))
+        return cursor
+    return install
+
+
+def test_history_cursor_round_trips():
+    before = (datetime(2025, 7, 1, 9, 30, 15, 123456), 42)
+    assert decode_history_cursor(encode_history_cursor(before)) == before
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm8tc2VwYXJhdG9y", "MjAyNS0wNy0wMXxub3QtYW4taWQ="])
+def test_malformed_history_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_history_cursor(cursor)
+
+
+def test_stock_history_reads_stored_headlines_only(fake_db):
+    cursor = fake_db([
+        (7, datetime(2025, 7, 2), 40.0, 3, 'bedrock', 'Newer', ['Services growth'], ['China exposure']),
+        (6, datetime(2025, 7, 1), 38.0, 2, 'bedrock', 'Older', None, None),
+        (5, datetime(2025, 6, 30), 35.0, 2, 'bedrock', 'Next page', [], []),
+    ])
+
+    entries, next_before = fetch_analysis_history('AAPL', 'stock', limit=2)
+
+    assert 'payload' not in cursor.sql
+    assert cursor.params['limit'] == 3
+    assert [entry['id'] for entry in entries] == [7, 6]
+    assert entries[0]['bull_points'] == ['Services growth']
+    assert entries[1]['bear_points'] == []
+    assert next_before == (datetime(2025, 7, 1), 6)
+
+
+def test_history_keyset_continues_after_the_cursor(fake_db):
+    cursor = fake_db([])
+    entries, next_before = fetch_analysis_history('AAPL', 'moat', limit=20, before=(datetime(2025, 7, 1), 6))
+
+    assert entries == [] and next_before is None
+    assert cursor.params['before_time'] == datetime(2025, 7, 1) and cursor.params['before_id'] == 6
+    assert 'm.generated_at < %(before_time)s' in cursor.sql
+
+
+def test_moat_history_truncates_long_summaries(fake_db):
+    limit = db_utils.HISTORY_SUMMARY_CHARS
+    fake_db([(3, datetime(2025, 7, 1), 50.0, 'bedrock', 'x' * (limit + 1))])
+
+    entries, _ = fetch_analysis_history('AAPL', 'moat')
+    assert entries[0]['executive_summary'] == 'x' * limit + '...'
+
+
+def test_stock_headlines_are_stored_as_json_lists():
+    output = {'sections': {'bull_case': "1. **Services growth**: recurring\n2. **Buybacks:** steady", 'bear_case': None}}
+    bull_points, bear_points = db_utils._stock_headlines(output)
+    assert json.loads(bull_points) == ['Services growth', 'Buybacks']
+    assert json.loads(bear_points) == []
@@ -0,0 +1,80 @@
+import base64
+import hashlib
+import json
+
+import pytest
+
+import payload_codec
+from payload_codec import compress, decompress, decode_sections, decode_stock_output, encode_sections, encode_stock_output
+
+AGENT_OUTPUT = {
+    "ticker": "AAPL",
+    "duration": 41.2,
+    "search_calls": 3,
+    "executive_summary": "Apple remains a quality compounder.",
+    "sections": {
+        "company_info": "## Executive Summary\nApple remains a quality compounder.",
+        "bull_case": "## 🐂 BULL CASE\n1. **Services growth**: recurring revenue",
+        "bear_case": "## 🐻 BEAR CASE\n1. **China exposure**: demand risk",
+        "analytical_reasoning": "## 🤔 ANALYTICAL REASONING\nBalanced.",
+        "raw_text": "## Executive Summary\nApple remains a quality compounder.\n\n## 🐂 BULL CASE\n"
+                    "1. **Services growth**: recurring revenue\n\n## 🐻 BEAR CASE\n1. **China exposure**: "
+                    "demand risk\n\n## 🤔 ANALYTICAL REASONING\nBalanced."
+    },
+    "metrics": {"current_price": 227.5},
+    "timestamp": "2025-07-01T10:00:00"
+}
+
+# AGENT_OUTPUT as stored by each codec when it shipped. If these stop
+# decoding, rows already in the database would too: add a new codec version
+# instead of changing an existing one.
+STORED_PAYLOADS = {
+    'zlib-d1': (
+        "ePngu1ofpZTBC4IwGMX/FemebNMwupnXDkEdg1jOg2Rq31oQ0f/et2UwnYYVjB12eNvee9/vbkEjjterDjhC6jMXHsEQPeK6LnQNTjwvp"
+        "ce9s+JFfrmZdCtVigx8BzBdoPR7OlK5RSJU2ikxDwTuKWF2GsaRTQZXnFvZ9FUbBHgxgC5b02WHZi3R4GCnaUQTrCrXza6kAjNpAh+NjY"
+        "VcHj+h8C2c4S5oOBDmkhd6hoT5rc3mn21rCvS3U47Ot+bYAmNN6CI/fQF5X2sg4wljkT/rJz2JpoRuKVkQvSaPJ5F9+7E="
+    ),
+    'zstd-d1': (
+        "KLUv/WAKAu0GANIHGxlQ1wMTYT2NBABvRPbijML7/jGiqZqRmQk9H9CNdCMdn9iB0YVgSJlF8+m0brlCxKcVrhe+9Yv+zRhzW6lFGiZb7"
+        "82T3gliOit3qSN7foZ+OD5DwqVvM9Zt1fKsQYfYVr+sLEsGKUSCaZLECyigAGmEFCRJazCCImAk2QPtEUU5qFCUObQvBAgPRK1BjCx3oA"
+        "UIkQXWcfrss4nTWuiseSCX4w4NbFvK6DYBWKNtY3ejScfPJk1vpYKrRJI1W42sq5N0tQIVZkDG+MNzUYClQQAeCF7wcB8ORoQB"
+    ),
+}
+
+DICTIONARY_V1_SHA256 = "9e5534cf7ba822399699f8c61bac2d29a4dcb66d57c832d6f87bb0770ce5112c"
+
+
+def test_dictionary_v1_is_unchanged():
+    assert hashlib.sha256(payload_codec._DICTIONARY_V1).hexdigest() == DICTIONARY_V1_SHA256
+
+
+@pytest.mark.parametrize("codec", sorted(STORED_PAYLOADS))
+def test_stored_payloads_still_decode(codec):
+    if codec.startswith('zstd') and not payload_codec.ZSTD_AVAILABLE:
+        pytest.skip("zstandard is not installed")
+    assert decode_stock_output(codec, base64.b64decode(STORED_PAYLOADS[codec])) == AGENT_OUTPUT
+
+
+@pytest.mark.parametrize("codec", ['zlib-d1', 'zstd-d1'])
+def test_compress_round_trips(codec):
+    if codec.startswith('zstd') and not payload_codec.ZSTD_AVAILABLE:
+        pytest.skip("zstandard is not installed")
+    data = json.dumps(AGENT_OUTPUT).encode('utf-8')
+    stored_codec, blob = compress(data, codec)
+    assert stored_codec == codec
+    assert decompress(codec, blob) == data
+
+
+def test_stock_output_keeps_the_sections_it_was_stored_with():
+    output = dict(AGENT_OUTPUT, sections=dict(AGENT_OUTPUT['sections'], bull_case="edited by hand"))
+    assert decode_stock_output(*encode_stock_output(output)) == output
+
+
+def test_moat_sections_round_trip():
+    sections = {'executive_summary': 'Wide moat.', 'moat_analysis': 'Switching costs.'}
+    assert decode_sections(*encode_sections(sections)) == sections
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        decompress('lz4-d1', b'')
@@ -0,0 +1,16 @@
+from prewarm import rank_tickers
+
+
+def test_requests_outrank_watchlist_membership():
+    ranked = rank_tickers({'ZZZ': 3, 'MSFT': 1}, watchlist=['AAPL', 'MSFT'], watchlist_weight=0)
+    assert ranked == ['ZZZ', 'MSFT', 'AAPL']
+
+
+def test_watchlist_membership_breaks_ties():
+    ranked = rank_tickers({'AAA': 2, 'MSFT': 2}, watchlist=['MSFT'], watchlist_weight=0)
+    assert ranked == ['MSFT', 'AAA']
+
+
+def test_watchlist_weight_counts_as_requests():
+    ranked = rank_tickers({'ZZZ': 3, 'MSFT': 1}, watchlist=['MSFT'], watchlist_weight=5)
+    assert ranked[0] == 'MSFT'
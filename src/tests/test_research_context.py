@@ -0,0 +1,76 @@
+import time
+
+import research_context
+from research_context import ResearchContextStore, run_searches, MARKET_QUERIES
+
+
+def fetchers(calls):
+    def fetch_stock_data(ticker):
+        calls.append('stock_data')
+        return {'ticker': ticker, 'current_price': len(calls)}
+
+    def fetch_news(ticker):
+        calls.append('news')
+        return f"news #{len(calls)}"
+
+    return fetch_stock_data, fetch_news
+
+
+def test_run_searches_drops_failed_and_empty_results():
+    def search(query, num_results):
+        if 'earnings' in query:
+            return f"🚨 Strategic search found no results for: {query}"
+        if 'fail' in query:
+            raise RuntimeError("timeout")
+        return f"results for {query}"
+
+    searches = run_searches(['AAPL outlook', 'AAPL earnings', 'AAPL fail'], search)
+    assert searches == {'AAPL outlook': 'results for AAPL outlook'}
+
+
+def test_stale_market_data_is_refetched_and_searches_are_kept(tmp_path, monkeypatch):
+    store = ResearchContextStore(str(tmp_path / "research.db"))
+    calls = []
+    context = store.get_or_build('aapl', *fetchers(calls))
+    context = store.ensure_searches(context, MARKET_QUERIES, lambda query, n: f"results for {query}")
+
+    assert store.get_or_build('AAPL', *fetchers(calls))['stock_data'] == context['stock_data']
+    assert calls == ['stock_data', 'news']
+
+    monkeypatch.setattr(research_context, 'RESEARCH_MARKET_DATA_TTL_MINUTES', 0)
+    assert store.fresh('AAPL') is None
+    refreshed = store.get_or_build('AAPL', *fetchers(calls))
+
+    assert calls == ['stock_data', 'news', 'stock_data', 'news']
+    assert refreshed['news'] == 'news #4'
+    assert refreshed['searches'] == context['searches']
+
+
+def test_failed_searches_are_retried_by_the_next_analysis(tmp_path):
+    store = ResearchContextStore(str(tmp_path / "research.db"))
+    context = store.get_or_build('AAPL', *fetchers([]))
+    attempts = []
+
+    def search(query, num_results):
+        attempts.append(query)
+        return "🚨 STRATEGIC SEARCH FAILED: Strategic search error: timeout"
+
+    store.ensure_searches(context, MARKET_QUERIES, search)
+    store.ensure_searches(store.peek('AAPL'), MARKET_QUERIES, search)
+    assert len(attempts) == 2 * len(MARKET_QUERIES)
+
+
+def test_invalidate_forces_a_rebuild(tmp_path):
+    store = ResearchContextStore(str(tmp_path / "research.db"))
+    calls = []
+    store.get_or_build('AAPL', *fetchers(calls))
+    store.invalidate('AAPL')
+
+    assert store.peek('AAPL') is None
+    store.get_or_build('AAPL', *fetchers(calls))
+    assert calls == ['stock_data', 'news', 'stock_data', 'news']
+
+
+def test_contexts_without_a_fetch_time_age_from_their_build_time():
+    context = {'built_at': time.time() - 3600}
+    assert not research_context.market_data_is_fresh(context)
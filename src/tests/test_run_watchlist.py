@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from run_watchlist_scriptv2 import apply_live_prices
+
+TODAY = pd.Timestamp(datetime.now().date())
+
+
+def epoch_ms(moment):
+    return int(moment.timestamp() * 1000)
+
+
+def history(last_day):
+    index = pd.DatetimeIndex([last_day - pd.Timedelta(days=1), last_day])
+    return pd.DataFrame({'AAPL': [100.0, 101.0], 'MSFT': [200.0, 201.0]}, index=index)
+
+
+def quotes(**prices_and_times):
+    return pd.DataFrame(
+        {'price': [p for p, _ in prices_and_times.values()],
+         'trade_time': [epoch_ms(t) for _, t in prices_and_times.values()]},
+        index=list(prices_and_times)
+    )
+
+
+def test_live_price_replaces_todays_close():
+    prices = history(TODAY)
+    updated = apply_live_prices(prices, quotes(AAPL=(105.0, datetime.now())))
+
+    assert updated.at[TODAY, 'AAPL'] == 105.0
+    assert updated.at[TODAY, 'MSFT'] == 201.0
+    assert len(updated) == 2
+    assert prices.at[TODAY, 'AAPL'] == 101.0
+
+
+def test_live_price_adds_todays_row_when_history_ends_earlier():
+    yesterday = TODAY - pd.Timedelta(days=1)
+    updated = apply_live_prices(history(yesterday), quotes(AAPL=(105.0, datetime.now()), MSFT=(205.0, datetime.now())))
+
+    assert updated.index[-1] == TODAY
+    assert updated.loc[TODAY].tolist() == [105.0, 205.0]
+
+
+def test_stale_trades_leave_history_unchanged():
+    # Weekend or holiday: the last trade is from an earlier session
+    yesterday = TODAY - pd.Timedelta(days=1)
+    prices = history(yesterday)
+    stale = datetime.now() - timedelta(days=2)
+
+    updated = apply_live_prices(prices, quotes(AAPL=(105.0, stale)))
+    assert updated is prices
+
+
+def test_quotes_for_unknown_tickers_are_ignored():
+    prices = history(TODAY - pd.Timedelta(days=1))
+    updated = apply_live_prices(prices, quotes(TSLA=(300.0, datetime.now())))
+    assert updated is prices
@@ -0,0 +1,156 @@
+import urllib.parse
+
+import pytest
+import requests
+
+import schwab_api.client as client_module
+from schwab_api.client import SchwabClient, chunk_symbols
+from schwab_api.exceptions import SchwabAPIError
+
+
+def test_chunk_symbols_dedupes_and_normalizes_in_order():
+    assert chunk_symbols([' aapl', 'MSFT', 'AAPL', '', None, 'msft ', 'brk.b']) == [['AAPL', 'MSFT', 'BRK.B']]
+
+
+def test_chunk_symbols_respects_the_symbol_limit():
+    symbols = [f"T{i}" for i in range(7)]
+    assert chunk_symbols(symbols, max_symbols=3) == [symbols[0:3], symbols[3:6], symbols[6:]]
+
+
+def test_chunk_symbols_respects_the_encoded_url_budget():
+    base_length = 50
+    max_url_length = 80
+    symbols = [f"S{i}/A" for i in range(20)]
+
+    chunks = chunk_symbols(symbols, max_url_length=max_url_length, base_length=base_length)
+
+    assert [s for chunk in chunks for s in chunk] == symbols
+    for chunk in chunks:
+        assert base_length + len(urllib.parse.quote(','.join(chunk), safe='')) <= max_url_length
+    # Each chunk is as full as the budget allows
+    for chunk, following in zip(chunks, chunks[1:]):
+        assert base_length + len(urllib.parse.quote(','.join(chunk + following[:1]), safe='')) > max_url_length
+
+
+def test_chunk_symbols_keeps_an_oversized_symbol_on_its_own():
+    assert chunk_symbols(['A', 'LONGSYMBOL', 'B'], max_url_length=5) == [['A'], ['LONGSYMBOL'], ['B']]
+
+
+def test_chunk_symbols_of_nothing_is_empty():
+    assert chunk_symbols([]) == []
+
+
+class FakeAuth:
+    def __init__(self):
+        self.refreshes = 0
+
+    def start_auto_refresh(self):
+        pass
+
+    def stop_auto_refresh(self):
+        pass
+
+    def get_access_token(self, force_refresh=False):
+        self.refreshes += force_refresh
+        return 'token'
+
+
+class FakeLimiter:
+    def __init__(self):
+        self.waits = 0
+        self.deferred = []
+
+    def wait(self):
+        self.waits += 1
+
+    def defer(self, seconds):
+        self.deferred.append(seconds)
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload if payload is not None else {}
+        self.headers = headers or {}
+        self.text = ''
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(client_module.time, 'sleep', slept.append)
+    return slept
+
+
+def make_client(session, max_retries=3):
+    return SchwabClient(FakeAuth(), session=session, max_retries=max_retries, ratelimiter=FakeLimiter())
+
+
+def test_retry_after_is_honoured_through_the_shared_limiter(sleeps):
+    session = FakeSession(FakeResponse(429, headers={'Retry-After': '90'}), FakeResponse(200, {'ok': True}))
+    client = make_client(session)
+
+    assert client._get('quotes') == {'ok': True}
+    assert client.ratelimiter.deferred == [90.0]
+    assert client.ratelimiter.waits == 2
+    assert sleeps == []
+
+
+def test_retry_after_beyond_the_cap_is_raised(monkeypatch, sleeps):
+    monkeypatch.setattr(client_module, 'RETRY_AFTER_MAX', 60)
+    session = FakeSession(FakeResponse(503, headers={'Retry-After': '3600'}))
+    client = make_client(session)
+
+    with pytest.raises(SchwabAPIError) as error:
+        client._get('quotes')
+    assert error.value.status_code == 503
+    assert session.calls == 1
+    assert client.ratelimiter.deferred == [] and sleeps == []
+
+
+def test_status_without_retry_after_backs_off_until_retries_run_out(sleeps):
+    session = FakeSession(*[FakeResponse(500) for _ in range(3)])
+    client = make_client(session, max_retries=2)
+
+    with pytest.raises(SchwabAPIError):
+        client._get('quotes')
+    assert session.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_connection_errors_are_retried_once_per_attempt(sleeps):
+    session = FakeSession(requests.ConnectionError(), requests.Timeout(), FakeResponse(200, {'ok': True}))
+    client = make_client(session)
+
+    assert client._get('quotes') == {'ok': True}
+    assert session.calls == 3 and client.ratelimiter.waits == 3
+    assert len(sleeps) == 2
+
+
+def test_session_adapter_does_not_retry_on_its_own():
+    adapter = client_module.build_session().get_adapter('https://api.schwabapi.com')
+    assert adapter.max_retries.total == 0
+
+
+def test_unauthorized_forces_one_token_refresh(sleeps):
+    session = FakeSession(FakeResponse(401), FakeResponse(200, {'ok': True}))
+    client = make_client(session)
+
+    assert client._get('quotes') == {'ok': True}
+    assert client.auth.refreshes == 1
@@ -0,0 +1,71 @@
+import pytest
+
+import schwab_api.rate_limiter as rate_limiter_module
+from schwab_api.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter_module.time, 'time', fake.time)
+    monkeypatch.setattr(rate_limiter_module.time, 'sleep', fake.sleep)
+    return fake
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_limiter(request, tmp_path):
+    path = str(tmp_path / 'limits.db') if request.param == 'sqlite' else None
+    return lambda **kwargs: RateLimiter(path=path, **kwargs)
+
+
+def test_defer_holds_back_the_next_request(clock, make_limiter):
+    limiter = make_limiter(max_requests=120, time_window=600, burst=20)
+    limiter.defer(90)
+    assert limiter.reserve() == pytest.approx(90)
+
+
+def test_defer_never_pulls_the_schedule_forward(clock, make_limiter):
+    limiter = make_limiter(max_requests=10, time_window=10, burst=2)
+    for _ in range(5):
+        limiter.reserve()
+    waiting = limiter.usage()['next_slot_in']
+
+    limiter.defer(0.5)
+    assert limiter.usage()['next_slot_in'] == pytest.approx(waiting)
+
+
+def test_saturating_caller_stays_within_the_window_budget(clock, make_limiter):
+    limiter = make_limiter(max_requests=120, time_window=600, burst=20)
+    sent = []
+    while clock.now < 1_000_000.0 + 3 * 600:
+        limiter.wait()
+        sent.append(clock.now)
+
+    # Every 600s window, wherever it starts, holds at most 119 requests
+    for i, start in enumerate(sent):
+        in_window = sum(1 for t in sent[i:i + 200] if t < start + 600)
+        assert in_window <= 119
+    assert sent[19] == sent[0]
+
+
+def test_usage_reports_burst_slots_taken(clock, make_limiter):
+    limiter = make_limiter(max_requests=120, time_window=600, burst=20)
+    assert limiter.usage()['in_use'] == 0
+
+    for _ in range(5):
+        limiter.reserve()
+    usage = limiter.usage()
+    assert usage['in_use'] == 5
+    assert usage['next_slot_in'] == 0
+    assert usage['shared'] == bool(limiter.path)
@@ -0,0 +1,37 @@
+import pytest
+
+from search_cache import SearchCache, normalize_query
+
+
+def test_normalize_query_folds_case_whitespace_and_word_order():
+    assert normalize_query("  AAPL   Revenue\tGrowth ") == normalize_query("growth aapl revenue")
+
+
+@pytest.mark.parametrize("first, second", [
+    ("AAPL revenue 2023", "AAPL revenue 2025"),
+    ("AAPL vs MSFT margins", "AAPL MSFT margins"),
+    ("AAPL earnings", "AAPL earnings earnings"),
+])
+def test_normalize_query_keeps_every_word(first, second):
+    assert normalize_query(first) != normalize_query(second)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SearchCache(path=str(tmp_path / 'search_cache.db'))
+
+
+def test_cache_hits_equivalent_queries_only(cache):
+    cache.put('strategic', 'AAPL revenue 2025', 5, 'results')
+
+    assert cache.get('strategic', '2025 aapl  REVENUE', 5) == 'results'
+    assert cache.get('strategic', 'AAPL revenue 2023', 5) is None
+    assert cache.get('strategic', 'AAPL revenue 2025', 10) is None
+    assert cache.get('news', 'AAPL revenue 2025', 5) is None
+
+
+def test_cached_header_time_is_refreshed(cache):
+    cache.put('strategic', 'AAPL', 5, 'STRATEGIC WEB SEARCH RESULTS - 00:00:00\nbody')
+    hit = cache.get('strategic', 'AAPL', 5)
+    assert hit.startswith('STRATEGIC WEB SEARCH RESULTS - ')
+    assert hit.endswith('\nbody')
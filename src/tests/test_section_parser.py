@@ -0,0 +1,78 @@
+import pytest
+
+from section_parser import IncrementalSectionParser, parse_stock_output, thesis_points
+
+ANALYSIS = """Preamble the agent wrote before the report.
+
+## Executive Summary
+Apple remains a cash machine.
+
+Current Price: $212.50
+Market Cap: $3.2 trillion
+P/E Ratio: 32.1
+
+## 🐂 BULL CASE
+1. **Services growth**: recurring revenue keeps compounding
+
+
+2. **Buybacks:** steady share count reduction
+
+## 🐻 BEAR CASE
+1. **China exposure**: demand and supply chain risk
+
+## 📊 INVESTMENT TAKEAWAY
+Hold.
+
+## 🔍 SEARCH INTEGRATION SUMMARY
+Three searches informed this view.
+
+## 🤔 ANALYTICAL REASONING
+Growth is priced in.
+"""
+
+
+def stream(text, chunk_size):
+    parser = IncrementalSectionParser()
+    sections = []
+    for start in range(0, len(text), chunk_size):
+        sections.extend(parser.feed(text[start:start + chunk_size]))
+    return sections + parser.close()
+
+
+def body(section_text):
+    """Section text without its header line"""
+    return section_text.partition('\n')[2].strip()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, len(ANALYSIS)])
+def test_streamed_sections_match_the_finished_parse(chunk_size):
+    streamed = dict(stream(ANALYSIS, chunk_size))
+    sections, _ = parse_stock_output(ANALYSIS)
+
+    assert list(streamed) == ['executive_summary', 'bull_case', 'bear_case', 'investment_takeaway',
+                              'search_summary', 'analytical_reasoning']
+    assert streamed['bull_case'] == body(sections['bull_case'])
+    assert streamed['bear_case'] == body(sections['bear_case'])
+    assert streamed['executive_summary'] in sections['company_info']
+    assert streamed['search_summary'] in sections['company_info']
+    assert streamed['investment_takeaway'] in sections['analytical_reasoning']
+    assert streamed['analytical_reasoning'] in sections['analytical_reasoning']
+    assert 'Preamble' not in ''.join(streamed.values())
+
+
+def test_section_closes_only_when_the_next_header_arrives():
+    parser = IncrementalSectionParser()
+    assert parser.feed("## 🐂 BULL CASE\n1. **Moat**") == []
+    assert parser.feed("\n## 🐻 BEA") == []
+    assert parser.feed("R CASE\nrisk") == [('bull_case', '1. **Moat**')]
+    assert parser.close() == [('bear_case', 'risk')]
+
+
+def test_parse_stock_output_extracts_metrics_from_company_info():
+    sections, metrics = parse_stock_output(ANALYSIS)
+
+    assert sections['raw_text'] == ANALYSIS
+    assert '\n\n\n' not in sections['bull_case']
+    assert metrics['current_price'] == '212.50'
+    assert metrics['pe_ratio'] == '32.1'
+    assert thesis_points(sections['bull_case']) == ['Services growth', 'Buybacks']